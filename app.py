@@ -1,25 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
-import pyodbc
-import pandas as pd
 from tkinter import simpledialog
+from tkinter import font as tkfont
 import importlib.util
+import os
+import re
 import sys
-import csv
 import datetime
+import decimal
+import threading
 
-# Better MySQL module handling
-mysql_connector = None
-mysql_available = False
+from sql_builder import LOCAL_DB_TYPE, LOB_PREVIEW_LENGTH, QueryBuildError, build_lob_preview, build_query_parts, render_sql, format_column
+from catalog import fetch_tables, fetch_primary_keys, fetch_foreign_keys, fetch_table_sizes, describe_table_size
+from join_graph import JoinGraph
+from paging import KeysetPager
+from connections import DisplayCursor, open_connection, default_batch_size, discard_result, fetch_batches
+from exporters import write_csv, write_excel, write_parquet
+from profiling import profile_result, profile_table, schema_version, format_value
+from query_spec import save_spec, load_spec, diff_specs
+from parallel_extract import check_partition_type, choose_partition_column, extract_parallel
+from incremental import extract_incremental
+from replay import RecordingCursor, ReplayConnection
+from result_store import ResultStore, DEFAULT_MEMORY_BUDGET_MB
+from column_widths import SAMPLE_ROWS, WidthEngine
+from local_engine import LocalEngine, table_name_for
+from federation import RemoteTable, describe_pushdown, federate
+from fanout import DEFAULT_WORKERS, FanOut, describe_summary, parse_targets
+from query_history import QueryHistory, connection_label, sparkline
+import arrow_fetch
+from bulk_copy import DEFAULT_BATCH_ROWS, copy_query
+from lob_fetch import fetch_full_value, full_rows
 
-# Try to import MySQL connector safely
-try:
-    import mysql.connector
-    mysql_connector = mysql.connector
-    mysql_available = True
-except ImportError:
-    # Module is not available, but we'll handle this gracefully
-    pass
+
+def module_available(name):
+    """Check whether a module can be imported, without importing it"""
+    # pandas and the database drivers are slow to import, so they are only
+    # imported when first used
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        return False
 
 # Define SQL operation constants
 JOIN_TYPES = [
@@ -39,6 +59,12 @@ SORT_ORDERS = [
     "ASC", "DESC"
 ]
 
+# Tables estimated above this many rows trigger preview mode for unfiltered queries
+LARGE_TABLE_ROWS = 1000000
+
+# Rows shown in the grid at a time once a result has spilled to disk
+SPILLED_GRID_ROWS = 10000
+
 
 class SQLDataFetcher:
     def __init__(self, root):
@@ -93,10 +119,21 @@ class SQLDataFetcher:
         self.tables = {}
         self.selected_tables = []
         self.selected_columns = {}
+        self.primary_keys = {}
+        self.foreign_keys = []
+        self.column_types = {}
+        self.join_graph = None
+        # Catalog row/size estimates, and the table shown at each listbox position
+        self.table_sizes = {}
+        self.listbox_tables = []
         
         # Active connection objects
         self.active_conn = None
         self.active_cursor = None
+        # Recording file for the next execute_query run, if one was requested
+        self.record_path = None
+        # Serializes use of the active connection between the UI and background workers
+        self.db_lock = threading.RLock()
         
         # SQL operations variables
         self.order_by_columns = []
@@ -104,8 +141,54 @@ class SQLDataFetcher:
         self.aggregate_functions = {}
         self.where_conditions = []
         
-        # Results data
+        # Results data; "data" is a ResultStore that spills to disk past the memory budget
         self.result_data = None
+        self.memory_budget_mb = tk.StringVar(value=str(DEFAULT_MEMORY_BUDGET_MB))
+        # First row of the store shown in the grid, for results too big to show at once
+        self.grid_start = 0
+        # Measures column widths with the grid's fonts, created on first use
+        self.width_engine = None
+        # Executed queries and their timings, opened on first use
+        self.query_history = None
+        
+        # Server-side table profiles keyed by (server, database, table, schema version)
+        self.table_profile_cache = {}
+        self.table_profile_thread = None
+        
+        # CSV files loaded as tables of an embedded engine, created on first use,
+        # and the ones currently listed (a server table of the same name hides one)
+        self.local_engine = None
+        self.local_tables = set()
+        
+        # Extra databases attached next to the main connection, by source name,
+        # the source each of their listed tables belongs to, and the main connection's settings
+        self.attached_sources = {}
+        self.table_sources = {}
+        self.main_settings = None
+        
+        # Query spec and parts from the last generate_sql, used by the paged browse mode,
+        # and the dialect they were rendered in (the server's or LOCAL_DB_TYPE)
+        self.query_spec = None
+        self.query_parts = None
+        self.query_db_type = None
+        self.generated_sql = ""
+        self.pager = None
+        # The generated query with large-object columns fetched as previews (sql, lobs, hidden), or None
+        self.lob_preview = None
+        
+        # Spec loaded from a file; the builder widgets are only rebuilt from it
+        # when the Select Columns or Operations tab is opened
+        self.loaded_spec = None
+        self.page_size = tk.StringVar(value="500")
+        
+        # Preview mode limits the generated query to the first N rows
+        self.preview_mode = tk.BooleanVar(value=False)
+        self.preview_rows = tk.StringVar(value="1000")
+        # Table sets preview mode was switched on for; unticking it afterwards sticks
+        self.large_scan_tables = set()
+        
+        # Display-only fetch: values come back as text, skipping Decimal/datetime conversion
+        self.display_only = tk.BooleanVar(value=False)
         
         self.create_widgets()
     
@@ -114,7 +197,7 @@ class SQLDataFetcher:
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create tabs
+        # Create tabs - only the Connect tab is built now, the others on first use
         connection_tab = ttk.Frame(notebook)
         tables_tab = ttk.Frame(notebook)
         columns_tab = ttk.Frame(notebook)
@@ -129,23 +212,35 @@ class SQLDataFetcher:
         notebook.add(query_tab, text="5. Generate Query")
         notebook.add(results_tab, text="6. Results")  # Added results tab
         
+        self.notebook = notebook
+        self.tables_tab = tables_tab
+        self.columns_tab = columns_tab
+        self.operations_tab = operations_tab
+        self.query_tab = query_tab
+        self.results_tab = results_tab
+        
         # Connection tab
         self.setup_connection_tab(connection_tab)
         
-        # Tables tab
-        self.setup_tables_tab(tables_tab)
-        
-        # Columns tab
-        self.setup_columns_tab(columns_tab)
-        
-        # Operations tab
-        self.setup_operations_tab(operations_tab)
-        
-        # Query tab
-        self.setup_query_tab(query_tab)
-        
-        # Results tab
-        self.setup_results_tab(results_tab)
+        # Setup method of each tab that has not been built yet, keyed by tab name
+        self.pending_tabs = {
+            str(tables_tab): (tables_tab, self.setup_tables_tab),
+            str(columns_tab): (columns_tab, self.setup_columns_tab),
+            str(operations_tab): (operations_tab, self.setup_operations_tab),
+            str(query_tab): (query_tab, self.setup_query_tab),
+            str(results_tab): (results_tab, self.setup_results_tab),
+        }
+        notebook.bind("<<NotebookTabChanged>>", self.on_main_tab_changed)
+    
+    def build_tab(self, tab):
+        """Build a tab's widgets the first time it is shown or used"""
+        pending = self.pending_tabs.pop(str(tab), None)
+        if pending:
+            frame, setup = pending
+            setup(frame)
+    
+    def tab_built(self, tab):
+        return str(tab) not in self.pending_tabs
     
     def setup_connection_tab(self, tab):
         # Server frame
@@ -193,6 +288,11 @@ class SQLDataFetcher:
         connect_btn = ttk.Button(server_frame, text="Connect", command=self.connect_to_database, style="Light.TButton")
         connect_btn.grid(row=7, column=0, columnspan=2, pady=20)
         self.create_tooltip(connect_btn, "Click to establish DB connection")
+        
+        # Further databases whose tables can be joined with the main connection's
+        attach_btn = ttk.Button(server_frame, text="Attach as Extra Source", command=self.attach_source)
+        attach_btn.grid(row=8, column=0, columnspan=2, pady=(0, 20))
+        self.create_tooltip(attach_btn, "Keep the current connection and add this database's tables; joins across sources run locally")
 
     def setup_tables_tab(self, tab):
         tables_frame = ttk.LabelFrame(tab, text="Select Tables")
@@ -206,7 +306,22 @@ class SQLDataFetcher:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Continue button
-        ttk.Button(tab, text="Continue to Column Selection", command=self.get_table_columns).pack(pady=10)
+        button_frame = ttk.Frame(tab)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Continue to Column Selection", command=self.get_table_columns).pack(side=tk.LEFT, padx=5)
+        
+        # CSV files become local tables that can be queried and joined like server tables
+        csv_btn = ttk.Button(button_frame, text="Load CSV...", command=self.load_from_csv)
+        csv_btn.pack(side=tk.LEFT, padx=5)
+        self.create_tooltip(csv_btn, "Query CSV files locally, without uploading them to the server")
+        
+        # Server-side profile of the selected tables, for sizing queries before running them
+        profile_btn = ttk.Button(button_frame, text="Profile Table", command=self.profile_selected_tables)
+        profile_btn.pack(side=tk.LEFT, padx=5)
+        self.create_tooltip(profile_btn, "Run summary queries on the server for the selected tables")
+        
+        self.tables_status_var = tk.StringVar(value="")
+        ttk.Label(tab, textvariable=self.tables_status_var).pack(pady=(0, 10))
 
     def setup_columns_tab(self, tab):
         # Create columns selection area with notebook for tables
@@ -224,6 +339,9 @@ class SQLDataFetcher:
         ttk.Label(self.join_frame, text="Select tables first to configure joins").pack(padx=10, pady=10)
     
     def setup_operations_tab(self, tab):
+        # Scroll frame and canvas of each operation tab, for adding entries from a spec
+        self.operation_containers = {}
+        
         # Create notebook for different operations
         operations_notebook = ttk.Notebook(tab)
         operations_notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -248,8 +366,13 @@ class SQLDataFetcher:
         self.setup_where_tab(where_tab)
         self.setup_combined_columns_tab(combined_columns_tab)  # Setup new tab
         
-        # Continue button
-        ttk.Button(tab, text="Generate SQL", command=self.generate_sql).pack(pady=10)
+        # Generate button and query spec files
+        spec_frame = ttk.Frame(tab)
+        spec_frame.pack(pady=10)
+        ttk.Button(spec_frame, text="Generate SQL", command=self.generate_sql).pack(side=tk.LEFT, padx=5)
+        ttk.Button(spec_frame, text="Save Spec...", command=self.save_query_spec).pack(side=tk.LEFT, padx=5)
+        ttk.Button(spec_frame, text="Load Spec...", command=self.load_query_spec).pack(side=tk.LEFT, padx=5)
+        ttk.Button(spec_frame, text="Compare with Spec...", command=self.compare_query_spec).pack(side=tk.LEFT, padx=5)
 
     def setup_combined_columns_tab(self, tab):
         # Create frame for Combined Columns
@@ -268,6 +391,7 @@ class SQLDataFetcher:
         
         # Create list to hold combined column entries
         self.combined_column_entries = []
+        self.operation_containers["combined"] = (scroll_frame, canvas)
         
         # Info label explaining the feature
         info_text = ("This feature lets you combine columns from different tables into a single output column.\n"
@@ -389,21 +513,9 @@ class SQLDataFetcher:
         btn_frame = ttk.Frame(frame)
         btn_frame.grid(row=5, column=0, columnspan=3, pady=5)
         
-        ttk.Button(
-            btn_frame, 
-            text="Remove this Combined Column", 
-            command=lambda f=frame, e={
-                "checkbox_vars": checkbox_vars,
-                "alias_var": alias_var,
-                "all_columns": all_columns,
-                "filter_var": filter_var,
-                "check_canvas": check_canvas,
-                "check_scroll_frame": check_scroll_frame
-            }: self.remove_combined_column_entry(f, e, canvas)
-        ).pack(pady=5)
-        
         # Store complete entry data with the new checkbox vars
         entry_data = {
+            "frame": frame,
             "checkbox_vars": checkbox_vars,
             "alias_var": alias_var,
             "all_columns": all_columns,
@@ -411,6 +523,13 @@ class SQLDataFetcher:
             "check_canvas": check_canvas,
             "check_scroll_frame": check_scroll_frame
         }
+        
+        ttk.Button(
+            btn_frame, 
+            text="Remove this Combined Column", 
+            command=lambda f=frame, e=entry_data: self.remove_combined_column_entry(f, e, canvas)
+        ).pack(pady=5)
+        
         self.combined_column_entries.append(entry_data)
         
         # Update canvas scroll region
@@ -484,6 +603,7 @@ class SQLDataFetcher:
         
         # Create list to hold order by entries
         self.order_by_entries = []
+        self.operation_containers["order_by"] = (scroll_frame, canvas)
         
         # Add entries button
         ttk.Button(scroll_frame, text="Add Order By Column", command=lambda: self.add_order_by_entry(scroll_frame, canvas)).pack(anchor=tk.W, padx=10, pady=5)
@@ -580,6 +700,7 @@ class SQLDataFetcher:
         
         # Create list to hold group by entries
         self.group_by_entries = []
+        self.operation_containers["group_by"] = (scroll_frame, canvas)
         
         # Add entries button
         ttk.Button(scroll_frame, text="Add Group By Column", command=lambda: self.add_group_by_entry(scroll_frame, canvas)).pack(anchor=tk.W, padx=10, pady=5)
@@ -636,6 +757,7 @@ class SQLDataFetcher:
         
         # Create list to hold aggregate function entries
         self.aggregate_entries = []
+        self.operation_containers["aggregate"] = (scroll_frame, canvas)
         
         # Add entries button
         ttk.Button(scroll_frame, text="Add Aggregate Function", command=lambda: self.add_aggregate_entry(scroll_frame, canvas)).pack(anchor=tk.W, padx=10, pady=5)
@@ -741,6 +863,7 @@ class SQLDataFetcher:
         
         # Create list to hold where condition entries
         self.where_entries = []
+        self.operation_containers["where"] = (scroll_frame, canvas)
         
         # Add entries button
         ttk.Button(scroll_frame, text="Add Where Condition", command=lambda: self.add_where_entry(scroll_frame, canvas)).pack(anchor=tk.W, padx=10, pady=5)
@@ -832,13 +955,26 @@ class SQLDataFetcher:
                 self.username_entry.config(state=tk.NORMAL)
                 self.password_entry.config(state=tk.NORMAL)
     
+    def connection_settings(self):
+        """Current Connect tab values as a connection settings dictionary"""
+        return {
+            "db_type": self.db_type.get(),
+            "server": self.server.get(),
+            "port": self.port.get(),
+            "database": self.database.get(),
+            "username": self.username.get(),
+            "password": self.password.get(),
+            "auth_type": self.auth_type.get(),
+        }
+    
     def connect_to_database(self):
+        # Any paged browse belongs to the previous connection
+        self.close_pager()
+        
         try:
             if self.db_type.get() == "MySQL":
                 # Check if MySQL connector is available
-                global mysql_connector
-                
-                if not mysql_available:
+                if not module_available("mysql.connector"):
                     messagebox.showerror(
                         "Missing Module", 
                         "The MySQL connector module could not be detected.\n\n"
@@ -848,104 +984,286 @@ class SQLDataFetcher:
                 
                 try:
                     # Connect to MySQL database using the available connector
-                    conn = mysql_connector.connect(
-                        host=self.server.get(),
-                        port=int(self.port.get()),  # Convert port to integer
-                        user=self.username.get(),
-                        password=self.password.get(),
-                        database=self.database.get()
-                    )
+                    conn = open_connection(self.connection_settings())
                     
                     cursor = conn.cursor()
                     
                     # Store active connection for later data fetching
                     self.active_conn = conn
                     self.active_cursor = cursor
+                    self.main_settings = self.connection_settings()
                     
-                    # Get tables
-                    cursor.execute("SHOW TABLES")
-                    tables = cursor.fetchall()
+                    # Get tables and their columns
+                    tables, self.tables, self.column_types = fetch_tables(cursor, "MySQL", self.database.get())
+                    self.clear_tables_listbox()
                     
-                    # Clear tables dictionary and listbox
-                    self.tables = {}
-                    self.tables_listbox.delete(0, tk.END)
+                    # Key metadata is used for paged browsing and join inference
+                    notes = self.load_key_metadata(cursor, "MySQL")
                     
-                    # Add tables to listbox
+                    # Add tables to listbox, labelled with their size estimates
+                    notes += self.load_table_sizes(cursor, "MySQL")
                     for table in tables:
-                        self.tables_listbox.insert(tk.END, table[0])
-                    
-                    # Get column info for each table
-                    for table_name in [table[0] for table in tables]:
-                        cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-                        columns = cursor.fetchall()
-                        self.tables[table_name] = [col[0] for col in columns]
+                        self.add_table_to_listbox(table)
+                    notes += self.add_extra_tables()
                     
                     # Don't close connection - keep it open for data fetching
-                    messagebox.showinfo("Success", f"Connected to MySQL database {self.database.get()} successfully.\nFound {len(self.tables)} tables.")
+                    messagebox.showinfo("Success", f"Connected to MySQL database {self.database.get()} successfully.\nFound {len(tables)} tables."
+                                        + "".join(f"\n\n{note}" for note in notes))
                     
                 except Exception as e:
                     messagebox.showerror("MySQL Connection Failed", str(e))
                     
             else:
                 # SQL Server connection
-                # Build connection string
-                if self.auth_type.get() == "Windows Authentication":
-                    conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.server.get()};DATABASE={self.database.get()};Trusted_Connection=yes;"
-                else:
-                    conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.server.get()};DATABASE={self.database.get()};UID={self.username.get()};PWD={self.password.get()}"
-                
-                # Connect to database
-                conn = pyodbc.connect(conn_str)
+                conn = open_connection(self.connection_settings())
                 cursor = conn.cursor()
                 
                 # Store active connection for later data fetching
                 self.active_conn = conn
                 self.active_cursor = cursor
+                self.main_settings = self.connection_settings()
                 
-                # Get tables
-                cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE' AND TABLE_CATALOG = ?", (self.database.get(),))
-                tables = cursor.fetchall()
+                # Get tables and their columns
+                tables, self.tables, self.column_types = fetch_tables(cursor, "SQL Server", self.database.get())
+                self.clear_tables_listbox()
                 
-                # Clear tables dictionary and listbox
-                self.tables = {}
-                self.tables_listbox.delete(0, tk.END)
+                # Key metadata is used for paged browsing and join inference
+                notes = self.load_key_metadata(cursor, "SQL Server")
                 
-                # Add tables to listbox
+                # Add tables to listbox, labelled with their size estimates
+                notes += self.load_table_sizes(cursor, "SQL Server")
                 for table in tables:
-                    self.tables_listbox.insert(tk.END, table[0])
-                
-                # Get column info for each table
-                for table_name in [table[0] for table in tables]:
-                    cursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?", (table_name,))
-                    columns = cursor.fetchall()
-                    self.tables[table_name] = [col[0] for col in columns]
+                    self.add_table_to_listbox(table)
+                notes += self.add_extra_tables()
                 
                 # Don't close connection - keep it open for data fetching
-                messagebox.showinfo("Success", f"Connected to SQL Server database {self.database.get()} successfully.\nFound {len(self.tables)} tables.")
+                messagebox.showinfo("Success", f"Connected to SQL Server database {self.database.get()} successfully.\nFound {len(tables)} tables."
+                                    + "".join(f"\n\n{note}" for note in notes))
             
         except Exception as e:
             messagebox.showerror("Connection Failed", f"Unexpected error: {str(e)}")
     
-    def load_from_csv(self, table_identifier):
-        import tkinter.filedialog as filedialog
+    def load_key_metadata(self, cursor, db_type):
+        """
+        Read primary and foreign key metadata, keeping the connection usable if a catalog query fails.
+        Returns a note for the user about each part that could not be read.
+        """
+        notes = []
+        try:
+            self.primary_keys = fetch_primary_keys(cursor, db_type, self.database.get())
+        except Exception as e:
+            notes.append(f"Could not read primary keys: {str(e)}")
+            self.primary_keys = {}
         
-        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-        if not file_path:
+        try:
+            self.foreign_keys = fetch_foreign_keys(cursor, db_type, self.database.get())
+        except Exception as e:
+            notes.append(f"Could not read foreign keys: {str(e)}")
+            self.foreign_keys = []
+        return notes
+    
+    def load_table_sizes(self, cursor, db_type):
+        """Read row count and size estimates from the catalog. Returns a note for the user if they could not be read"""
+        try:
+            self.table_sizes = fetch_table_sizes(cursor, db_type, self.database.get())
+        except Exception as e:
+            self.table_sizes = {}
+            return [f"Could not read table sizes: {str(e)}"]
+        return []
+    
+    def clear_tables_listbox(self):
+        self.build_tab(self.tables_tab)
+        self.tables_listbox.delete(0, tk.END)
+        self.listbox_tables = []
+    
+    def add_table_to_listbox(self, table_name):
+        """Add a table to the Tables tab, showing its estimated size next to the name"""
+        self.build_tab(self.tables_tab)
+        label = table_name
+        if table_name in self.table_sizes:
+            label = f"{table_name}    ({describe_table_size(*self.table_sizes[table_name])})"
+        self.listbox_tables.append(table_name)
+        self.tables_listbox.insert(tk.END, label)
+    
+    def listbox_table(self, index):
+        """Table name shown at a listbox position"""
+        return self.listbox_tables[index]
+    
+    def load_from_csv(self):
+        """Register CSV files as tables of the local engine"""
+        file_paths = filedialog.askopenfilenames(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not file_paths:
             return
         
-        try:
-            df = pd.read_csv(file_path)
-            table_name = f"Table{table_identifier}"
-            self.tables[table_name] = list(df.columns)
-            
-            # Update tables list
-            if table_name not in [self.tables_listbox.get(i) for i in range(self.tables_listbox.size())]:
-                self.tables_listbox.insert(tk.END, table_name)
+        self.get_local_engine()
+        
+        loaded = []
+        for file_path in file_paths:
+            table_name = table_name_for(file_path, self.tables)
+            try:
+                self.root.config(cursor="watch")
+                self.root.update_idletasks()
+                info = self.local_engine.register_csv(file_path, table_name)
+            except Exception as e:
+                messagebox.showerror("Error loading CSV", f"{file_path}:\n{str(e)}")
+                continue
+            finally:
+                self.root.config(cursor="")
             
-            messagebox.showinfo("Success", f"Loaded {table_name} with {len(df.columns)} columns")
-        except Exception as e:
-            messagebox.showerror("Error loading CSV", str(e))
+            self.add_local_table(table_name, info)
+            loaded.append(f"{table_name} ({len(info['columns'])} columns)")
+        
+        if loaded:
+            messagebox.showinfo("Success", f"Loaded into the local {self.local_engine.kind} engine:\n" + "\n".join(loaded))
     
+    def add_local_table(self, table_name, info):
+        """Show a local CSV table next to the server tables"""
+        self.local_tables.add(table_name)
+        self.tables[table_name] = list(info["columns"])
+        self.column_types[table_name] = dict(info["types"])
+        self.table_sizes[table_name] = (info["rows"], os.path.getsize(info["path"]))
+        if table_name not in self.listbox_tables:
+            self.add_table_to_listbox(table_name)
+    
+    def add_extra_tables(self):
+        """
+        Re-add the CSV tables and attached sources' tables after the server's table list has been reloaded.
+        Returns a note for the user about each table hidden by a server table.
+        """
+        notes = []
+        self.local_tables = set()
+        if self.local_engine is not None:
+            for table_name, info in self.local_engine.tables.items():
+                if table_name in self.tables:
+                    notes.append(f"CSV table {table_name} is hidden by a server table of the same name")
+                    continue
+                self.add_local_table(table_name, info)
+
+        attached = self.table_sources
+        self.table_sources = {}
+        for table_name, source_name in attached.items():
+            if table_name in self.tables:
+                notes.append(f"Table {table_name} of {source_name} is hidden by a server table of the same name")
+                continue
+            self.add_attached_table(table_name, source_name)
+        return notes
+
+    def get_local_engine(self):
+        if self.local_engine is None:
+            self.local_engine = LocalEngine()
+        return self.local_engine
+
+    def attach_source(self):
+        """Open the database entered on the Connect tab as an extra source, next to the main connection"""
+        settings = self.connection_settings()
+        db_type = settings["db_type"]
+        if db_type == "MySQL" and not module_available("mysql.connector"):
+            messagebox.showerror("Missing Module", "The MySQL connector module could not be detected.\n\n"
+                                 "Please install it using: pip install mysql-connector-python")
+            return
+
+        base = re.sub(r"\W+", "_", settings["database"] or settings["server"]).strip("_") or "source"
+        source_name, n = base, 2
+        while source_name in self.attached_sources:
+            source_name = f"{base}_{n}"
+            n += 1
+
+        try:
+            conn = open_connection(settings)
+            cursor = conn.cursor()
+            try:
+                names, tables, column_types = fetch_tables(cursor, db_type, settings["database"])
+            finally:
+                cursor.close()
+        except Exception as e:
+            messagebox.showerror("Attach Failed", str(e))
+            return
+
+        self.attached_sources[source_name] = {
+            "db_type": db_type, "conn": conn, "lock": threading.RLock(), "settings": settings,
+            "label": f"{settings['database'] or settings['server']} ({db_type})",
+            "tables": {}, "columns": tables, "column_types": column_types,
+        }
+        for table in names:
+            # Tables named like one already listed get the source name in front
+            shown = table if table not in self.tables else f"{source_name}_{table}"
+            self.attached_sources[source_name]["tables"][shown] = table
+            self.add_attached_table(shown, source_name)
+
+        # The Connect tab goes back to showing the main connection
+        if self.main_settings:
+            for var, key in ((self.db_type, "db_type"), (self.server, "server"), (self.port, "port"),
+                             (self.database, "database"), (self.username, "username"),
+                             (self.password, "password"), (self.auth_type, "auth_type")):
+                var.set(self.main_settings[key])
+
+        messagebox.showinfo("Source Attached",
+                            f"Attached {source_name} with {len(names)} tables.\n\n"
+                            "Queries joining tables from different sources run locally; each source only "
+                            "sends the columns and rows the query needs.")
+
+    def add_attached_table(self, table_name, source_name):
+        """Show a table of an attached source next to the main connection's tables"""
+        source = self.attached_sources[source_name]
+        remote = source["tables"][table_name]
+        self.table_sources[table_name] = source_name
+        self.tables[table_name] = list(source["columns"][remote])
+        self.column_types[table_name] = dict(source["column_types"][remote])
+        if table_name not in self.listbox_tables:
+            self.add_table_to_listbox(table_name)
+
+    def remote_tables(self, tables):
+        """RemoteTable for each of tables that lives on a server (the main connection or an attached source)"""
+        remotes = {}
+        for table in tables:
+            if table in self.local_tables:
+                continue
+            source_name = self.table_sources.get(table)
+            if source_name:
+                source = self.attached_sources[source_name]
+                remotes[table] = RemoteTable(source["conn"], source["db_type"], source["tables"][table],
+                                             source["label"], source["lock"])
+            else:
+                remotes[table] = RemoteTable(self.active_conn, self.db_type.get(), table,
+                                             f"{self.database.get()} ({self.db_type.get()})", self.db_lock)
+        return remotes
+
+    def query_dialect(self, tables):
+        """Dialect of a query over tables: the server's when they are all main connection tables, otherwise the local engine's"""
+        main = [t for t in tables if t not in self.local_tables and t not in self.table_sources]
+        if len(main) == len(tables):
+            return self.db_type.get()
+
+        # CSV tables and tables of other sources are joined in the local engine
+        if main and not self.active_conn:
+            raise QueryBuildError("No Connection", "Please connect to a database first!")
+        return LOCAL_DB_TYPE
+
+    def load_local_tables(self):
+        """Bring the tables the last generated query uses into the local engine: CSV files and server extracts"""
+        def progress(table, rows):
+            if rows % 100000 == 0:
+                self.status_var.set(f"Loading {table}: {rows:,} rows...")
+                self.root.update()
+
+        tables = self.query_spec["tables"]
+        engine = self.get_local_engine()
+        engine.ensure_loaded([t for t in tables if t in self.local_tables], progress)
+        for table in tables:
+            if table in self.local_tables:
+                info = engine.tables[table]
+                self.table_sizes[table] = (info["rows"], os.path.getsize(info["path"]))
+
+        # Server tables are fetched again on every run, with the query's columns and filters pushed down
+        results = federate(engine, self.query_spec, self.remote_tables(tables), progress)
+        return "; ".join(f"{r['table']}: {r['rows']:,} rows from {r['source']} in {r['seconds']:.1f}s" for r in results)
+
+    def query_connection(self):
+        """Connection the last generated query runs on"""
+        if self.query_db_type == LOCAL_DB_TYPE:
+            return self.get_local_engine().conn
+        return self.active_conn
+
     def add_test_tables(self):
         table_a_name = self.table_a.get()
         table_b_name = self.table_b.get()
@@ -957,21 +1275,153 @@ class SQLDataFetcher:
         self.tables[table_c_name] = [f"C_Column_{i}" for i in range(1, 201)]
         
         # Clear listbox and add new tables
-        self.tables_listbox.delete(0, tk.END)
-        self.tables_listbox.insert(tk.END, table_a_name)
-        self.tables_listbox.insert(tk.END, table_b_name)
-        self.tables_listbox.insert(tk.END, table_c_name)
+        self.clear_tables_listbox()
+        self.add_table_to_listbox(table_a_name)
+        self.add_table_to_listbox(table_b_name)
+        self.add_table_to_listbox(table_c_name)
         
         messagebox.showinfo("Test Data", f"Added test tables:\n{table_a_name} (300 columns)\n{table_b_name} (250 columns)\n{table_c_name} (200 columns)")
     
-    def get_table_columns(self):
-        # Get selected tables
+    def profile_selected_tables(self):
+        """Profile the selected tables on the server using generated summary queries"""
         selected_indices = self.tables_listbox.curselection()
-        if len(selected_indices) < 1:
-            messagebox.showwarning("Table Selection", "Please select at least one table.")
+        if not selected_indices:
+            messagebox.showwarning("Table Selection", "Please select at least one table to profile.")
+            return
+        
+        if self.table_profile_thread and self.table_profile_thread.is_alive():
+            messagebox.showinfo("Profile Table", "A table profile is already running.")
+            return
+        
+        tables = [self.listbox_table(idx) for idx in selected_indices]
+        tables = [t for t in tables if t in self.tables]
+        
+        # CSV tables are in the local engine, not on the server
+        skipped = [t for t in tables if t in self.local_tables]
+        tables = [t for t in tables if t not in self.local_tables]
+        if not tables:
+            messagebox.showinfo("Profile Table", "CSV tables are not on the server.\n\n"
+                                "Query them and use Profile Results on the Results tab instead.")
             return
         
-        self.selected_tables = [self.tables_listbox.get(idx) for idx in selected_indices]
+        # Attached sources' tables have their own connection
+        if not self.active_conn and any(t not in self.table_sources for t in tables):
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        # Reuse cached profiles while the table's columns and types are unchanged
+        jobs = []
+        for table in tables:
+            key = self.table_profile_key(table)
+            if key not in self.table_profile_cache:
+                jobs.append((key, table, list(self.tables[table]), dict(self.column_types.get(table, {}))))
+        
+        progress = {"table": None}
+        outcome = {}
+        
+        def work():
+            try:
+                for key, table, columns, types in jobs:
+                    progress["table"] = table
+                    # Tables of attached sources are profiled on their own connection
+                    conn, lock, db_type, name = self.table_connection(table)
+                    with lock:
+                        cursor = conn.cursor()
+                        try:
+                            self.table_profile_cache[key] = profile_table(cursor, name, columns, types, db_type)
+                        finally:
+                            cursor.close()
+            except Exception as e:
+                outcome["error"] = e
+        
+        def poll():
+            if self.table_profile_thread.is_alive():
+                if progress["table"]:
+                    self.tables_status_var.set(f"Profiling {progress['table']}...")
+                self.root.after(200, poll)
+                return
+            
+            if "error" in outcome:
+                self.tables_status_var.set("Profile failed")
+                messagebox.showerror("Profile Failed", str(outcome["error"]))
+                return
+            
+            self.tables_status_var.set(f"Profiled {len(tables)} table(s)"
+                                       + (f"; skipped CSV table(s) {', '.join(skipped)}" if skipped else ""))
+            self.show_table_profiles(tables)
+        
+        self.table_profile_thread = threading.Thread(target=work, daemon=True)
+        self.table_profile_thread.start()
+        self.root.after(200, poll)
+
+    def table_connection(self, table):
+        """(connection, lock, db_type, name there) of the server a listed table lives on"""
+        source_name = self.table_sources.get(table)
+        if source_name:
+            source = self.attached_sources[source_name]
+            return source["conn"], source["lock"], source["db_type"], source["tables"][table]
+        return self.active_conn, self.db_lock, self.db_type.get(), table
+
+    def table_profile_key(self, table):
+        """Cache key of a table's server-side profile: its server, database, name there and schema"""
+        source_name = self.table_sources.get(table)
+        if source_name:
+            settings = self.attached_sources[source_name]["settings"]
+            server, database = settings["server"], settings["database"]
+        else:
+            server, database = self.server.get(), self.database.get()
+        types = self.column_types.get(table, {})
+        return (server, database, self.table_connection(table)[3], schema_version(self.tables[table], types))
+
+    def show_table_profiles(self, tables):
+        """Show cached server-side profiles for the given tables in a separate window"""
+        window = tk.Toplevel(self.root)
+        window.title("Table Profile")
+        window.geometry("800x450")
+        
+        stats_columns = ("rows", "nulls", "distinct", "min", "max")
+        tree = ttk.Treeview(window, columns=stats_columns)
+        tree.heading("#0", text="Table / Column")
+        tree.column("#0", width=220)
+        for col, width in zip(stats_columns, (90, 80, 80, 150, 150)):
+            tree.heading(col, text=col.capitalize())
+            tree.column(col, width=width)
+        
+        vsb = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        for table in tables:
+            key = self.table_profile_key(table)
+            if key not in self.table_profile_cache:
+                continue
+            row_count, profiles = self.table_profile_cache[key]
+            
+            parent = tree.insert("", tk.END, text=table, values=(row_count, "", "", "", ""), open=True)
+            for p in profiles:
+                distinct = "" if p["distinct"] is None else p["distinct"]
+                tree.insert(parent, tk.END, text=p["column"], values=(
+                    "", p["nulls"], distinct, format_value(p["min"], 30), format_value(p["max"], 30)))
+
+    def get_table_columns(self, tables=None):
+        self.build_tab(self.columns_tab)
+        
+        # Get selected tables, unless a loaded spec supplies them
+        if tables is None:
+            selected_indices = self.tables_listbox.curselection()
+            if len(selected_indices) < 1:
+                messagebox.showwarning("Table Selection", "Please select at least one table.")
+                return
+            tables = [self.listbox_table(idx) for idx in selected_indices]
+        
+        self.selected_tables = list(tables)
+        
+        # The widgets are the source of the query from here on
+        self.loaded_spec = None
+        
+        # Tables may have been reloaded or added since the join graph was built
+        self.join_graph = None
         
         # Clear notebook tabs
         for tab in self.columns_notebook.tabs():
@@ -1150,15 +1600,43 @@ class SQLDataFetcher:
         # Create list to hold join entries
         self.join_entries = []
         
+        # Pre-compute join paths over key columns so the entries start filled in
+        join_graph = self.get_join_graph()
+        join_tables = [t for t in self.selected_tables if t in self.tables]
+        planned_joins, unreachable = join_graph.plan_joins(join_tables)
+        
+        # Tables no planned join reaches keep the old "next table in order" default
+        remaining = [t for t in self.selected_tables[1:] if t not in [j[2] for j in planned_joins]]
+        
         # Add a join entry for each pair of tables needed
         # For n tables, we need at least n-1 joins
         for i in range(len(self.selected_tables) - 1):
-            # For the first join, use tables[0] and tables[1]
-            # For subsequent joins, use the result of previous joins and the next table
-            left_table = self.selected_tables[0] if i == 0 else None  # "result so far"
-            right_table = self.selected_tables[i+1]
+            if i < len(planned_joins):
+                left_table, left_columns, right_table, right_columns = planned_joins[i]
+                if i > 0:
+                    # Later joins use the result of previous joins, so qualify the left columns
+                    left_columns = [f"{left_table}.{column}" for column in left_columns]
+                    left_table = None
+                # A composite key fills in its columns comma separated
+                left_column = ", ".join(left_columns)
+                right_column = ", ".join(right_columns)
+            else:
+                # For the first join, use tables[0] and tables[1]
+                # For subsequent joins, use the result of previous joins and the next table
+                left_table = self.selected_tables[0] if i == 0 else None  # "result so far"
+                right_table = remaining[i - len(planned_joins)] if i - len(planned_joins) < len(remaining) else None
+                left_column = right_column = None
             
-            self.add_join_entry(scroll_frame, canvas, left_table, right_table, i)
+            self.add_join_entry(scroll_frame, canvas, left_table, right_table, i, left_column, right_column)
+        
+        # Point out tables that only connect through a table that isn't selected
+        hints = []
+        for table in unreachable:
+            bridges = join_graph.bridging_tables(join_tables, table)
+            if bridges:
+                hints.append(f"{table} connects to the selected tables through: {', '.join(bridges)}")
+        if hints:
+            ttk.Label(scroll_frame, text="\n".join(hints), wraplength=500, font=('Arial', 8, 'italic')).pack(anchor=tk.W, padx=10, pady=5)
         
         # Configure canvas scrolling
         scroll_frame.update_idletasks()
@@ -1172,7 +1650,19 @@ class SQLDataFetcher:
         # Add a button to add additional join configurations
         ttk.Button(scroll_frame, text="Add Another Join", command=self.add_another_join).pack(pady=10)
     
-    def add_join_entry(self, parent, canvas, left_table=None, right_table=None, join_index=0):
+    def get_join_graph(self):
+        """Build the join graph from key metadata and name heuristics, once per table selection"""
+        if self.join_graph is None:
+            self.join_graph = JoinGraph.from_catalog(self.tables, self.primary_keys, self.foreign_keys, self.column_types)
+        return self.join_graph
+
+    def key_columns_first(self, table, columns):
+        """Order join column choices with the table's key columns first"""
+        keys = self.get_join_graph().key_columns(table)
+        keys += [c for c in self.primary_keys.get(table, []) if c not in keys]
+        return [c for c in keys if c in columns] + [c for c in columns if c not in keys]
+
+    def add_join_entry(self, parent, canvas, left_table=None, right_table=None, join_index=0, left_column=None, right_column=None):
         frame = ttk.LabelFrame(parent, text=f"Join {join_index + 1}")
         frame.pack(fill=tk.X, padx=10, pady=5)
         
@@ -1190,14 +1680,14 @@ class SQLDataFetcher:
                 left_combo.set(left_table)
                 # Get columns for left table
                 if left_table in self.tables:
-                    all_left_columns = self.tables[left_table]
+                    all_left_columns = self.key_columns_first(left_table, self.tables[left_table])
             left_combo.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
             
             # Update columns when left table changes
             def update_left_columns(event):
                 selected_table = left_combo.get()
                 if selected_table in self.tables:
-                    new_columns = self.tables[selected_table]
+                    new_columns = self.key_columns_first(selected_table, self.tables[selected_table])
                     left_col_combo['values'] = new_columns
             
             left_combo.bind("<<ComboboxSelected>>", update_left_columns)
@@ -1217,14 +1707,14 @@ class SQLDataFetcher:
             right_combo.set(right_table)
             # Get columns for right table
             if right_table in self.tables:
-                all_right_columns = self.tables[right_table]
+                all_right_columns = self.key_columns_first(right_table, self.tables[right_table])
         right_combo.grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
         
         # Update columns when right table changes
         def update_right_columns(event):
             selected_table = right_combo.get()
             if selected_table in self.tables:
-                new_columns = self.tables[selected_table]
+                new_columns = self.key_columns_first(selected_table, self.tables[selected_table])
                 right_col_combo['values'] = new_columns
         
         right_combo.bind("<<ComboboxSelected>>", update_right_columns)
@@ -1246,6 +1736,12 @@ class SQLDataFetcher:
         right_col_combo = self.create_searchable_combobox(frame, all_right_columns, width=40)
         right_col_combo.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
         
+        # Pre-fill the inferred join columns
+        if left_column:
+            left_col_combo.set(left_column)
+        if right_column:
+            right_col_combo.set(right_column)
+        
         # Store the join entry components
         self.join_entries.append((left_combo, right_combo, join_type_combo, left_col_combo, right_col_combo))
         
@@ -1275,278 +1771,411 @@ class SQLDataFetcher:
         join_index = len(self.join_entries)
         self.add_join_entry(self.join_scroll_frame, self.join_canvas, None, None, join_index)
 
-    def generate_sql(self):
-        if not self.selected_tables:
-            messagebox.showwarning("Selection Error", "Please select at least one table")
-            return
+    def collect_query_spec(self):
+        """Collect the query choices from the UI widgets into a plain query spec"""
+        self.build_tab(self.operations_tab)
+        
+        spec = {
+            "tables": list(self.selected_tables),
+            "columns": {},
+            "combined_columns": [],
+            "aggregates": [],
+            "joins": [],
+            "where": [],
+            "group_by": [],
+            "order_by": [],
+        }
         
         # Get all selected columns
-        selected_columns_dict = {}
-        for table in self.selected_tables:
-            selected_columns_dict[table] = []
-            for column, var in self.selected_columns[table].items():
-                if var.get():
-                    selected_columns_dict[table].append(column)
-        
-        # Generate SQL
-        sql = "SELECT \n"
-        
-        # Track which columns are used in aggregates to avoid duplication
-        aggregated_columns = set()
-        
-        # Collect all aggregate functions first to identify duplicated columns
-        for func_combo, col_combo, alias_entry in self.aggregate_entries:
-            col = col_combo.get()
-            if col:
-                aggregated_columns.add(col)
-        
-        # Add columns
-        all_columns = []
-        
-        # Add regular selected columns (except those used in aggregates)
         for table in self.selected_tables:
-            for column in selected_columns_dict[table]:
-                column_full_name = f"{table}.{column}"
-                # Only add if not used in an aggregate function
-                if column_full_name not in aggregated_columns:
-                    # Handle column names based on database type
-                    if self.db_type.get() == "MySQL":
-                        all_columns.append(f"`{table}`.`{column}`")
-                    else:
-                        all_columns.append(f"{table}.{column}")
+            spec["columns"][table] = [column for column, var in self.selected_columns[table].items() if var.get()]
         
-        # Add combined column entries - update to handle checkbox vars
+        # Combined columns - get selected columns from checkboxes
         for entry_data in self.combined_column_entries:
-            checkbox_vars = entry_data["checkbox_vars"]
-            alias_var = entry_data["alias_var"]
-            
-            # Get selected columns from checkboxes
-            selected_columns = [col for col, var in checkbox_vars.items() if var.get()]
-            
-            if not selected_columns:
-                continue
-                
-            alias = alias_var.get()
-            if not alias:
-                continue
-                
-            # Format the COALESCE function based on database type
-            if self.db_type.get() == "MySQL":
-                formatted_cols = []
-                for col in selected_columns:
-                    if "." in col:
-                        table_name, col_name = col.split(".", 1)
-                        formatted_cols.append(f"`{table_name}`.`{col_name}`")
-                    else:
-                        formatted_cols.append(f"`{col}`")
-                coalesce_col = f"COALESCE({', '.join(formatted_cols)}) AS `{alias}`"
-            else:
-                coalesce_col = f"COALESCE({', '.join(selected_columns)}) AS {alias}"
-                    
-            all_columns.append(coalesce_col)
-                
-            # Mark these columns as used to avoid duplication
-            for col in selected_columns:
-                aggregated_columns.add(col)
+            spec["combined_columns"].append({
+                "alias": entry_data["alias_var"].get(),
+                "columns": [col for col, var in entry_data["checkbox_vars"].items() if var.get()],
+            })
         
-        # Add aggregate functions
         for func_combo, col_combo, alias_entry in self.aggregate_entries:
-            func = func_combo.get()
-            col = col_combo.get()
-            alias = alias_entry.get()
-            
-            if not col:
-                continue
-            
-            # Format the aggregate function
-            if self.db_type.get() == "MySQL":
-                # Extract the column name without table prefix for MySQL if it has table prefix
-                if "." in col:
-                    table_name, col_name = col.split(".", 1)
-                    agg_col = f"{func}(`{table_name}`.`{col_name}`)"
-                else:
-                    agg_col = f"{func}(`{col}`)"
-            else:
-                agg_col = f"{func}({col})"
-            
-            # Add alias if provided
-            if alias:
-                # Replace any dots in alias with underscores to avoid SQL syntax errors
-                sanitized_alias = alias.replace(".", "_")
-                agg_col += f" AS {sanitized_alias}"
-            
-            all_columns.append(agg_col)
+            spec["aggregates"].append({
+                "function": func_combo.get(),
+                "column": col_combo.get(),
+                "alias": alias_entry.get(),
+            })
         
-        if not all_columns:
-            messagebox.showwarning("No Columns", "Please select at least one column, combined column, or aggregate function")
+        if len(self.selected_tables) > 1 and hasattr(self, 'join_entries'):
+            for left_combo, right_combo, join_type_combo, left_col_entry, right_col_entry in self.join_entries:
+                spec["joins"].append({
+                    "left_table": left_combo.get() if left_combo else None,
+                    "right_table": right_combo.get(),
+                    "join_type": join_type_combo.get(),
+                    "left_column": left_col_entry.get(),
+                    "right_column": right_col_entry.get(),
+                })
+        
+        for col_combo, op_combo, val_entry, conn_combo in self.where_entries:
+            spec["where"].append({
+                "column": col_combo.get(),
+                "operator": op_combo.get(),
+                "value": val_entry.get(),
+                "connector": conn_combo.get(),
+            })
+        
+        spec["group_by"] = [combo.get() for combo in self.group_by_entries]
+        
+        for col_combo, order_combo in self.order_by_entries:
+            spec["order_by"].append({"column": col_combo.get(), "direction": order_combo.get()})
+        
+        return spec
+
+    def generate_sql(self):
+        if not self.selected_tables:
+            messagebox.showwarning("Selection Error", "Please select at least one table")
             return
         
-        sql += "    " + ",\n    ".join(all_columns)
-        
-        # Add FROM clause with first table
-        if self.db_type.get() == "MySQL":
-            sql += f"\nFROM `{self.selected_tables[0]}`"
-        else:
-            sql += f"\nFROM {self.selected_tables[0]}"
-        
-        # Add JOINs if multiple tables
-        if len(self.selected_tables) > 1 and hasattr(self, 'join_entries'):
-            for i, (left_combo, right_combo, join_type_combo, left_col_entry, right_col_entry) in enumerate(self.join_entries):
-                join_type = join_type_combo.get()
-                left_col = left_col_entry.get()
-                right_col = right_col_entry.get()
-                
-                # For first join, get the left table from combo
-                # For subsequent joins, left table is implicit (result of previous joins)
-                if i == 0:
-                    left_table = left_combo.get() if left_combo else self.selected_tables[0]
-                else:
-                    left_table = None  # Not needed for SQL generation after first join
-                
-                right_table = right_combo.get()
-                
-                if not right_table or not left_col or not right_col:
-                    messagebox.showwarning("Join Error", f"Please complete all fields for Join {i+1}")
-                    return
-                
-                # Format the join based on database type
-                if self.db_type.get() == "MySQL":
-                    if left_table:
-                        sql += f"\n{join_type} `{right_table}` ON `{left_table}`.`{left_col}` = `{right_table}`.`{right_col}`"
-                    else:
-                        sql += f"\n{join_type} `{right_table}` ON `{right_table}`.`{right_col}` = `{left_col}`"
-                else:
-                    if left_table:
-                        sql += f"\n{join_type} {right_table} ON {left_table}.{left_col} = {right_table}.{right_col}"
-                    else:
-                        sql += f"\n{join_type} {right_table} ON {right_table}.{right_col} = {left_col}"
+        # A loaded spec is used as-is until its widgets have been built
+        spec = self.loaded_spec if self.loaded_spec is not None else self.collect_query_spec()
         
-        # Add WHERE clause if conditions exist
-        if self.where_entries:
-            sql += "\nWHERE "
-            conditions = []
-            
-            for i, (col_combo, op_combo, val_entry, conn_combo) in enumerate(self.where_entries):
-                col = col_combo.get()
-                op = op_combo.get()
-                val = val_entry.get()
-                
-                if not col or (op not in ["IS NULL", "IS NOT NULL"] and not val):
-                    continue
-                
-                # Format the condition based on operator and database type
-                if self.db_type.get() == "MySQL" and "." in col:
-                    # Add proper backticks for MySQL mode
-                    table_name, col_name = col.split(".", 1)
-                    formatted_col = f"`{table_name}`.`{col_name}`"
-                else:
-                    formatted_col = col
-                
-                # Format the condition based on operator
-                if op in ["IS NULL", "IS NOT NULL"]:
-                    condition = f"{formatted_col} {op}"
-                elif op == "LIKE":
-                    condition = f"{formatted_col} LIKE '{val}'"
-                elif op == "IN":
-                    condition = f"{formatted_col} IN ({val})"
-                else:
-                    # Check if value is numeric
-                    try:
-                        float(val)
-                        condition = f"{formatted_col} {op} {val}"
-                    except ValueError:
-                        condition = f"{formatted_col} {op} '{val}'"
-                
-                conditions.append(condition)
-                
-                # Add connector (AND/OR) except for the last condition
-                if i < len(self.where_entries) - 1:
-                    conditions.append(conn_combo.get())
-            
-            sql += " ".join(conditions)
-        
-        # Add GROUP BY if grouping columns exist
-        if self.group_by_entries:
-            group_cols = []
-            for combo in self.group_by_entries:
-                col = combo.get()
-                if col:
-                    # Format GROUP BY columns with proper backticks in MySQL mode
-                    if self.db_type.get() == "MySQL" and "." in col:
-                        table_name, col_name = col.split(".", 1)
-                        group_cols.append(f"`{table_name}`.`{col_name}`")
-                    else:
-                        group_cols.append(col)
-            
-            if group_cols:
-                sql += "\nGROUP BY " + ", ".join(group_cols)
+        try:
+            db_type = self.query_dialect(spec["tables"])
+            parts = build_query_parts(spec, db_type)
+        except QueryBuildError as e:
+            messagebox.showwarning(e.title, e.message)
+            return
         
-        # Add ORDER BY if ordering columns exist
-        if self.order_by_entries:
-            order_cols = []
-            for col_combo, order_combo in self.order_by_entries:
-                col = col_combo.get()
-                order = order_combo.get()
-                if col:
-                    # Format ORDER BY columns with proper backticks in MySQL mode
-                    if self.db_type.get() == "MySQL" and "." in col:
-                        table_name, col_name = col.split(".", 1)
-                        order_cols.append(f"`{table_name}`.`{col_name}` {order}")
-                    else:
-                        order_cols.append(f"{col} {order}")
-            
-            if order_cols:
-                sql += "\nORDER BY " + ", ".join(order_cols)
+        # Keep the parts so the paged browse mode can add seek predicates
+        self.query_spec = spec
+        self.query_parts = parts
+        self.query_db_type = db_type
         
-        # End query
-        sql += ";"
+        self.check_large_scan(spec)
+        if self.preview_mode.get():
+            try:
+                parts["limit"] = max(1, int(self.preview_rows.get()))
+            except ValueError:
+                messagebox.showwarning("Preview Rows", "Preview row count must be a whole number")
+                return
+        sql = render_sql(parts, db_type)
+        
+        # Execute Query fetches a preview of large text/binary columns; the SQL shown stays the full query
+        self.lob_preview = None
+        if db_type != LOCAL_DB_TYPE:
+            preview = build_lob_preview(parts, spec, self.column_types, self.primary_keys, db_type)
+            if preview:
+                preview_parts, lobs, hidden = preview
+                self.lob_preview = {"sql": render_sql(preview_parts, db_type), "lobs": lobs, "hidden": hidden}
+        
+        # Cross-source queries show what each server will be asked for
+        remotes = self.remote_tables(spec["tables"]) if db_type == LOCAL_DB_TYPE else {}
+        if remotes:
+            try:
+                sql = describe_pushdown(spec, remotes) + "\n" + sql
+            except ValueError as e:
+                messagebox.showwarning("Cross-Source Query", str(e))
+                return
+        self.generated_sql = sql
         
         # Display in query tab
+        self.build_tab(self.query_tab)
         self.query_text.delete(1.0, tk.END)
         self.query_text.insert(tk.END, sql)
     
-    def copy_to_clipboard(self):
-        sql = self.query_text.get(1.0, tk.END)
-        self.root.clipboard_clear()
-        self.root.clipboard_append(sql)
-        messagebox.showinfo("Success", "SQL query copied to clipboard!")
-
-    def setup_query_tab(self, tab):
-        # Query display area
-        query_frame = ttk.LabelFrame(tab, text="Generated SQL Query")
-        query_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        self.query_text = scrolledtext.ScrolledText(query_frame, wrap=tk.WORD, width=80, height=15)
-        self.query_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    def check_large_scan(self, spec):
+        """Switch on preview mode, once per set of tables, when an unfiltered query would scan a very large table"""
+        tables = frozenset(spec["tables"])
+        if self.preview_mode.get() or tables in self.large_scan_tables:
+            return
         
-        # Button frame
-        button_frame = ttk.Frame(tab)
-        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        if any(cond.get("column") for cond in spec["where"]):
+            return
         
-        # Copy button
-        ttk.Button(button_frame, text="Copy to Clipboard", command=self.copy_to_clipboard).pack(side=tk.LEFT, padx=5)
+        large = [(t, self.table_sizes[t][0]) for t in spec["tables"]
+                 if t in self.table_sizes and self.table_sizes[t][0] >= LARGE_TABLE_ROWS]
+        if not large:
+            return
         
-        # Execute button
-        ttk.Button(button_frame, text="Execute Query", command=self.execute_query).pack(side=tk.LEFT, padx=5)
+        self.large_scan_tables.add(tables)
+        self.preview_mode.set(True)
+        details = "\n".join(f"{table}: {describe_table_size(rows)}" for table, rows in large)
+        messagebox.showinfo(
+            "Large Table",
+            f"This query has no WHERE conditions and reads from large tables:\n\n{details}\n\n"
+            f"Preview mode has been turned on, so only the first {self.preview_rows.get()} rows are returned.\n"
+            "Untick \"Preview only\" on the Generate Query tab and generate again to run the full query "
+            "(needed for Parallel and Incremental Export); it won't be turned on again for these tables."
+        )
     
-    def setup_results_tab(self, tab):
-        # Results frame
-        results_frame = ttk.LabelFrame(tab, text="Query Results")
-        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Status frame
-        status_frame = ttk.Frame(results_frame)
-        status_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Label(status_frame, text="Status:").pack(side=tk.LEFT, padx=5)
-        self.status_var = tk.StringVar(value="No query executed yet")
-        ttk.Label(status_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=5)
+    def current_query_spec(self):
+        """The query spec being worked on: a loaded spec, or the one the widgets describe"""
+        if self.loaded_spec is not None:
+            return self.loaded_spec
+        if not self.selected_tables:
+            messagebox.showwarning("Selection Error", "Please select at least one table")
+            return None
+        return self.collect_query_spec()
+    
+    def save_query_spec(self):
+        """Save the current query spec as JSON or TOML"""
+        spec = self.current_query_spec()
+        if spec is None:
+            return
         
-        ttk.Label(status_frame, text="Rows:").pack(side=tk.LEFT, padx=(20, 5))
-        self.rows_var = tk.StringVar(value="0")
-        ttk.Label(status_frame, textvariable=self.rows_var).pack(side=tk.LEFT, padx=5)
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON query spec", "*.json"), ("TOML query spec", "*.toml"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
         
-        ttk.Label(status_frame, text="Execution time:").pack(side=tk.LEFT, padx=(20, 5))
+        try:
+            save_spec(file_path, dict(spec, db_type=self.db_type.get()))
+            messagebox.showinfo("Save Successful", f"Query spec saved to {file_path}")
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Failed to save query spec: {str(e)}")
+    
+    def ask_spec_file(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Query specs", "*.json *.toml"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return None
+        try:
+            return load_spec(file_path)
+        except Exception as e:
+            messagebox.showerror("Load Error", f"Failed to read query spec: {str(e)}")
+            return None
+    
+    def load_query_spec(self):
+        """Load a saved spec and generate its SQL straight away, without building the column widgets"""
+        if not self.tables:
+            messagebox.showwarning("Not Connected", "Please connect to a database or load tables first.")
+            return
+        
+        spec = self.ask_spec_file()
+        if spec is None:
+            return
+        
+        missing = [t for t in spec["tables"] if t not in self.tables]
+        if missing:
+            messagebox.showwarning("Missing Tables", f"These tables from the spec are not available:\n\n{', '.join(missing)}")
+            return
+        
+        self.loaded_spec = spec
+        self.selected_tables = list(spec["tables"])
+        self.join_graph = None
+        
+        self.generate_sql()
+        self.notebook.select(self.query_tab)
+    
+    def compare_query_spec(self):
+        """Show how the current query differs from a saved spec"""
+        current = self.current_query_spec()
+        if current is None:
+            return
+        
+        saved = self.ask_spec_file()
+        if saved is None:
+            return
+        
+        changes = diff_specs(saved, current)
+        if not changes:
+            messagebox.showinfo("Compare Spec", "The current query matches the saved spec.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Changes Since Saved Spec")
+        window.geometry("700x400")
+        text = scrolledtext.ScrolledText(window, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        text.insert(tk.END, "\n".join(changes))
+        text.config(state=tk.DISABLED)
+    
+    def on_main_tab_changed(self, event):
+        self.build_tab(self.notebook.select())
+        
+        # Build the widgets for a loaded spec only once the user wants to edit it
+        if self.loaded_spec is None:
+            return
+        if self.notebook.select() in (str(self.columns_tab), str(self.operations_tab)):
+            spec, self.loaded_spec = self.loaded_spec, None
+            self.apply_spec_to_ui(spec)
+    
+    def clear_operation_entries(self):
+        """Remove every ORDER BY, GROUP BY, aggregate, WHERE and combined column entry"""
+        for col_combo, _ in self.order_by_entries:
+            col_combo.master.destroy()
+        for col_combo in self.group_by_entries:
+            col_combo.master.destroy()
+        for func_combo, _, _ in self.aggregate_entries:
+            func_combo.master.destroy()
+        for col_combo, _, _, _ in self.where_entries:
+            col_combo.master.destroy()
+        for entry_data in self.combined_column_entries:
+            entry_data["frame"].destroy()
+        
+        self.order_by_entries = []
+        self.group_by_entries = []
+        self.aggregate_entries = []
+        self.where_entries = []
+        self.combined_column_entries = []
+    
+    def apply_spec_to_ui(self, spec):
+        """Rebuild the column selection, joins and operations widgets from a query spec"""
+        missing = [t for t in spec["tables"] if t not in self.tables]
+        if missing:
+            messagebox.showwarning("Missing Tables", f"These tables from the spec are not available:\n\n{', '.join(missing)}")
+            return
+        
+        self.get_table_columns(spec["tables"])
+        
+        for table, columns in spec["columns"].items():
+            for column in columns:
+                if column in self.selected_columns.get(table, {}):
+                    self.selected_columns[table][column].set(True)
+        
+        # Replace the inferred joins with the saved ones
+        if len(spec["tables"]) > 1:
+            while len(self.join_entries) < len(spec["joins"]):
+                self.add_another_join()
+            for entry in self.join_entries[len(spec["joins"]):]:
+                self.remove_join_entry(entry[2].master, entry, self.join_canvas)
+            
+            for entry, join in zip(self.join_entries, spec["joins"]):
+                left_combo, right_combo, join_type_combo, left_col_combo, right_col_combo = entry
+                if left_combo and join.get("left_table"):
+                    left_combo.set(join["left_table"])
+                    left_combo.event_generate("<<ComboboxSelected>>")
+                right_combo.set(join.get("right_table") or "")
+                right_combo.event_generate("<<ComboboxSelected>>")
+                join_type_combo.set(join.get("join_type") or "INNER JOIN")
+                left_col_combo.set(join.get("left_column") or "")
+                right_col_combo.set(join.get("right_column") or "")
+        
+        self.build_tab(self.operations_tab)
+        self.clear_operation_entries()
+        
+        scroll_frame, canvas = self.operation_containers["order_by"]
+        for order in spec["order_by"]:
+            self.add_order_by_entry(scroll_frame, canvas)
+            col_combo, order_combo = self.order_by_entries[-1]
+            col_combo.set(order.get("column") or "")
+            order_combo.set(order.get("direction") or "ASC")
+        
+        scroll_frame, canvas = self.operation_containers["group_by"]
+        for col in spec["group_by"]:
+            self.add_group_by_entry(scroll_frame, canvas)
+            self.group_by_entries[-1].set(col)
+        
+        scroll_frame, canvas = self.operation_containers["aggregate"]
+        for agg in spec["aggregates"]:
+            self.add_aggregate_entry(scroll_frame, canvas)
+            func_combo, col_combo, alias_entry = self.aggregate_entries[-1]
+            func_combo.set(agg.get("function") or "COUNT")
+            col_combo.set(agg.get("column") or "")
+            alias_entry.insert(0, agg.get("alias") or "")
+        
+        scroll_frame, canvas = self.operation_containers["where"]
+        for cond in spec["where"]:
+            self.add_where_entry(scroll_frame, canvas)
+            col_combo, op_combo, val_entry, conn_combo = self.where_entries[-1]
+            col_combo.set(cond.get("column") or "")
+            op_combo.set(cond.get("operator") or "=")
+            val_entry.insert(0, cond.get("value") or "")
+            conn_combo.set(cond.get("connector") or "AND")
+        
+        scroll_frame, canvas = self.operation_containers["combined"]
+        for combined in spec["combined_columns"]:
+            self.add_combined_column_entry(scroll_frame, canvas)
+            entry_data = self.combined_column_entries[-1]
+            entry_data["alias_var"].set(combined.get("alias") or "")
+            for col in combined.get("columns", []):
+                if col in entry_data["checkbox_vars"]:
+                    entry_data["checkbox_vars"][col].set(True)
+    
+    def copy_to_clipboard(self):
+        sql = self.query_text.get(1.0, tk.END)
+        self.root.clipboard_clear()
+        self.root.clipboard_append(sql)
+        messagebox.showinfo("Success", "SQL query copied to clipboard!")
+
+    def setup_query_tab(self, tab):
+        # Query display area
+        query_frame = ttk.LabelFrame(tab, text="Generated SQL Query")
+        query_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.query_text = scrolledtext.ScrolledText(query_frame, wrap=tk.WORD, width=80, height=15)
+        self.query_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Button frame
+        button_frame = ttk.Frame(tab)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Copy button
+        ttk.Button(button_frame, text="Copy to Clipboard", command=self.copy_to_clipboard).pack(side=tk.LEFT, padx=5)
+        
+        # Execute button
+        ttk.Button(button_frame, text="Execute Query", command=self.execute_query).pack(side=tk.LEFT, padx=5)
+        
+        # Paged browse mode - fetches one page at a time instead of the whole result
+        ttk.Button(button_frame, text="Browse in Pages", command=self.browse_in_pages).pack(side=tk.LEFT, padx=5)
+        ttk.Label(button_frame, text="Page size:").pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Entry(button_frame, textvariable=self.page_size, width=8).pack(side=tk.LEFT)
+        
+        # Preview mode - applied the next time the query is generated
+        ttk.Checkbutton(button_frame, text="Preview only, first", variable=self.preview_mode).pack(side=tk.LEFT, padx=(20, 5))
+        ttk.Entry(button_frame, textvariable=self.preview_rows, width=8).pack(side=tk.LEFT)
+        ttk.Label(button_frame, text="rows").pack(side=tk.LEFT, padx=5)
+        
+        # Faster fetch for results that are only looked at; sorting then compares text
+        ttk.Checkbutton(button_frame, text="Display only (values as text)", variable=self.display_only).pack(side=tk.LEFT, padx=(20, 5))
+        
+        # Results bigger than this are kept in a temporary file instead of RAM
+        ttk.Label(button_frame, text="Memory budget:").pack(side=tk.LEFT, padx=(20, 5))
+        ttk.Entry(button_frame, textvariable=self.memory_budget_mb, width=6).pack(side=tk.LEFT)
+        ttk.Label(button_frame, text="MB").pack(side=tk.LEFT, padx=5)
+        
+        # Exports that run straight from the query to files, without the Results grid
+        export_frame = ttk.Frame(tab)
+        export_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        # Big exports split into key ranges, each fetched on its own connection
+        ttk.Button(export_frame, text="Parallel Export...", command=self.parallel_export).pack(side=tk.LEFT, padx=5)
+        
+        # Cross-server data moves without a file in between
+        ttk.Button(export_frame, text="Copy Results to Table...", command=self.copy_to_table).pack(side=tk.LEFT, padx=5)
+        
+        # Daily re-exports that only fetch rows added since the last run
+        ttk.Button(export_frame, text="Incremental Export...", command=self.incremental_export).pack(side=tk.LEFT, padx=5)
+        
+        # The same query on many identically shaped databases, combined into one result
+        ttk.Button(export_frame, text="Run on Many Databases...", command=self.fan_out_query).pack(side=tk.LEFT, padx=5)
+        
+        # Past runs of each query with their timing trend
+        ttk.Button(export_frame, text="Query History...", command=self.show_query_history).pack(side=tk.RIGHT, padx=5)
+        
+        # Capture a run against the real server, and play it back offline for profiling
+        ttk.Button(export_frame, text="Record Next Run...", command=self.record_next_run).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(export_frame, text="Replay Recording...", command=self.replay_recording).pack(side=tk.RIGHT, padx=5)
+    
+    def setup_results_tab(self, tab):
+        # Results frame
+        results_frame = ttk.LabelFrame(tab, text="Query Results")
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Status frame
+        status_frame = ttk.Frame(results_frame)
+        status_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(status_frame, text="Status:").pack(side=tk.LEFT, padx=5)
+        self.status_var = tk.StringVar(value="No query executed yet")
+        ttk.Label(status_frame, textvariable=self.status_var).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(status_frame, text="Rows:").pack(side=tk.LEFT, padx=(20, 5))
+        self.rows_var = tk.StringVar(value="0")
+        ttk.Label(status_frame, textvariable=self.rows_var).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(status_frame, text="Execution time:").pack(side=tk.LEFT, padx=(20, 5))
         self.time_var = tk.StringVar(value="0 ms")
         ttk.Label(status_frame, textvariable=self.time_var).pack(side=tk.LEFT, padx=5)
         
@@ -1554,9 +2183,13 @@ class SQLDataFetcher:
         instruction_text = "Drag column headers to reorder columns or right-click for column options"
         ttk.Label(status_frame, text=instruction_text, font=('Arial', 8, 'italic')).pack(side=tk.RIGHT, padx=10)
         
+        # Paned window so the column profile can be shown beside the grid
+        self.results_paned = ttk.PanedWindow(results_frame, orient=tk.HORIZONTAL)
+        self.results_paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
         # Treeview with scrollbars - configure with performance optimizations
-        tree_frame = ttk.Frame(results_frame)
-        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        tree_frame = ttk.Frame(self.results_paned)
+        self.results_paned.add(tree_frame, weight=3)
         
         # Create vertical scrollbar
         vsb = ttk.Scrollbar(tree_frame, orient="vertical")
@@ -1600,12 +2233,16 @@ class SQLDataFetcher:
         # Attach a horizontal scroll event to enable column virtualization
         self.results_tree.bind("<Shift-MouseWheel>", self.handle_horizontal_scroll)
         
+        # Double-click shows a cell's full value
+        self.results_tree.bind("<Double-1>", self.open_cell)
+        
         # Export frame with additional options
         export_frame = ttk.Frame(tab)
         export_frame.pack(fill=tk.X, padx=10, pady=10)
         
         ttk.Button(export_frame, text="Export to CSV", command=self.export_to_csv).pack(side=tk.LEFT, padx=5)
         ttk.Button(export_frame, text="Export to Excel", command=self.export_to_excel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(export_frame, text="Export to Parquet", command=self.export_to_parquet).pack(side=tk.LEFT, padx=5)
         
         # Add column optimization buttons
         ttk.Button(
@@ -1614,8 +2251,155 @@ class SQLDataFetcher:
             command=self.optimize_column_widths
         ).pack(side=tk.LEFT, padx=20)
         
+        # Column statistics side panel
+        ttk.Button(export_frame, text="Profile Results", command=self.profile_results).pack(side=tk.LEFT, padx=5)
+        self.profile_frame = None
+        self.profile_thread = None
+        # The store the profiler is reading, and whether it has finished with it
+        self.profile_job = None
+        
         # Add a button to reset column order
         ttk.Button(export_frame, text="Reset Column Order", command=self.reset_column_order).pack(side=tk.RIGHT, padx=5)
+        
+        # Page navigation for the paged browse mode
+        page_frame = ttk.Frame(tab)
+        page_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.prev_page_btn = ttk.Button(page_frame, text="< Previous Page", command=self.show_previous_page, state=tk.DISABLED)
+        self.prev_page_btn.pack(side=tk.LEFT, padx=5)
+        self.next_page_btn = ttk.Button(page_frame, text="Next Page >", command=self.show_next_page, state=tk.DISABLED)
+        self.next_page_btn.pack(side=tk.LEFT, padx=5)
+        self.page_var = tk.StringVar(value="")
+        ttk.Label(page_frame, textvariable=self.page_var).pack(side=tk.LEFT, padx=10)
+
+    def profile_results(self):
+        """Compute column statistics for the current results on a background thread"""
+        if not hasattr(self, 'result_data') or not self.result_data or not self.result_data["data"]:
+            messagebox.showwarning("No Data", "There is no data to profile!")
+            return
+        
+        if self.profile_thread and self.profile_thread.is_alive():
+            self.status_var.set("Profiling already in progress...")
+            return
+        
+        columns = list(self.result_data["columns"])
+        rows = self.result_data["data"]
+        progress = {"done": 0, "total": len(rows)}
+        outcome = {}
+        job = {"store": rows, "cancel": threading.Event(), "lock": threading.Lock(), "done": False, "close": False}
+        self.profile_job = job
+        
+        def work():
+            try:
+                outcome["profiles"] = profile_result(
+                    columns, rows,
+                    progress=lambda done, total: progress.update(done=done),
+                    cancel=job["cancel"])
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                # A store replaced while it was being read is closed here, once nothing reads it
+                with job["lock"]:
+                    job["done"] = True
+                    if job["close"]:
+                        rows.close()
+        
+        self.status_var.set("Profiling results...")
+        self.profile_thread = threading.Thread(target=work, daemon=True)
+        self.profile_thread.start()
+        self.root.after(100, lambda: self.poll_profile(progress, outcome))
+
+    def poll_profile(self, progress, outcome):
+        """Check on the profiling worker from the Tk event loop"""
+        if self.profile_thread and self.profile_thread.is_alive():
+            self.status_var.set(f"Profiling rows: {progress['done']:,}/{progress['total']:,}")
+            self.root.after(100, lambda: self.poll_profile(progress, outcome))
+            return
+        
+        if "error" in outcome:
+            self.status_var.set("Profiling failed")
+            messagebox.showerror("Profiling Failed", str(outcome["error"]))
+            return
+        
+        if outcome.get("profiles") is None:
+            self.status_var.set("Profiling canceled - the results were replaced")
+            return
+        
+        profiles = outcome["profiles"]
+        self.show_profile_panel(profiles)
+        self.status_var.set(f"Profiled {len(profiles)} columns")
+
+    def show_profile_panel(self, profiles):
+        """Show column statistics in a side panel next to the results grid"""
+        if self.profile_frame is None:
+            self.profile_frame = ttk.LabelFrame(self.results_paned, text="Column Profile")
+            
+            stats_columns = ("nulls", "distinct", "min", "max")
+            self.profile_tree = ttk.Treeview(self.profile_frame, columns=stats_columns, height=12)
+            self.profile_tree.heading("#0", text="Column")
+            self.profile_tree.column("#0", width=140)
+            for col, width in zip(stats_columns, (60, 70, 90, 90)):
+                self.profile_tree.heading(col, text=col.capitalize())
+                self.profile_tree.column(col, width=width)
+            self.profile_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.profile_tree.bind("<<TreeviewSelect>>", self.show_profile_details)
+            
+            self.profile_details = scrolledtext.ScrolledText(self.profile_frame, wrap=tk.WORD, width=40, height=12)
+            self.profile_details.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            
+            ttk.Button(self.profile_frame, text="Close", command=self.close_profile_panel).pack(pady=5)
+        
+        if str(self.profile_frame) not in [str(p) for p in self.results_paned.panes()]:
+            self.results_paned.add(self.profile_frame, weight=1)
+        
+        # Kept by position: a join can return several columns with the same name
+        self.profiles = list(profiles)
+        self.profile_tree.delete(*self.profile_tree.get_children())
+        for i, p in enumerate(profiles):
+            distinct = f"~{p['distinct']}" if p["approximate"] else str(p["distinct"])
+            self.profile_tree.insert("", tk.END, iid=str(i), text=p["column"], values=(
+                p["nulls"], distinct, format_value(p["min"], 20), format_value(p["max"], 20)))
+        self.profile_details.delete(1.0, tk.END)
+
+    def show_profile_details(self, event=None):
+        """Show top values, quantiles and histogram for the selected profiled column"""
+        selection = self.profile_tree.selection()
+        if not selection:
+            return
+        index = int(selection[0])
+        if index >= len(self.profiles):
+            return
+        p = self.profiles[index]
+        
+        lines = [f"{p['column']} ({p['type']})",
+                 f"Rows: {p['count']}   Nulls: {p['nulls']}",
+                 f"Distinct: {'~' if p['approximate'] else ''}{p['distinct']}",
+                 f"Min: {format_value(p['min'])}",
+                 f"Max: {format_value(p['max'])}"]
+        
+        if p["top"]:
+            lines.append("\nTop values:")
+            for value, count in p["top"]:
+                lines.append(f"  {format_value(value)}: {'~' if p['approximate'] else ''}{count}")
+        
+        if p["quantiles"]:
+            lines.append("\nQuantiles" + (" (sampled)" if p["approximate"] else "") + ":")
+            for q, value in p["quantiles"].items():
+                lines.append(f"  p{int(q * 100)}: {format_value(value)}")
+        
+        if p["histogram"]:
+            lines.append("\nHistogram:")
+            peak = max(count for _, _, count in p["histogram"]) or 1
+            for low, high, count in p["histogram"]:
+                bar = "#" * int(20 * count / peak)
+                lines.append(f"  {low:>10.4g} - {high:<10.4g} {bar} {count}")
+        
+        self.profile_details.delete(1.0, tk.END)
+        self.profile_details.insert(tk.END, "\n".join(lines))
+
+    def close_profile_panel(self):
+        if self.profile_frame is not None and str(self.profile_frame) in [str(p) for p in self.results_paned.panes()]:
+            self.results_paned.forget(self.profile_frame)
 
     def handle_horizontal_scroll(self, event):
         """
@@ -1639,43 +2423,25 @@ class SQLDataFetcher:
         self.status_var.set("Optimizing column widths...")
         self.root.update_idletasks()
         
-        # Get sample data for width calculation
-        visible_items = self.results_tree.get_children()[:20]  # Sample up to 20 visible rows
-        
-        # Process columns in batches
-        batch_size = 30
-        for i in range(0, len(columns), batch_size):
-            batch_end = min(i + batch_size, len(columns))
-            
-            for j in range(i, batch_end):
-                col = columns[j]
-                col_name = self.results_tree.heading(col, "text")
-                
-                # Start with column name width + padding
-                max_width = len(col_name) * 8 + 20
-                
-                # Check sample values
-                for item_id in visible_items:
-                    values = self.results_tree.item(item_id, "values")
-                    if j < len(values):
-                        val_str = str(values[j])
-                        # Limit max width to prevent huge columns
-                        val_width = min(300, len(val_str) * 7 + 10)
-                        max_width = max(max_width, val_width)
-                
-                # Set reasonable min/max
-                width = max(50, min(300, max_width))
-                self.results_tree.column(col, width=width)
-            
-            # Update UI periodically
-            if i % batch_size == 0 and i > 0:
-                self.root.update_idletasks()
-                self.status_var.set(f"Optimizing widths: {i}/{len(columns)} columns")
+        # All columns at once, from rows sampled across the whole result
+        widths = self.get_width_engine().widths(self.result_data["columns"][:len(columns)],
+                                                self.result_data["data"].sample(SAMPLE_ROWS))
+        for col, width in zip(columns, widths):
+            self.results_tree.column(col, width=width)
         
         # Restore cursor and update status
         self.root.config(cursor="")
         self.status_var.set("Column widths optimized")
 
+    def get_width_engine(self):
+        """Width engine using the results grid's cell and heading fonts"""
+        if self.width_engine is None:
+            style = ttk.Style()
+            cell_font = style.lookup("Treeview", "font") or "TkDefaultFont"
+            heading_font = style.lookup("Treeview.Heading", "font") or "TkHeadingFont"
+            self.width_engine = WidthEngine(tkfont.Font(font=cell_font), tkfont.Font(font=heading_font))
+        return self.width_engine
+
     def reset_column_order(self):
         """Reset columns to their original order"""
         if not hasattr(self, 'result_data') or not self.result_data:
@@ -1686,38 +2452,16 @@ class SQLDataFetcher:
         self.status_var.set("Resetting column order...")
         self.root.update_idletasks()
         
-        # Get original column configuration
-        original_columns = list(self.result_data["columns"])
-        
-        # This approach is more efficient than recreating everything
-        # First, we'll create a mapping from current positions to original positions
-        current_columns = list(self.results_tree["columns"])
-        position_map = {}
-        
-        for orig_idx, col_name in enumerate(original_columns):
-            try:
-                curr_idx = current_columns.index(col_name)
-                position_map[curr_idx] = orig_idx
-            except ValueError:
-                # Column might not exist if columns were added/removed
-                pass
-        
-        # Now perform moves to restore original order
-        # We'll use a bubble-sort like approach to minimize moves
-        for i in range(len(current_columns)):
-            for j in range(len(current_columns)-1, i, -1):
-                if position_map.get(j-1, j-1) > position_map.get(j, j):
-                    # Swap columns j-1 and j
-                    self.move_column(j-1, j)
-                    # Update our mapping after the swap
-                    position_map[j-1], position_map[j] = position_map[j], position_map[j-1]
-                    
-                    # Allow UI to update
-                    if (j % 10 == 0):
-                        self.root.update_idletasks()
-        
-        # Restore original column ordering in result_data if necessary
-        self.result_data["columns"] = original_columns
+        # Move each column back to where the query returned it, left to right
+        store = self.result_data["data"]
+        for target_index in range(len(store.order)):
+            # store.order holds the fetched position of each displayed column
+            source_index = store.order.index(target_index)
+            if source_index != target_index:
+                self.move_column(source_index, target_index)
+                # Stop if the grid could not move it (columns beyond the displayed ones)
+                if store.order[target_index] != target_index:
+                    break
             
         # Restore cursor
         self.root.config(cursor="")
@@ -1757,6 +2501,15 @@ class SQLDataFetcher:
                         label="Move Last", 
                         command=lambda: self.move_column(column_index, len(columns) - 1))
                     
+                    # Sort the whole result, not just the rows in the grid
+                    self.column_menu.add_separator()
+                    self.column_menu.add_command(
+                        label="Sort Ascending",
+                        command=lambda: self.sort_results(column_index))
+                    self.column_menu.add_command(
+                        label="Sort Descending",
+                        command=lambda: self.sort_results(column_index, descending=True))
+                    
                     # Add optimize width option for this column
                     self.column_menu.add_separator()
                     self.column_menu.add_command(
@@ -1769,32 +2522,15 @@ class SQLDataFetcher:
     def optimize_single_column(self, column_index):
         """Optimize width for a single column"""
         columns = self.results_tree["columns"]
-        if column_index < 0 or column_index >= len(columns):
+        if column_index < 0 or column_index >= len(columns) or not self.result_data:
             return
-            
-        col = columns[column_index]
-        col_name = self.results_tree.heading(col, "text")
         
-        # Start with column name width + padding
-        max_width = len(col_name) * 8 + 20
-        
-        # Sample up to 20 rows for optimization
-        visible_items = self.results_tree.get_children()[:20]
-        
-        # Check sample values
-        for item_id in visible_items:
-            values = self.results_tree.item(item_id, "values")
-            if column_index < len(values):
-                val_str = str(values[column_index])
-                # Limit max width to prevent huge columns
-                val_width = min(300, len(val_str) * 7 + 10)
-                max_width = max(max_width, val_width)
-        
-        # Set reasonable min/max
-        width = max(50, min(300, max_width))
-        self.results_tree.column(col, width=width)
+        values = [row[column_index] for row in self.result_data["data"].sample(SAMPLE_ROWS)]
+        width = self.get_width_engine().column_width(self.result_data["columns"][column_index], values)
+        self.results_tree.column(columns[column_index], width=width)
 
-    def execute_query(self):
+    def execute_query(self, cursor=None):
+        """Run the query text and show the result; cursor replaces the live connection's, e.g. for a replay"""
         # Get the SQL query from the text area
         sql = self.query_text.get(1.0, tk.END).strip()
         
@@ -1802,9 +2538,52 @@ class SQLDataFetcher:
             messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
             return
         
-        if not self.active_conn or not self.active_cursor:
-            messagebox.showwarning("No Connection", "Please connect to a database first!")
-            return
+        # Queries over CSV tables run in the local engine
+        replay = cursor is not None
+        local = cursor is None and self.query_db_type == LOCAL_DB_TYPE
+        
+        # The unedited generated query runs with previews of its large-object columns
+        lob_preview = None
+        if not replay and not local and self.lob_preview and sql == self.generated_sql.strip():
+            lob_preview = self.lob_preview
+            sql = lob_preview["sql"]
+        hidden = lob_preview["hidden"] if lob_preview else 0
+        if local:
+            cursor = self.get_local_engine().cursor()
+        
+        display_cursor = None
+        arrow = False
+        if cursor is None:
+            if not self.active_conn or not self.active_cursor:
+                messagebox.showwarning("No Connection", "Please connect to a database first!")
+                return
+            cursor = self.active_cursor
+            if self.display_only.get():
+                with self.db_lock:
+                    display_cursor = cursor = DisplayCursor(self.active_conn, self.db_type.get())
+            else:
+                # SQL Server results come as Arrow batches when arrow-odbc is installed (recordings need the cursor),
+                # unless a column has no length limit and would be cut at the buffer size
+                arrow = (self.db_type.get() == "SQL Server" and self.main_settings is not None
+                         and not self.record_path and arrow_fetch.available())
+                if arrow:
+                    with self.db_lock:
+                        arrow = arrow_fetch.can_fetch(cursor, sql)
+        
+        # A pending recording captures this run
+        recorder = None
+        if self.record_path:
+            try:
+                recorder = RecordingCursor(cursor, self.record_path, self.db_type.get())
+            except OSError as e:
+                messagebox.showerror("Recording Failed", str(e))
+                return
+            cursor = recorder
+            self.record_path = None
+        
+        # A full execution replaces any paged browse in progress
+        self.build_tab(self.results_tab)
+        self.close_pager()
         
         try:
             # Reset status
@@ -1818,41 +2597,654 @@ class SQLDataFetcher:
             for item in self.results_tree.get_children():
                 self.results_tree.delete(item)
             
+            fetched = self.load_local_tables() if local else ""
+            
             # Execute query with timing
             start_time = datetime.datetime.now()
             
-            self.active_cursor.execute(sql)
-            
-            # Get column names before fetching data
-            column_names = [desc[0] for desc in self.active_cursor.description]
-            
-            # Check if result set is very large (many columns)
-            if len(column_names) > 100:
-                if not messagebox.askyesno("Large Result Set", 
-                                         f"This query returns {len(column_names)} columns which may cause the application to slow down.\n\n"
-                                         "Do you want to continue loading all columns?"):
+            if arrow:
+                reader = arrow_fetch.ArrowReader(self.main_settings, sql)
+                execute_ms = (datetime.datetime.now() - start_time).total_seconds() * 1000
+                column_names = reader.columns[:len(reader.columns) - hidden]
+                if not self.confirm_wide_result(column_names):
                     self.status_var.set("Query canceled - too many columns")
                     return
-            
-            # Configure treeview columns before fetching data - improves performance
-            self.setup_result_columns(column_names)
-            
-            # Fetch and display data in batches
-            self.fetch_and_display_data(self.active_cursor)
+                
+                self.setup_result_columns(column_names)
+                fetch_start = datetime.datetime.now()
+                self.display_batches(reader.columns, reader.column_batches(), columnar=True, hidden=hidden)
+                fetch_ms = (datetime.datetime.now() - fetch_start).total_seconds() * 1000
+            else:
+                with self.db_lock:
+                    # Display-only converters apply to the whole connection: they are installed by execute
+                    # and removed by close, so both happen before anyone else can use it
+                    try:
+                        cursor.execute(sql)
+                        execute_ms = (datetime.datetime.now() - start_time).total_seconds() * 1000
+                        
+                        # Get column names before fetching data; the hidden large-object keys are not shown
+                        column_names = [desc[0] for desc in cursor.description]
+                        column_names = column_names[:len(column_names) - hidden]
+                        
+                        if not self.confirm_wide_result(column_names):
+                            # Discard the pending result so the connection stays usable
+                            discard_result(cursor, None if (local or replay) else self.active_conn)
+                            self.status_var.set("Query canceled - too many columns")
+                            return
+                        
+                        # Configure treeview columns before fetching data - improves performance
+                        self.setup_result_columns(column_names)
+                        
+                        # Fetch and display data in batches
+                        fetch_start = datetime.datetime.now()
+                        self.fetch_and_display_data(cursor, hidden)
+                        fetch_ms = (datetime.datetime.now() - fetch_start).total_seconds() * 1000
+                        if display_cursor:
+                            # Numbers fetched as text still sort as numbers
+                            self.result_data["text_numbers"] = display_cursor.numeric_columns()
+                    finally:
+                        if display_cursor:
+                            display_cursor.close()
             
             # Calculate execution time
             end_time = datetime.datetime.now()
             execution_time = (end_time - start_time).total_seconds() * 1000  # Convert to milliseconds
             
+            # Full large-object values are read back by key on the same connection
+            if lob_preview:
+                self.result_data["lobs"] = lob_preview["lobs"]
+                self.result_data["lob_conn"] = self.active_conn
+            
             # Update status
-            self.status_var.set("Query executed successfully")
+            status = "Query executed successfully" + (f" - {fetched}" if fetched else "")
+            if lob_preview:
+                names = ", ".join(lob["column"] for lob in lob_preview["lobs"])
+                status += (f" - {names} fetched as the first {LOB_PREVIEW_LENGTH} characters;"
+                           " double-click a cell for the full value")
+            self.status_var.set(status)
             self.rows_var.set(str(len(self.result_data["data"])) if hasattr(self, 'result_data') else "0")
             self.time_var.set(f"{execution_time:.2f} ms")
             
+            # Rows past the first grid page of a spilled result are reached with the page buttons
+            if self.result_spilled():
+                self.show_result_window()
+            
+            # Replays are not real runs, so they stay out of the history
+            if not replay:
+                connection = "Local CSV" if local else connection_label(self.main_settings or self.connection_settings())
+                self.record_history(sql, connection, execute_ms, fetch_ms)
+            
+        except Exception as e:
+            messagebox.showerror("Query Execution Failed", str(e))
+            self.status_var.set(f"Error: {str(e)[:50]}...")
+        finally:
+            if recorder:
+                recorder.finish()
+            if display_cursor:
+                with self.db_lock:
+                    display_cursor.close()
+
+    def confirm_wide_result(self, column_names):
+        """Ask before loading a result with very many columns"""
+        if len(column_names) <= 100:
+            return True
+        return messagebox.askyesno("Large Result Set", 
+                                   f"This query returns {len(column_names)} columns which may cause the application to slow down.\n\n"
+                                   "Do you want to continue loading all columns?")
+
+    def get_query_history(self):
+        if self.query_history is None:
+            self.query_history = QueryHistory()
+        return self.query_history
+
+    def record_history(self, sql, connection, execute_ms, fetch_ms):
+        """Add a run to the query history and warn in the status bar if it was unusually slow"""
+        store = self.result_data["data"]
+        try:
+            regression, baseline_ms = self.get_query_history().record(
+                sql, connection, len(store), store.size_bytes, execute_ms, fetch_ms)
+        except Exception as e:
+            # A broken history file must not get in the way of running queries
+            self.status_var.set(f"{self.status_var.get()} (not saved to history: {str(e)[:40]})")
+            return
+        if regression:
+            self.status_var.set(f"{self.status_var.get()} - slower than usual "
+                                f"({execute_ms + fetch_ms:,.0f} ms, typically {baseline_ms:,.0f} ms)")
+
+    def show_query_history(self):
+        """Window listing past query shapes with their timing trend, and the runs of the selected one"""
+        try:
+            history = self.get_query_history()
+            shapes = history.shapes()
+        except Exception as e:
+            messagebox.showerror("Query History", str(e))
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Query History")
+        window.geometry("1000x600")
+        
+        paned = ttk.PanedWindow(window, orient=tk.VERTICAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        shape_columns = ("connection", "runs", "median", "last", "trend", "flagged")
+        shape_tree = ttk.Treeview(paned, columns=shape_columns, height=10)
+        shape_tree.heading("#0", text="Query")
+        shape_tree.column("#0", width=360)
+        for col, width in zip(shape_columns, (200, 50, 80, 80, 140, 60)):
+            shape_tree.heading(col, text=col.capitalize())
+            shape_tree.column(col, width=width)
+        shape_tree.tag_configure("regression", background="#ffd6d6")
+        paned.add(shape_tree, weight=1)
+        
+        run_columns = ("started", "rows", "bytes", "execute", "fetch", "total", "flag")
+        run_tree = ttk.Treeview(paned, columns=run_columns, show="headings", height=10)
+        for col, width in zip(run_columns, (150, 80, 90, 90, 90, 90, 100)):
+            run_tree.heading(col, text=col.capitalize())
+            run_tree.column(col, width=width)
+        run_tree.tag_configure("regression", background="#ffd6d6")
+        paned.add(run_tree, weight=1)
+        
+        keys = {}
+        for shape in shapes:
+            item = shape_tree.insert("", tk.END, text=shape["normalized"][:200], values=(
+                shape["connection"], shape["runs"], f"{shape['median_ms']:,.0f} ms", f"{shape['last_ms']:,.0f} ms",
+                sparkline(shape["trend"]), shape["regressions"] or ""),
+                tags=("regression",) if shape["regressions"] else ())
+            keys[item] = (shape["shape"], shape["connection"])
+        
+        def show_runs(event=None):
+            selection = shape_tree.selection()
+            if not selection:
+                return
+            run_tree.delete(*run_tree.get_children())
+            for run in reversed(history.runs(*keys[selection[0]])):
+                run_tree.insert("", tk.END, values=(
+                    run["started"], run["rows"], f"{(run['bytes'] or 0) / 1024:,.0f} KB",
+                    f"{run['execute_ms']:,.0f} ms", f"{run['fetch_ms']:,.0f} ms", f"{run['total_ms']:,.0f} ms",
+                    "slower" if run["regression"] else ""),
+                    tags=("regression",) if run["regression"] else ())
+        
+        shape_tree.bind("<<TreeviewSelect>>", show_runs)
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        def clear_history():
+            if messagebox.askyesno("Query History", "Delete all recorded runs?", parent=window):
+                history.clear()
+                shape_tree.delete(*shape_tree.get_children())
+                run_tree.delete(*run_tree.get_children())
+        
+        ttk.Button(button_frame, text="Clear History", command=clear_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def fan_out_query(self):
+        """Run the query text on several databases at once and show the combined rows"""
+        sql = self.query_text.get(1.0, tk.END).strip()
+        if not sql:
+            messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
+            return
+        if not self.main_settings:
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        text = simpledialog.askstring("Run on Many Databases",
+                                      "Databases, separated by commas (server/database for other servers).\n"
+                                      "The login of the current connection is used for all of them:",
+                                      parent=self.root)
+        if not text:
+            return
+        targets = parse_targets(text, self.main_settings)
+        if not targets:
+            return
+        workers = simpledialog.askinteger("Run on Many Databases", "Databases queried at the same time:",
+                                          initialvalue=min(DEFAULT_WORKERS, len(targets)), minvalue=1, maxvalue=64,
+                                          parent=self.root)
+        if not workers:
+            return
+        
+        self.build_tab(self.results_tab)
+        self.close_pager()
+        
+        try:
+            self.status_var.set(f"Running on {len(targets)} databases...")
+            self.rows_var.set("0")
+            self.results_tree.delete(*self.results_tree.get_children())
+            self.root.update_idletasks()
+            
+            start_time = datetime.datetime.now()
+            fan = FanOut(targets, sql, workers=workers)
+            self.setup_result_columns(fan.columns)
+            self.display_batches(fan.columns, fan.batches())
+            execution_time = (datetime.datetime.now() - start_time).total_seconds() * 1000
+            
+            self.rows_var.set(str(len(self.result_data["data"])))
+            self.time_var.set(f"{execution_time:.2f} ms")
+            if self.result_spilled():
+                self.show_result_window()
+            
+            failed = fan.failed
+            partial = fan.partial
+            self.status_var.set(f"Ran on {len(targets) - len(failed)} of {len(targets)} databases"
+                                + (f", {len(failed)} failed" if failed else "")
+                                + (f" - incomplete rows from {', '.join(r['source'] for r in partial)}"
+                                   if partial else ""))
+            show = messagebox.showwarning if failed else messagebox.showinfo
+            show("Run on Many Databases", describe_summary(fan.summary))
+        except Exception as e:
+            messagebox.showerror("Query Execution Failed", str(e))
+            self.status_var.set(f"Error: {str(e)[:50]}...")
+
+    def record_next_run(self):
+        """Record the next Execute Query run - description, batches and timings - to a file"""
+        if not self.active_conn:
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            defaultextension=".sqlrec",
+            filetypes=[("Query recordings", "*.sqlrec"), ("All files", "*.*")],
+            title="Record Next Run"
+        )
+        if not path:
+            return
+        
+        self.record_path = path
+        self.build_tab(self.results_tab)
+        self.status_var.set(f"The next executed query will be recorded to {path}")
+
+    def replay_recording(self):
+        """Show a recorded run in the Results grid as if it came from the server"""
+        path = filedialog.askopenfilename(
+            filetypes=[("Query recordings", "*.sqlrec"), ("All files", "*.*")],
+            title="Replay Recording"
+        )
+        if not path:
+            return
+        
+        latency = messagebox.askyesno("Replay Recording",
+                                      "Reproduce the original query and fetch timings?\n\n"
+                                      "Choose No to replay as fast as possible.")
+        try:
+            conn = ReplayConnection(path, latency=latency)
+        except Exception as e:
+            messagebox.showerror("Replay Failed", f"Could not read the recording:\n{str(e)}")
+            return
+        if not conn.executions:
+            messagebox.showwarning("Replay Recording", "The recording does not contain a query.")
+            return
+        
+        # Show the recorded SQL so the replay reads like the original run
+        self.build_tab(self.query_tab)
+        self.query_text.delete(1.0, tk.END)
+        self.query_text.insert(tk.END, conn.executions[0]["sql"])
+        self.execute_query(cursor=conn.cursor())
+        self.notebook.select(self.results_tab)
+
+    def get_keyset_keys(self):
+        """Return the (expression, direction) seek keys for the last generated query"""
+        db_type = self.query_db_type
+        keys = list(self.query_parts["order_by"])
+        seen = set(expr for expr, _ in keys)
+        
+        # Tie-break on columns that make the ordering unique so no row is skipped
+        # between pages: the GROUP BY columns for grouped queries, otherwise the
+        # primary key of every table in the query, since a join can repeat a
+        # row of one table many times
+        if self.query_parts["group_by"]:
+            tie_breakers = list(self.query_parts["group_by"])
+        else:
+            tables = self.query_spec["tables"]
+            missing = [table for table in tables if not self.primary_keys.get(table)]
+            if missing:
+                raise QueryBuildError("No Paging Key",
+                                      f"{', '.join(missing)} has no primary key, so rows with the same ORDER BY values "
+                                      "can't be told apart and some would be skipped between pages.\n\n"
+                                      "Use Execute Query instead (large results are kept on disk).")
+            tie_breakers = [format_column(f"{table}.{col}", db_type)
+                            for table in tables for col in self.primary_keys[table]]
+        
+        direction = keys[-1][1] if keys else "ASC"
+        for expr in tie_breakers:
+            if expr not in seen:
+                keys.append((expr, direction))
+                seen.add(expr)
+        return keys
+
+    def close_pager(self):
+        """Leave paged browse mode, stopping any background prefetch"""
+        if self.pager:
+            self.pager.close()
+            self.pager = None
+        if not self.tab_built(self.results_tab):
+            return
+        self.page_var.set("")
+        self.prev_page_btn.configure(state=tk.DISABLED)
+        self.next_page_btn.configure(state=tk.DISABLED)
+
+    def browse_in_pages(self):
+        """Browse the generated query one page at a time using keyset pagination"""
+        if not self.query_parts:
+            messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
+            return
+        
+        if not self.query_connection():
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        # Paging rebuilds the query from its parts, so hand edits to the SQL text are not used
+        sql = self.query_text.get(1.0, tk.END).strip()
+        if sql != self.generated_sql.strip():
+            if not messagebox.askyesno("Query Edited",
+                                       "The SQL text was edited after it was generated.\n\n"
+                                       "Paged browsing uses the generated query. Continue?"):
+                return
+        
+        try:
+            page_size = int(self.page_size.get())
+            if page_size <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Page Size", "Page size must be a positive whole number")
+            return
+        
+        try:
+            keys = self.get_keyset_keys()
+        except QueryBuildError as e:
+            messagebox.showwarning(e.title, e.message)
+            return
+        if not keys:
+            messagebox.showwarning("No Paging Key",
+                                   "Paged browsing needs an ORDER BY column or a table with a primary key.\n\n"
+                                   "Add an ORDER BY column on the Operations tab and generate the query again.")
+            return
+        
+        self.build_tab(self.results_tab)
+        self.close_pager()
+        
+        try:
+            if self.query_db_type == LOCAL_DB_TYPE:
+                self.load_local_tables()
+            
+            self.status_var.set("Fetching first page...")
+            self.root.update_idletasks()
+            
+            start_time = datetime.datetime.now()
+            self.pager = KeysetPager(self.query_connection(), self.query_parts, keys, self.query_db_type,
+                                     page_size=page_size, lock=self.db_lock)
+            self.pager.first_page()
+            execution_time = (datetime.datetime.now() - start_time).total_seconds() * 1000
+            
+            self.setup_result_columns(self.pager.columns)
+            self.show_current_page()
+            self.time_var.set(f"{execution_time:.2f} ms")
         except Exception as e:
+            self.close_pager()
             messagebox.showerror("Query Execution Failed", str(e))
             self.status_var.set(f"Error: {str(e)[:50]}...")
 
+    def parallel_export(self):
+        """Export the generated query to CSV over several connections, one key range each"""
+        if not self.query_parts:
+            messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
+            return
+        
+        if self.query_db_type == LOCAL_DB_TYPE:
+            messagebox.showinfo("Local Query", "This export reads from the server; use Export to CSV for queries over CSV tables.")
+            return
+        
+        if not self.active_conn:
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        default_column = choose_partition_column(self.selected_tables, self.primary_keys, self.column_types)
+        column = simpledialog.askstring(
+            "Parallel Export", "Split on which numeric or date column? (table.column)",
+            initialvalue=default_column or "", parent=self.root)
+        if not column:
+            return
+        column = column.strip()
+        
+        table, _, col_name = column.partition(".")
+        try:
+            check_partition_type(column, self.column_types.get(table, {}).get(col_name))
+        except QueryBuildError as e:
+            messagebox.showwarning(e.title, e.message)
+            return
+        
+        partitions = simpledialog.askinteger("Parallel Export", "Number of connections:",
+                                             initialvalue=4, minvalue=2, maxvalue=32, parent=self.root)
+        if not partitions:
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz *.csv.zst"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        merge = messagebox.askyesno("Parallel Export", "Merge the ranges into a single file?\n\n"
+                                                       f"The merged file is in {column} order, range by range, "
+                                                       "not in the query's ORDER BY.\n\n"
+                                                       "Choose No to keep one file per range.")
+        
+        # The main connection's settings: the Connect tab may show another server since connecting
+        settings = self.main_settings
+        db_type = settings["db_type"]
+        parts = dict(self.query_parts)
+        key = format_column(column, db_type)
+        
+        def finish(results):
+            total = sum(r["rows"] for r in results)
+            details = "\n".join(f"Range {i + 1}: {r['rows']} rows in {r['seconds']:.1f}s" for i, r in enumerate(results))
+            files = sorted(set(r["path"] for r in results))
+            self.status_var.set(f"Parallel export finished: {total} rows")
+            messagebox.showinfo("Export Success", f"Exported {total} rows to {len(files)} file(s):\n{files[0]}\n\n{details}")
+        
+        self.start_export_job(
+            "Parallel export",
+            lambda progress: extract_parallel(settings, parts, key, db_type, file_path,
+                                              partitions=partitions, merge=merge, progress=progress,
+                                              column=column),
+            finish)
+
+    def incremental_export(self):
+        """Export only the rows past the watermark stored by the previous run of this query"""
+        if not self.query_parts:
+            messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
+            return
+        
+        if self.query_db_type == LOCAL_DB_TYPE:
+            messagebox.showinfo("Local Query", "This export reads from the server; use Export to CSV for queries over CSV tables.")
+            return
+        
+        if not self.active_conn:
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        default_column = choose_partition_column(self.selected_tables, self.primary_keys, self.column_types)
+        column = simpledialog.askstring(
+            "Incremental Export", "Watermark column - an increasing id or updated_at column (table.column):",
+            initialvalue=default_column or "", parent=self.root)
+        if not column:
+            return
+        column = column.strip()
+        
+        file_path = filedialog.asksaveasfilename(
+            title="Append to",
+            defaultextension=".csv",
+            confirmoverwrite=False,
+            filetypes=[("CSV files", "*.csv"), ("Parquet part files", "*.parquet"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        # The main connection's settings, which also key the stored watermark; the Connect tab
+        # may show another server since connecting
+        settings = self.main_settings
+        db_type = settings["db_type"]
+        parts = dict(self.query_parts)
+        key = format_column(column, db_type)
+        
+        def work(progress):
+            # Runs on its own connection so the UI's connection stays free
+            conn = open_connection(settings)
+            try:
+                return extract_incremental(conn, settings, parts, key, db_type, file_path, progress=progress)
+            finally:
+                conn.close()
+        
+        def finish(result):
+            since = "the first run" if result["previous"] is None else f"{column} > {result['previous']}"
+            self.status_var.set(f"Incremental export finished: {result['rows']} new rows")
+            messagebox.showinfo("Export Success",
+                                f"Exported {result['rows']} rows ({since}) to {file_path}\n\n"
+                                f"The next run starts after {result['watermark']}.")
+        
+        self.start_export_job("Incremental export", work, finish)
+
+    def copy_to_table(self):
+        """Bulk-load the query's result into an existing table of the main or an attached database"""
+        sql = self.query_text.get(1.0, tk.END).strip()
+        if not sql:
+            messagebox.showwarning("Empty Query", "Please generate a SQL query first!")
+            return
+        
+        if self.query_db_type == LOCAL_DB_TYPE:
+            messagebox.showinfo("Local Query", "Copying reads from the server; queries over CSV tables can't be copied.")
+            return
+        
+        if not self.main_settings:
+            messagebox.showwarning("No Connection", "Please connect to a database first!")
+            return
+        
+        destinations = {"main": self.main_settings}
+        destinations.update((name, source["settings"]) for name, source in self.attached_sources.items())
+        destination = "main"
+        if len(destinations) > 1:
+            destination = simpledialog.askstring(
+                "Copy Results to Table",
+                "Copy into which database? (main, or an attached source: " + ", ".join(self.attached_sources) + ")",
+                initialvalue="main", parent=self.root)
+            if not destination:
+                return
+            destination = destination.strip()
+            if destination not in destinations:
+                messagebox.showwarning("Copy Results to Table", f"There is no source named {destination}.")
+                return
+        
+        table = simpledialog.askstring("Copy Results to Table",
+                                       "Existing table to insert into (its columns must be named like the result's):",
+                                       parent=self.root)
+        if not table:
+            return
+        batch_size = simpledialog.askinteger("Copy Results to Table", "Rows per insert batch:",
+                                             initialvalue=DEFAULT_BATCH_ROWS, minvalue=1, maxvalue=1000000,
+                                             parent=self.root)
+        if not batch_size:
+            return
+        
+        source_settings = dict(self.main_settings)
+        dest_settings = dict(destinations[destination])
+        table = table.strip()
+        
+        def work(progress):
+            return copy_query(source_settings, sql, dest_settings, table, batch_size=batch_size, progress=progress)
+        
+        def finish(result):
+            rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+            self.status_var.set(f"Copied {result['rows']} rows to {table}")
+            messagebox.showinfo("Copy Complete",
+                                f"Copied {result['rows']} rows into {table} ({destination}) "
+                                f"in {result['seconds']:.1f}s ({rate:,.0f} rows/s).\n\n"
+                                f"Inserting took {result['write_seconds']:.1f}s of that.")
+        
+        self.start_export_job("Copying to table", work, finish)
+
+    def start_export_job(self, label, work, finish):
+        """Run work(progress) on a background thread, then call finish(result) on the UI thread"""
+        progress = {"rows": 0}
+        outcome = {}
+        
+        def run():
+            try:
+                outcome["result"] = work(lambda done: progress.update(rows=done))
+            except Exception as e:
+                outcome["error"] = e
+        
+        self.build_tab(self.results_tab)
+        self.status_var.set(f"{label}...")
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.root.after(200, lambda: self.poll_export_job(label, thread, progress, outcome, finish))
+
+    def poll_export_job(self, label, thread, progress, outcome, finish):
+        """Check on a background export from the Tk event loop"""
+        if thread.is_alive():
+            self.status_var.set(f"{label}: {progress['rows']} rows...")
+            self.root.after(200, lambda: self.poll_export_job(label, thread, progress, outcome, finish))
+            return
+        
+        if "error" in outcome:
+            self.status_var.set(f"{label} failed")
+            messagebox.showerror("Export Failed", str(outcome["error"]))
+            return
+        
+        finish(outcome["result"])
+
+    def show_current_page(self):
+        """Display the pager's current page in the results grid"""
+        pager = self.pager
+        
+        # Only the current page is kept, so memory stays fixed per page
+        store = self.new_result_store(pager.columns, pager.rows)
+        self.result_data = {
+            "columns": store.columns,
+            "data": store
+        }
+        
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.display_batch(pager.rows, pager.page_index * pager.page_size)
+        
+        self.rows_var.set(str(len(pager.rows)))
+        self.page_var.set(f"Page {pager.page_index + 1}")
+        self.status_var.set(f"Showing page {pager.page_index + 1}" + ("" if pager.has_more else " (last page)"))
+        self.prev_page_btn.configure(state=tk.NORMAL if pager.page_index > 0 else tk.DISABLED)
+        self.next_page_btn.configure(state=tk.NORMAL if pager.has_more else tk.DISABLED)
+
+    def show_next_page(self):
+        if not self.pager and self.result_spilled():
+            self.move_result_window(SPILLED_GRID_ROWS)
+            return
+        self.change_page(self.pager.next_page if self.pager else None)
+
+    def show_previous_page(self):
+        if not self.pager and self.result_spilled():
+            self.move_result_window(-SPILLED_GRID_ROWS)
+            return
+        self.change_page(self.pager.previous_page if self.pager else None)
+
+    def change_page(self, move):
+        if move is None:
+            return
+        
+        try:
+            self.root.config(cursor="watch")
+            start_time = datetime.datetime.now()
+            if move():
+                execution_time = (datetime.datetime.now() - start_time).total_seconds() * 1000
+                # Re-apply the columns in case they were reordered on the previous page
+                self.setup_result_columns(self.pager.columns)
+                self.show_current_page()
+                self.time_var.set(f"{execution_time:.2f} ms")
+        except Exception as e:
+            messagebox.showerror("Query Execution Failed", str(e))
+            self.status_var.set(f"Error: {str(e)[:50]}...")
+        finally:
+            self.root.config(cursor="")
+
     def setup_result_columns(self, column_names):
         # For very large column sets, display only first 100 columns initially
         if len(column_names) >= 800:
@@ -1882,46 +3274,55 @@ class SQLDataFetcher:
         self.results_tree.configure(show="headings")
         self.root.update_idletasks()
 
-    def fetch_and_display_data(self, cursor):
+    def fetch_and_display_data(self, cursor, hidden=0):
         """
         Fetch data in smaller batches for large column counts.
         """
         # Fetch in smaller batches to avoid memory issues
-        column_count = len(cursor.description)
-        if column_count > 300:
-            batch_size = 50
-        else:
-            batch_size = 100
+        batch_size = default_batch_size(len(cursor.description))
+        self.display_batches([desc[0] for desc in cursor.description], fetch_batches(cursor, batch_size), hidden=hidden)
+
+    def display_batches(self, columns, batches, columnar=False, hidden=0):
+        """
+        Store and show the rows of a result arriving as an iterable of batches.
+        
+        With columnar, each batch is a list of column value lists instead of rows.
+        The last hidden columns are stored but not shown.
+        """
         total_rows = 0
-        results = []
+        shown = len(columns) - hidden
         
-        # Initialize result data structure to store data for future use
+        # Rows are kept for sorting and export; past the memory budget they go to a temporary file
+        store = self.new_result_store(columns, hidden=hidden)
         self.result_data = {
-            "columns": [desc[0] for desc in cursor.description],
-            "data": []
+            "columns": store.columns,
+            "data": store
         }
+        trimmed = False
         
         # Inform user we're fetching data
         self.status_var.set("Fetching data...")
         self.root.update_idletasks()
         
         # Fetch and display in batches
-        more_data = True
-        while more_data:
-            # Fetch next batch
-            batch = cursor.fetchmany(batch_size)
-            if not batch:
-                more_data = False
-                continue
-                
-            # Convert batch to list of lists for easier manipulation
-            batch_as_lists = [list(row) for row in batch]
-            
-            # Append to our stored data
-            self.result_data["data"].extend(batch_as_lists)
+        for batch in batches:
+            if columnar and store.spilled:
+                # Columns go to the spill file as they are; rows are only built for the grid
+                size = len(batch[0]) if batch else 0
+                store.extend_columns(batch)
+                if total_rows < SPILLED_GRID_ROWS:
+                    batch = list(zip(*(column[:SPILLED_GRID_ROWS - total_rows] for column in batch[:shown])))
+            else:
+                if columnar:
+                    batch = list(zip(*batch))
+                size = len(batch)
+                # Append to our stored data
+                store.extend(batch)
+                if hidden:
+                    batch = [row[:shown] for row in batch]
             
             # Update row count
-            total_rows += len(batch)
+            total_rows += size
             self.rows_var.set(str(total_rows))
             
             # Update status every few batches
@@ -1929,13 +3330,109 @@ class SQLDataFetcher:
                 self.status_var.set(f"Fetched {total_rows} rows...")
                 self.root.update_idletasks()
             
-            # Display this batch
-            self.display_batch(batch_as_lists, total_rows - len(batch))
+            # Display this batch; a spilled result only shows its first page in the grid
+            start_row = total_rows - size
+            if not store.spilled:
+                self.display_batch(batch, start_row)
+                continue
+            if not trimmed:
+                extra = self.results_tree.get_children()[SPILLED_GRID_ROWS:]
+                if extra:
+                    self.results_tree.delete(*extra)
+                trimmed = True
+            if start_row < SPILLED_GRID_ROWS:
+                self.display_batch(batch[:SPILLED_GRID_ROWS - start_row], start_row)
         
         # Final status update
-        self.status_var.set(f"Fetched {total_rows} rows total")
+        self.status_var.set(f"Fetched {total_rows} rows total" + (f", {store.describe()}" if store.spilled else ""))
         self.root.update_idletasks()
 
+    def new_result_store(self, columns, rows=None, hidden=0):
+        """Start a result store with the current memory budget, deleting the previous result's"""
+        try:
+            budget_mb = float(self.memory_budget_mb.get())
+        except ValueError:
+            budget_mb = DEFAULT_MEMORY_BUDGET_MB
+        
+        if self.result_data:
+            self.release_result_store(self.result_data["data"])
+        self.grid_start = 0
+        return ResultStore(columns, rows, memory_budget=int(budget_mb * 1024 * 1024), hidden=hidden)
+
+    def release_result_store(self, store):
+        """Close a replaced result store; if the profiler is still reading it, stop the profiler and let it close the store"""
+        job = self.profile_job
+        if job and job["store"] is store:
+            with job["lock"]:
+                if not job["done"]:
+                    job["cancel"].set()
+                    job["close"] = True
+                    return
+        store.close()
+
+    def result_spilled(self):
+        return bool(self.result_data) and self.result_data["data"].spilled
+
+    def show_result_window(self):
+        """Show the spilled result's rows from grid_start in the grid, read back from disk"""
+        store = self.result_data["data"]
+        end = min(len(store), self.grid_start + SPILLED_GRID_ROWS)
+        
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.display_batch(store[self.grid_start:end], self.grid_start)
+        
+        self.page_var.set(f"Rows {self.grid_start + 1:,}-{end:,} of {len(store):,} ({store.describe()})")
+        self.prev_page_btn.configure(state=tk.NORMAL if self.grid_start > 0 else tk.DISABLED)
+        self.next_page_btn.configure(state=tk.NORMAL if end < len(store) else tk.DISABLED)
+
+    def move_result_window(self, rows):
+        self.root.config(cursor="watch")
+        try:
+            self.grid_start = max(0, self.grid_start + rows)
+            self.show_result_window()
+        finally:
+            self.root.config(cursor="")
+
+    def redisplay_results(self):
+        """Fill the grid again from the result store, e.g. after sorting it"""
+        if self.result_spilled():
+            self.grid_start = 0
+            self.show_result_window()
+            return
+        
+        self.results_tree.delete(*self.results_tree.get_children())
+        start_row = 0
+        for batch in self.result_data["data"].iter_batches():
+            self.display_batch(batch, start_row)
+            start_row += len(batch)
+
+    def sort_results(self, column_index, descending=False):
+        """Sort the result rows by one column, on disk if the result has spilled"""
+        if not self.result_data or not self.result_data["data"]:
+            return
+        
+        # The profiler reads the rows on a worker thread; don't replace them underneath it
+        if self.profile_thread and self.profile_thread.is_alive():
+            self.status_var.set("Please wait for profiling to finish before sorting")
+            return
+        
+        self.root.config(cursor="watch")
+        self.status_var.set("Sorting results...")
+        self.root.update_idletasks()
+        try:
+            store = self.result_data["data"]
+            numeric = store.order[column_index] in self.result_data.get("text_numbers", ())
+            self.result_data["data"] = store.sorted_by(column_index, descending, decimal.Decimal if numeric else None)
+            store.close()
+            self.redisplay_results()
+            column = self.result_data["columns"][column_index]
+            self.status_var.set(f"Sorted by {column} {'descending' if descending else 'ascending'}")
+        except TypeError:
+            messagebox.showerror("Sort Failed", "This column holds values of different types that cannot be compared.")
+            self.status_var.set("Sort failed")
+        finally:
+            self.root.config(cursor="")
+
     def display_batch(self, batch, start_row):
         """
         Display data lazily, only formatting columns actually visible.
@@ -1944,7 +3441,10 @@ class SQLDataFetcher:
             # Convert any non-serializable types to strings
             formatted_row = []
             for val in row:
-                if val is None:
+                # Display-only fetches are already text
+                if type(val) is str:
+                    formatted_row.append(val)
+                elif val is None:
                     formatted_row.append("NULL")
                 elif isinstance(val, (datetime.date, datetime.datetime)):
                     formatted_row.append(val.isoformat())
@@ -1957,10 +3457,70 @@ class SQLDataFetcher:
         if len(batch) > 50:  # Only force updates for larger batches
             self.root.update_idletasks()
 
+    def open_cell(self, event):
+        """Show the full value of the double-clicked cell, reading a large-object value by key if it was previewed"""
+        if self.results_tree.identify_region(event.x, event.y) != "cell" or not self.result_data:
+            return
+        item = self.results_tree.identify_row(event.y)
+        column = self.results_tree.identify_column(event.x)
+        if not item or not column:
+            return
+        column_index = int(column[1:]) - 1
+        store = self.result_data["data"]
+        # The grid holds a window of a spilled result starting at grid_start
+        row_index = self.results_tree.index(item) + (self.grid_start if self.result_spilled() else 0)
+        if row_index >= len(store) or column_index >= len(store.order):
+            return
+        
+        row = store.raw_row(row_index)
+        position = store.order[column_index]
+        value = row[position]
+        lob = next((l for l in self.result_data.get("lobs", []) if l["position"] == position), None)
+        if lob:
+            if self.active_conn is None or self.active_conn is not self.result_data["lob_conn"]:
+                messagebox.showwarning("Not Connected", "The full value is read from the database the query ran on.\n\n"
+                                       "Reconnect and run the query again to open it.")
+                return
+            try:
+                with self.db_lock:
+                    value = fetch_full_value(self.active_cursor, row, lob, self.db_type.get())
+            except Exception as e:
+                messagebox.showerror("Read Failed", str(e))
+                return
+        
+        window = tk.Toplevel(self.root)
+        window.title(self.result_data["columns"][column_index])
+        window.geometry("700x500")
+        text = scrolledtext.ScrolledText(window, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        if value is None:
+            text.insert(tk.END, "NULL")
+        elif isinstance(value, (bytes, bytearray)):
+            text.insert(tk.END, f"{len(value):,} bytes\n\n{value.hex(' ')}")
+        else:
+            text.insert(tk.END, str(value))
+        text.configure(state=tk.DISABLED)
+
+    def export_rows(self):
+        """The result rows to export: previewed large-object values are read in full as the rows are written"""
+        store = self.result_data["data"]
+        lobs = self.result_data.get("lobs")
+        if not lobs:
+            return store
+        if self.active_conn is None or self.active_conn is not self.result_data["lob_conn"]:
+            raise RuntimeError("Large-object columns are read in full from the database the query ran on. "
+                               "Reconnect and run the query again to export them.")
+        return full_rows(store, lobs, self.active_cursor, self.db_type.get(), self.db_lock)
+
     def move_column(self, source_index, target_index):
         """Move a column from source to target position efficiently"""
         if not hasattr(self, 'result_data') or not self.result_data:
             return
+        
+        # The profiler reads the rows on a worker thread; don't reorder them underneath it
+        if self.profile_thread and self.profile_thread.is_alive():
+            self.status_var.set("Please wait for profiling to finish before moving columns")
+            return
             
         # Get column configurations
         columns = list(self.results_tree["columns"])
@@ -1987,9 +3547,10 @@ class SQLDataFetcher:
         column_to_move = columns.pop(source_index)
         columns.insert(target_index, column_to_move)
         
-        # Update the result data structure column list
+        # Update the result data structure column list; the stored rows are only re-indexed
         col_name = self.result_data["columns"].pop(source_index)
         self.result_data["columns"].insert(target_index, col_name)
+        self.result_data["data"].move_column(source_index, target_index)
         
         # Disable UI updates during reconfiguration
         self.root.config(cursor="watch")  # Show busy cursor
@@ -2011,12 +3572,6 @@ class SQLDataFetcher:
         # Clear current rows
         self.results_tree.delete(*self.results_tree.get_children())
         
-        # Update the underlying data to match new column order
-        for i, row in enumerate(self.result_data["data"]):
-            if source_index < len(row) and target_index < len(row):
-                val = row.pop(source_index)
-                row.insert(target_index, val)
-        
         # Temporarily hide treeview headers to reduce flicker
         self.results_tree.configure(show="tree")
         
@@ -2099,7 +3654,7 @@ class SQLDataFetcher:
         try:
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+                filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz *.csv.zst"), ("All files", "*.*")]
             )
             
             if not file_path:
@@ -2110,34 +3665,14 @@ class SQLDataFetcher:
             self.status_var.set("Exporting to CSV...")
             self.root.update_idletasks()
             
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Write header
-                writer.writerow(self.result_data["columns"])
-                
-                # Write data in batches
-                batch_size = 1000
-                for i in range(0, len(self.result_data["data"]), batch_size):
-                    batch_end = min(i + batch_size, len(self.result_data["data"]))
-                    for j in range(i, batch_end):
-                        row = self.result_data["data"][j]
-                        # Convert any non-serializable types to strings
-                        formatted_row = []
-                        for val in row:
-                            if val is None:
-                                formatted_row.append("")
-                            elif isinstance(val, (datetime.date, datetime.datetime)):
-                                formatted_row.append(val.isoformat())
-                            else:
-                                formatted_row.append(val)
-                        
-                        writer.writerow(formatted_row)
-                    
-                    # Update status occasionally for large datasets
-                    if i % 5000 == 0 and i > 0:
-                        self.status_var.set(f"Exporting to CSV: {i}/{len(self.result_data['data'])} rows...")
-                        self.root.update_idletasks()
+            total = len(self.result_data["data"])
+            
+            # Update status occasionally for large datasets
+            def progress(done):
+                self.status_var.set(f"Exporting to CSV: {done}/{total} rows...")
+                self.root.update_idletasks()
+            
+            write_csv(file_path, self.result_data["columns"], self.export_rows(), progress)
             
             # Restore cursor and show success message
             self.root.config(cursor="")
@@ -2155,12 +3690,12 @@ class SQLDataFetcher:
             return
         
         try:
-            # Check if pandas is available
-            if 'pandas' not in sys.modules:
+            # Check if an xlsx writer is available
+            if not (module_available("xlsxwriter") or module_available("openpyxl")):
                 messagebox.showinfo(
                     "Module Required", 
-                    "Exporting to Excel requires the pandas and openpyxl modules.\n"
-                    "Please install them with: pip install pandas openpyxl"
+                    "Exporting to Excel requires the xlsxwriter or openpyxl module.\n"
+                    "Please install one with: pip install xlsxwriter"
                 )
                 return
             
@@ -2177,45 +3712,14 @@ class SQLDataFetcher:
             self.status_var.set("Exporting to Excel...")
             self.root.update_idletasks()
             
-            # Convert data to DataFrame
-            # For large datasets, create DataFrame more efficiently
-            if len(self.result_data["data"]) > 10000:
-                # Process in chunks to avoid memory issues
-                chunk_size = 5000
-                dfs = []
-                
-                for i in range(0, len(self.result_data["data"]), chunk_size):
-                    end_idx = min(i + chunk_size, len(self.result_data["data"]))
-                    chunk = self.result_data["data"][i:end_idx]
-                    
-                    # Convert any non-serializable types
-                    processed_chunk = []
-                    for row in chunk:
-                        processed_row = []
-                        for val in row:
-                            if isinstance(val, (datetime.date, datetime.datetime)):
-                                processed_row.append(val.isoformat())
-                            else:
-                                processed_row.append(val)
-                        processed_chunk.append(processed_row)
-                    
-                    dfs.append(pd.DataFrame(processed_chunk, columns=self.result_data["columns"]))
-                    
-                    # Update status occasionally
-                    self.status_var.set(f"Processing data: {end_idx}/{len(self.result_data['data'])} rows...")
-                    self.root.update_idletasks()
-                
-                # Combine all chunks
-                df = pd.concat(dfs, ignore_index=True)
-            else:
-                # For smaller datasets, create DataFrame directly
-                df = pd.DataFrame(self.result_data["data"], columns=self.result_data["columns"])
+            total = len(self.result_data["data"])
             
-            # Export to Excel
-            self.status_var.set("Writing to Excel file...")
-            self.root.update_idletasks()
+            # Update status occasionally
+            def progress(done):
+                self.status_var.set(f"Exporting to Excel: {done}/{total} rows...")
+                self.root.update_idletasks()
             
-            df.to_excel(file_path, index=False)
+            write_excel(file_path, self.result_data["columns"], self.export_rows(), progress)
             
             # Restore cursor and show success message
             self.root.config(cursor="")
@@ -2226,6 +3730,49 @@ class SQLDataFetcher:
             self.root.config(cursor="")
             messagebox.showerror("Export Failed", str(e))
 
+    def export_to_parquet(self):
+        """Export query results to a Parquet file"""
+        if not hasattr(self, 'result_data') or not self.result_data:
+            messagebox.showwarning("No Data", "There is no data to export!")
+            return
+        
+        if not module_available("pyarrow"):
+            messagebox.showinfo(
+                "Module Required",
+                "Exporting to Parquet requires the pyarrow module.\n"
+                "Please install it with: pip install pyarrow"
+            )
+            return
+        
+        try:
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".parquet",
+                filetypes=[("Parquet files", "*.parquet"), ("All files", "*.*")]
+            )
+            
+            if not file_path:
+                return  # User canceled
+            
+            self.root.config(cursor="watch")
+            self.status_var.set("Exporting to Parquet...")
+            self.root.update_idletasks()
+            
+            total = len(self.result_data["data"])
+            
+            def progress(done):
+                self.status_var.set(f"Exporting to Parquet: {done}/{total} rows...")
+                self.root.update_idletasks()
+            
+            write_parquet(file_path, self.result_data["columns"], self.export_rows(), progress)
+            
+            self.root.config(cursor="")
+            self.status_var.set("Export complete")
+            messagebox.showinfo("Export Success", f"Data exported to {file_path}")
+            
+        except Exception as e:
+            self.root.config(cursor="")
+            messagebox.showerror("Export Failed", str(e))
+
     def __del__(self):
         # Cleanup database connections when app closes
         try:
@@ -2233,6 +3780,14 @@ class SQLDataFetcher:
                 self.active_cursor.close()
             if hasattr(self, 'active_conn') and self.active_conn:
                 self.active_conn.close()
+            if hasattr(self, 'local_engine') and self.local_engine:
+                self.local_engine.close()
+            if getattr(self, 'result_data', None):
+                self.result_data["data"].close()
+            if getattr(self, 'query_history', None):
+                self.query_history.close()
+            for source in getattr(self, 'attached_sources', {}).values():
+                source["conn"].close()
         except:
             pass
 
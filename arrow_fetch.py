@@ -0,0 +1,96 @@
+"""
+Columnar fetch for SQL Server through arrow-odbc.
+
+arrow-odbc binds ODBC column buffers and fills Arrow record batches in
+native code, so a result arrives a column at a time with no Python object
+per row. The batches go to a Parquet file as they are, and into the result
+store column by column; Python values are only built for the rows the grid
+shows and for the columns the store keeps in memory.
+
+It is optional (pip install arrow-odbc, which brings pyarrow); without it
+SQL Server results are fetched through pyodbc as before. Column buffers
+have a fixed size, so results with a column without a length limit
+(VARCHAR(MAX), VARBINARY(MAX), xml, text, ...) are fetched through pyodbc
+too rather than cut at the buffer size.
+"""
+import importlib.util
+
+from connections import sqlserver_connection_string
+
+# Rows per Arrow record batch
+ARROW_BATCH_ROWS = 10000
+# Upper bound for text and binary column buffers; every bounded SQL Server column fits
+MAX_TEXT_BYTES = 65536
+# Types sp_describe_first_result_set reports without a length limit (besides max_length -1)
+UNBOUNDED_TYPES = {"text", "ntext", "image", "xml"}
+
+
+def available():
+    """Whether the arrow-odbc backend is installed"""
+    try:
+        return importlib.util.find_spec("arrow_odbc") is not None
+    except ImportError:
+        return False
+
+
+def unbounded_columns(cursor, sql):
+    """
+    Names of the columns of sql's result that have no length limit, asked of the server without running sql.
+
+    None if the server can't describe the result (e.g. it uses temporary
+    tables); callers then treat it as having such columns.
+    """
+    try:
+        cursor.execute("EXEC sp_describe_first_result_set @tsql = ?", sql)
+        names = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+    except Exception:
+        return None
+    name, type_name, max_length = (names.index(n) for n in ("name", "system_type_name", "max_length"))
+    return [row[name] for row in rows
+            if row[max_length] == -1 or (row[type_name] or "").split("(")[0].lower() in UNBOUNDED_TYPES]
+
+
+def can_fetch(cursor, sql):
+    """Whether every column of sql's result fits the arrow-odbc buffers, so no value would be cut"""
+    return unbounded_columns(cursor, sql) == []
+
+
+class ArrowReader:
+    """Run sql on a fresh ODBC connection and iterate the result as pyarrow RecordBatches"""
+
+    def __init__(self, settings, sql, batch_size=ARROW_BATCH_ROWS):
+        from arrow_odbc import read_arrow_batches_from_odbc
+
+        self.reader = read_arrow_batches_from_odbc(
+            query=sql,
+            connection_string=sqlserver_connection_string(settings),
+            batch_size=batch_size,
+            max_text_size=MAX_TEXT_BYTES,
+            max_binary_size=MAX_TEXT_BYTES,
+        )
+        self.schema = self.reader.schema
+        self.columns = list(self.schema.names)
+
+    def __iter__(self):
+        return iter(self.reader)
+
+    def column_batches(self):
+        """Each batch as a list of per-column value lists"""
+        for batch in self:
+            if batch.num_rows:
+                yield [column.to_pylist() for column in batch.columns]
+
+
+def write_parquet_batches(path, reader, progress=None):
+    """Write a reader's record batches to a Parquet file unchanged. Returns the row count"""
+    import pyarrow.parquet as pq
+
+    count = 0
+    with pq.ParquetWriter(path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            count += batch.num_rows
+            if progress:
+                progress(count)
+    return count
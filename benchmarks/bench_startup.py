@@ -0,0 +1,87 @@
+"""
+Startup-time benchmark for the desktop app.
+
+Each run starts a fresh interpreter (so imports are cold for that process)
+and measures:
+  import_ms       - importing app.py and everything it imports at module level
+  first_paint_ms  - creating the window and processing its first redraw
+  all_tabs_ms     - building the tabs that are otherwise built on first view
+  heavy_modules   - which of pandas / pyodbc / mysql.connector got imported
+
+Results are printed as JSON (median over --runs):
+    python benchmarks/bench_startup.py --runs 5
+Without a display only the import time is measured.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "pyodbc", "mysql.connector")
+
+
+def measure():
+    """Run inside the child interpreter and return one set of timings"""
+    sys.path.insert(0, REPO_ROOT)
+    result = {}
+
+    start = time.perf_counter()
+    import app
+    result["import_ms"] = (time.perf_counter() - start) * 1000
+
+    import tkinter as tk
+    try:
+        start = time.perf_counter()
+        root = tk.Tk()
+        fetcher = app.SQLDataFetcher(root)
+        root.update()
+        result["first_paint_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for tab in list(fetcher.pending_tabs):
+            fetcher.build_tab(tab)
+        root.update()
+        result["all_tabs_ms"] = (time.perf_counter() - start) * 1000
+        root.destroy()
+    except tk.TclError as e:
+        result["display_error"] = str(e)
+
+    result["heavy_modules"] = [name for name in HEAVY_MODULES if name in sys.modules]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import and first-paint time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure()))
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = {"runs": args.runs, "python": sys.version.split()[0]}
+    for key in ("import_ms", "first_paint_ms", "all_tabs_ms"):
+        values = [r[key] for r in runs if key in r]
+        if values:
+            summary[key] = round(statistics.median(values), 1)
+    summary["heavy_modules"] = runs[-1]["heavy_modules"]
+    if "display_error" in runs[-1]:
+        summary["display_error"] = runs[-1]["display_error"]
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+Offline benchmark suite for the fetch, display and export paths.
+
+Runs against a local stand-in database (an in-process fake DB-API cursor or
+an SQLite file with the same synthetic rows) and measures, per case:
+  rows_per_sec   - throughput
+  peak_mb        - peak Python memory (tracemalloc, in a separate run)
+  max_block_ms   - longest stretch without an event-loop turn, i.e. how
+                   long the window would stop responding
+
+Cases: fetch (the app's fetch into a result store, without the grid),
+render (setup_result_columns + fetch_and_display_data), move (move_column
+first -> last), sort (sort_results on one column: ResultStore.sorted_by and
+the grid refill), csv and xlsx (the export writers).
+
+With a display the real Treeview is used; without one a stand-in grid
+records the same calls, so render/move measure the Python side only.
+
+--replay runs the cases on a result recorded from a real server (Record
+Next Run / headless --record) instead of synthetic rows.
+
+    python benchmarks/bench_suite.py --rows 20000 --shapes 300,250,200 --output run.json
+    python benchmarks/bench_suite.py --rows 20000 --compare baseline.json
+    python benchmarks/bench_suite.py --replay orders.sqlrec --cases render,csv
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import app
+from connections import default_batch_size, fetch_batches
+from exporters import write_csv, write_excel
+from fake_db import DEFAULT_MIX, SHAPES, FakeConnection, make_sqlite
+from replay import ReplayConnection
+
+CASES = ["fetch", "render", "move", "sort", "csv", "xlsx"]
+
+
+class Var:
+    """Stand-in for a Tk StringVar"""
+
+    def __init__(self, value=""):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class StandInRoot:
+    def update_idletasks(self):
+        pass
+
+    def update(self):
+        pass
+
+    def config(self, **options):
+        pass
+
+
+class StandInGrid:
+    """Records the Treeview calls the results grid makes, for runs without a display"""
+
+    def __init__(self):
+        self.options = {"columns": ()}
+        self.rows = {}
+        self.headings = {}
+        self.widths = {}
+        self._next_id = 0
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+    def __setitem__(self, key, value):
+        self.options[key] = tuple(value)
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def heading(self, col, option=None, **options):
+        if option:
+            return self.headings.get(col, col)
+        self.headings[col] = options.get("text", col)
+
+    def column(self, col, option=None, **options):
+        if option:
+            return self.widths.get(col, 100)
+        self.widths[col] = options.get("width", 100)
+
+    def insert(self, parent, index, values=(), tags=()):
+        self._next_id += 1
+        item = f"I{self._next_id}"
+        self.rows[item] = (tuple(values), tuple(tags))
+        return item
+
+    def item(self, item, option):
+        values, tags = self.rows[item]
+        return values if option == "values" else tags
+
+    def get_children(self, item=""):
+        return tuple(self.rows)
+
+    def delete(self, *items):
+        for item in items:
+            self.rows.pop(item, None)
+
+
+class StandInButton:
+    def configure(self, **options):
+        pass
+
+
+class UiClock:
+    """Longest gap between event-loop turns while a case runs"""
+
+    def __init__(self):
+        self.last = None
+        self.longest = 0.0
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.longest = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.longest = max(self.longest, now - self.last)
+        self.last = now
+
+    def stop(self):
+        self.tick()
+        return self.longest
+
+
+def make_fetcher(clock, memory_budget_mb=None):
+    """A results grid wired to the app's display methods, with event-loop turns timed"""
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+        root.withdraw()
+        tree = ttk.Treeview(root)
+    except Exception:
+        root = StandInRoot()
+        tree = StandInGrid()
+
+    # Every update/update_idletasks call is a point where the window can repaint
+    def timed(original):
+        def turn():
+            clock.tick()
+            original()
+        return turn
+
+    for name in ("update", "update_idletasks"):
+        setattr(root, name, timed(getattr(root, name)))
+
+    # The display methods only need the results widgets, not the whole window
+    fetcher = app.SQLDataFetcher.__new__(app.SQLDataFetcher)
+    fetcher.root = root
+    fetcher.results_tree = tree
+    fetcher.status_var = Var()
+    fetcher.rows_var = Var()
+    fetcher.profile_thread = None
+    fetcher.profile_job = None
+    fetcher.result_data = None
+    fetcher.memory_budget_mb = Var(str(memory_budget_mb or app.DEFAULT_MEMORY_BUDGET_MB))
+    fetcher.grid_start = 0
+    # Paging controls a spilled result shows its window with
+    fetcher.page_var = Var()
+    fetcher.prev_page_btn = StandInButton()
+    fetcher.next_page_btn = StandInButton()
+    return fetcher
+
+
+class Source:
+    """Executed cursors over the synthetic rows, from the fake driver or SQLite, or over a recorded result"""
+
+    def __init__(self, kind, rows, columns, mix, workdir, recording=None):
+        self.kind = kind
+        if kind == "replay":
+            self.replay = ReplayConnection(recording)
+        elif kind == "sqlite":
+            self.path = os.path.join(workdir, f"bench_{columns}.db")
+            make_sqlite(self.path, rows, columns, mix)
+        else:
+            self.fake = FakeConnection(rows, columns, mix)
+
+    def cursor(self):
+        if self.kind == "sqlite":
+            import sqlite3
+            cursor = sqlite3.connect(self.path).cursor()
+            cursor.execute("SELECT * FROM bench")
+        elif self.kind == "replay":
+            cursor = self.replay.cursor()
+            cursor.execute("")
+        else:
+            cursor = self.fake.cursor()
+            cursor.execute("SELECT * FROM bench")
+        return cursor
+
+    def rows(self):
+        cursor = self.cursor()
+        return [list(row) for batch in fetch_batches(cursor, 1000) for row in batch], \
+            [desc[0] for desc in cursor.description]
+
+
+def build_case(case, source, clock, workdir, memory_budget_mb=None):
+    """Return (setup, run): setup prepares fresh state, run(state) does the timed work and returns a row count"""
+    if case == "fetch":
+        def setup():
+            return make_fetcher(clock, memory_budget_mb), source.cursor()
+
+        def run(state):
+            # What fetch_and_display_data does, minus the grid: batches into the result store
+            fetcher, cursor = state
+            store = fetcher.new_result_store([desc[0] for desc in cursor.description])
+            for batch in fetch_batches(cursor, default_batch_size(len(cursor.description))):
+                store.extend(batch)
+            return len(store)
+        return setup, run
+
+    if case == "render":
+        def setup():
+            return make_fetcher(clock, memory_budget_mb), source.cursor()
+
+        def run(state):
+            fetcher, cursor = state
+            fetcher.setup_result_columns([desc[0] for desc in cursor.description])
+            fetcher.fetch_and_display_data(cursor)
+            return len(fetcher.result_data["data"])
+        return setup, run
+
+    def loaded():
+        fetcher = make_fetcher(clock, memory_budget_mb)
+        cursor = source.cursor()
+        fetcher.setup_result_columns([desc[0] for desc in cursor.description])
+        fetcher.fetch_and_display_data(cursor)
+        return fetcher
+
+    if case == "move":
+        def run(fetcher):
+            fetcher.move_column(0, len(fetcher.result_data["columns"]) - 1)
+            return len(fetcher.result_data["data"])
+        return loaded, run
+
+    if case == "sort":
+        def run(fetcher):
+            fetcher.sort_results(1)
+            return len(fetcher.result_data["data"])
+        return loaded, run
+
+    if case in ("csv", "xlsx"):
+        path = os.path.join(workdir, f"export.{case}")
+        writer = write_csv if case == "csv" else write_excel
+
+        def run(state):
+            rows, columns = state
+            # The export buttons let the window repaint on each progress report
+            return writer(path, columns, rows, progress=lambda done: clock.tick())
+        return source.rows, run
+
+    raise ValueError(f"Unknown case {case!r}")
+
+
+def measure(case, source, workdir, memory=True, memory_budget_mb=None):
+    """Time one case, then repeat it under tracemalloc for its peak memory"""
+    clock = UiClock()
+    setup, run = build_case(case, source, clock, workdir, memory_budget_mb)
+
+    state = setup()
+    clock.start()
+    start = time.perf_counter()
+    rows = run(state)
+    seconds = time.perf_counter() - start
+    blocked = clock.stop()
+
+    result = {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds) if seconds else None,
+        "max_block_ms": round(blocked * 1000, 1),
+    }
+
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        clock.start()
+        run(state)
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    return result
+
+
+def compare(baseline, current):
+    """Print throughput and memory ratios of matching cases between two runs"""
+    def key(r):
+        return (r["case"], r["columns"], r["source"])
+
+    old = {key(r): r for r in baseline["results"] if "rows_per_sec" in r}
+    print(f"{'case':8} {'cols':>5} {'source':7} {'rows/s':>12} {'speedup':>8} {'peak MB':>9} {'mem':>6}")
+    for r in current["results"]:
+        if "rows_per_sec" not in r:
+            continue
+        before = old.get(key(r))
+        speedup = mem = ""
+        if before and before.get("rows_per_sec") and r.get("rows_per_sec"):
+            speedup = f"{r['rows_per_sec'] / before['rows_per_sec']:.2f}x"
+        if before and before.get("peak_mb") and r.get("peak_mb"):
+            mem = f"{r['peak_mb'] / before['peak_mb']:.2f}x"
+        print(f"{r['case']:8} {r['columns']:>5} {r['source']:7} {r['rows_per_sec']:>12} {speedup:>8} "
+              f"{r.get('peak_mb', ''):>9} {mem:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fetch, display and export against a local stand-in database")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--shapes", default=",".join(str(c) for c in SHAPES.values()),
+                        help="comma-separated column counts (default: the 300/250/200 test tables)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"column type mix (default {DEFAULT_MIX})")
+    parser.add_argument("--source", choices=["fake", "sqlite"], default="fake")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="result store budget for render/move; lower it to benchmark spilling to disk")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="print ratios against an earlier run")
+    parser.add_argument("--replay", metavar="RECORDING", help="use a recorded result instead of synthetic rows")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "mix": args.mix,
+            "source": "replay" if args.replay else args.source,
+            "memory_budget_mb": args.memory_budget,
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.replay:
+            recording = ReplayConnection(args.replay)
+            shapes = [("replay", len(recording.executions[0]["description"]))]
+        else:
+            shapes = [(args.source, int(c)) for c in args.shapes.split(",")]
+
+        for kind, columns in shapes:
+            source = Source(kind, args.rows, columns, args.mix, workdir, args.replay)
+            for case in cases:
+                entry = {"case": case, "columns": columns, "source": kind}
+                if case == "xlsx" and not (app.module_available("xlsxwriter") or app.module_available("openpyxl")):
+                    entry["skipped"] = "neither xlsxwriter nor openpyxl is installed"
+                else:
+                    entry.update(measure(case, source, workdir, memory=not args.no_memory,
+                                         memory_budget_mb=args.memory_budget))
+                report["results"].append(entry)
+                print(f"{case} x {columns} columns: {entry}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Local stand-ins for a database server, for benchmarking without one.
+
+FakeConnection / FakeCursor implement the parts of DB-API 2.0 the app uses
+(execute, description, fetchone, fetchmany, fetchall, close) and serve
+synthetic rows. make_sqlite builds an SQLite file with the same rows, so a
+real driver's fetch path can be measured too.
+
+Rows have a configurable count, column count and type mix, e.g. the
+300/250/200 column shapes add_test_tables uses:
+    FakeConnection(rows=20000, columns=300, mix="int:3,str:3,float:1,date:1,datetime:1,decimal:1")
+"""
+import datetime
+import decimal
+import random
+import sqlite3
+
+# The wide test tables add_test_tables creates
+SHAPES = {"A": 300, "B": 250, "C": 200}
+
+DEFAULT_MIX = "int:3,str:3,float:1,date:1,datetime:1,decimal:1"
+
+SQLITE_TYPES = {
+    "int": "INTEGER", "float": "REAL", "decimal": "NUMERIC",
+    "str": "TEXT", "date": "TEXT", "datetime": "TEXT", "text": "TEXT",
+}
+
+# Distinct rows generated up front; fetched rows cycle through them
+POOL_ROWS = 1024
+
+
+def parse_mix(mix):
+    """"int:3,str:1" -> ["int", "int", "int", "str"]"""
+    types = []
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name not in SQLITE_TYPES:
+            raise ValueError(f"Unknown column type {name!r}; use one of {', '.join(SQLITE_TYPES)}")
+        types += [name] * int(weight or 1)
+    return types
+
+
+def column_types(columns, mix=DEFAULT_MIX):
+    """Type of each column, assigned round-robin from the mix"""
+    types = parse_mix(mix)
+    return [types[i % len(types)] for i in range(columns)]
+
+
+def _value(kind, rng):
+    if kind == "int":
+        return rng.randint(0, 10 ** 9)
+    if kind == "float":
+        return rng.random() * 10 ** 6
+    if kind == "decimal":
+        return decimal.Decimal(rng.randint(0, 10 ** 8)) / 100
+    if kind == "date":
+        return datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randint(0, 2000))
+    if kind == "datetime":
+        return datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=rng.randint(0, 10 ** 8))
+    if kind == "text":
+        return "".join(rng.choice("abcdefghij ") for _ in range(rng.randint(200, 2000)))
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 30)))
+
+
+def make_pool(types, null_rate=0.05, seed=42):
+    rng = random.Random(seed)
+    # Lists, so fetchmany can build a new tuple per row
+    return [[None if rng.random() < null_rate else _value(kind, rng) for kind in types]
+            for _ in range(POOL_ROWS)]
+
+
+def column_names(columns, prefix="Column"):
+    return [f"{prefix}_{i}" for i in range(1, columns + 1)]
+
+
+class FakeCursor:
+    """DB-API cursor serving synthetic rows, whatever SQL it is given"""
+
+    def __init__(self, rows, names, pool):
+        self.rowcount = -1
+        self.description = None
+        self._rows = rows
+        self._names = names
+        self._pool = pool
+        self._next = 0
+
+    def execute(self, sql, params=None):
+        self.description = [(name, None, None, None, None, None, True) for name in self._names]
+        self._next = 0
+        return self
+
+    def fetchmany(self, size=1):
+        end = min(self._next + size, self._rows)
+        pool, n = self._pool, len(self._pool)
+        # Copy each row, as a driver would hand out new tuples
+        batch = [tuple(pool[i % n]) for i in range(self._next, end)]
+        self._next = end
+        return batch
+
+    def fetchone(self):
+        batch = self.fetchmany(1)
+        return batch[0] if batch else None
+
+    def fetchall(self):
+        return self.fetchmany(self._rows - self._next)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """DB-API connection whose cursors serve the same synthetic result"""
+
+    def __init__(self, rows=10000, columns=300, mix=DEFAULT_MIX, null_rate=0.05, seed=42):
+        self.rows = rows
+        self.types = column_types(columns, mix)
+        self.names = column_names(columns)
+        self.pool = make_pool(self.types, null_rate, seed)
+
+    def cursor(self):
+        return FakeCursor(self.rows, self.names, self.pool)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_sqlite(path, rows=10000, columns=300, mix=DEFAULT_MIX, null_rate=0.05, seed=42, table="bench"):
+    """Create an SQLite database holding the synthetic rows in one table. Returns the column names"""
+    types = column_types(columns, mix)
+    names = column_names(columns)
+    pool = make_pool(types, null_rate, seed)
+
+    def stored(value):
+        # sqlite3 has no date or Decimal storage class
+        if isinstance(value, (datetime.date, decimal.Decimal)):
+            return str(value)
+        return value
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (" +
+                     ", ".join(f"{name} {SQLITE_TYPES[kind]}" for name, kind in zip(names, types)) + ")")
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * columns)})"
+        stored_pool = [tuple(stored(v) for v in row) for row in pool]
+        for start in range(0, rows, POOL_ROWS):
+            conn.executemany(insert, stored_pool[:min(POOL_ROWS, rows - start)])
+        conn.commit()
+    finally:
+        conn.close()
+    return names
@@ -0,0 +1,113 @@
+"""
+Bulk copy of a query's result into a table, possibly on another server.
+
+The query runs on one connection while the rows are inserted on another;
+a reader thread fetches batches into a small bounded queue and the writer
+inserts them as they arrive, so reading and writing overlap and nothing
+goes through a file. Inserts use each driver's bulk path: pyodbc's
+fast_executemany (parameter arrays sent in one round trip per batch) and
+mysql.connector's executemany, which turns an INSERT ... VALUES into one
+multi-row statement per batch. Everything is committed at the end, or
+rolled back if anything fails.
+
+The destination table must already exist; rows go into the columns named
+like the query's result columns.
+"""
+import queue
+import threading
+import time
+
+from connections import open_connection
+from sql_builder import format_table, param_placeholder, quote_identifier
+
+DEFAULT_BATCH_ROWS = 5000
+
+
+def insert_statement(table, columns, db_type):
+    """Parameterized single-row INSERT for table and columns"""
+    names = ", ".join(quote_identifier(column, db_type) for column in columns)
+    values = ", ".join([param_placeholder(db_type)] * len(columns))
+    return f"INSERT INTO {format_table(table, db_type)} ({names}) VALUES ({values})"
+
+
+def _read(cursor, batch_size, batches, stop):
+    # Runs on the reader thread; None marks the end, an exception is passed on to the writer
+    try:
+        while not stop.is_set():
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            batches.put([tuple(row) for row in batch])
+        batches.put(None)
+    except Exception as e:
+        batches.put(e)
+
+
+def copy_query(source_settings, sql, dest_settings, table, batch_size=DEFAULT_BATCH_ROWS,
+               progress=None, connect=open_connection):
+    """
+    Run sql on the source and insert its rows into table on the destination.
+
+    Returns a dict with rows, seconds and write_seconds (time spent inserting;
+    the rest was spent waiting for the source).
+    """
+    start = time.perf_counter()
+    dest_type = dest_settings.get("db_type")
+    source = connect(source_settings)
+    dest = None
+    reader = None
+    stop = threading.Event()
+    # A couple of batches in flight is enough to keep both connections busy
+    batches = queue.Queue(maxsize=2)
+    try:
+        dest = connect(dest_settings)
+        read_cursor = source.cursor()
+        read_cursor.execute(sql)
+        columns = [desc[0] for desc in read_cursor.description]
+
+        write_cursor = dest.cursor()
+        if hasattr(write_cursor, "fast_executemany"):
+            write_cursor.fast_executemany = True
+        statement = insert_statement(table, columns, dest_type)
+
+        reader = threading.Thread(target=_read, args=(read_cursor, batch_size, batches, stop), daemon=True)
+        reader.start()
+
+        count = 0
+        write_seconds = 0.0
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            write_start = time.perf_counter()
+            write_cursor.executemany(statement, batch)
+            write_seconds += time.perf_counter() - write_start
+            count += len(batch)
+            if progress:
+                progress(count)
+
+        dest.commit()
+        write_cursor.close()
+        read_cursor.close()
+        return {"rows": count, "seconds": time.perf_counter() - start, "write_seconds": write_seconds}
+    except Exception:
+        if dest is not None:
+            try:
+                dest.rollback()
+            except Exception:
+                pass
+        raise
+    finally:
+        stop.set()
+        if reader is not None:
+            # Let a reader blocked on a full queue finish
+            while reader.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        source.close()
+        if dest is not None:
+            dest.close()
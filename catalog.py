@@ -0,0 +1,220 @@
+"""
+Catalog (schema metadata) queries run while connecting to a database.
+
+Each function takes an open DB-API cursor and returns plain Python data so the
+results can be used by the UI as well as by code that never touches Tk.
+"""
+
+
+def fetch_tables(cursor, db_type, database):
+    """Return (table names, {table: [columns]}, {table: {column: type}}) for the database's base tables"""
+    if db_type == "MySQL":
+        cursor.execute("SHOW TABLES")
+    else:
+        cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE' AND TABLE_CATALOG = ?", (database,))
+    names = [row[0] for row in cursor.fetchall()]
+
+    tables = {}
+    column_types = {}
+    for table_name in names:
+        if db_type == "MySQL":
+            cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
+            columns = cursor.fetchall()
+            column_types[table_name] = {col[0]: col[1] for col in columns}
+        else:
+            cursor.execute("SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?", (table_name,))
+            columns = cursor.fetchall()
+            # A maximum length of -1 marks the (max) variants of varchar/nvarchar/varbinary
+            column_types[table_name] = {col[0]: f"{col[1]}(max)" if col[2] == -1 else col[1] for col in columns}
+        tables[table_name] = [col[0] for col in columns]
+    return names, tables, column_types
+
+
+def fetch_column_type(cursor, db_type, database, table, column):
+    """Type of one column as fetch_tables reports it, or None if the catalog doesn't list it"""
+    if db_type == "MySQL":
+        cursor.execute(
+            "SELECT COLUMN_TYPE, NULL FROM INFORMATION_SCHEMA.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (database, table, column)
+        )
+    else:
+        cursor.execute(
+            "SELECT DATA_TYPE, CHARACTER_MAXIMUM_LENGTH FROM INFORMATION_SCHEMA.COLUMNS "
+            "WHERE TABLE_CATALOG = ? AND TABLE_NAME = ? AND COLUMN_NAME = ?",
+            (database, table, column)
+        )
+    row = cursor.fetchone()
+    # Drain anything left so the connection can run the next statement
+    cursor.fetchall()
+    if row is None:
+        return None
+    return f"{row[0]}(max)" if row[1] == -1 else row[0]
+
+
+def fetch_mysql_column_types(cursor, database, table):
+    """{column: COLUMN_TYPE} of a MySQL table, with precision, scale and signedness (e.g. "decimal(12,4)")"""
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE FROM INFORMATION_SCHEMA.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+        (database, table)
+    )
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def fetch_primary_keys(cursor, db_type, database):
+    """Return {table: [primary key columns in key order]} for every table in the database"""
+    if db_type == "MySQL":
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            (database,)
+        )
+    else:
+        cursor.execute(
+            "SELECT kcu.TABLE_NAME, kcu.COLUMN_NAME "
+            "FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc "
+            "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu "
+            "ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME AND tc.TABLE_SCHEMA = kcu.TABLE_SCHEMA "
+            "WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY' AND tc.TABLE_CATALOG = ? "
+            "ORDER BY kcu.TABLE_NAME, kcu.ORDINAL_POSITION",
+            (database,)
+        )
+
+    primary_keys = {}
+    for table_name, column_name in cursor.fetchall():
+        primary_keys.setdefault(table_name, []).append(column_name)
+    return primary_keys
+
+
+def fetch_foreign_keys(cursor, db_type, database):
+    """
+    Return foreign keys as (table, columns, referenced_table, referenced_columns) tuples.
+
+    columns and referenced_columns are tuples in key order, so a composite key
+    is one entry rather than one per column.
+    """
+    if db_type == "MySQL":
+        cursor.execute(
+            "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+            "FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL "
+            "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION",
+            (database,)
+        )
+    else:
+        cursor.execute(
+            "SELECT fk.TABLE_NAME, fk.CONSTRAINT_NAME, fk.COLUMN_NAME, pk.TABLE_NAME, pk.COLUMN_NAME "
+            "FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc "
+            "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE fk "
+            "ON rc.CONSTRAINT_NAME = fk.CONSTRAINT_NAME AND rc.CONSTRAINT_SCHEMA = fk.CONSTRAINT_SCHEMA "
+            "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE pk "
+            "ON rc.UNIQUE_CONSTRAINT_NAME = pk.CONSTRAINT_NAME AND rc.UNIQUE_CONSTRAINT_SCHEMA = pk.CONSTRAINT_SCHEMA "
+            "AND fk.ORDINAL_POSITION = pk.ORDINAL_POSITION "
+            "WHERE rc.CONSTRAINT_CATALOG = ? "
+            "ORDER BY fk.TABLE_NAME, fk.CONSTRAINT_NAME, fk.ORDINAL_POSITION",
+            (database,)
+        )
+
+    # Rows arrive in key order within each constraint
+    keys = {}
+    for table, constraint, column, ref_table, ref_column in cursor.fetchall():
+        columns, ref_columns = keys.setdefault((table, constraint, ref_table), ([], []))
+        columns.append(column)
+        ref_columns.append(ref_column)
+    return [(table, tuple(columns), ref_table, tuple(ref_columns))
+            for (table, _, ref_table), (columns, ref_columns) in keys.items()]
+
+
+def normalize_type(type_name):
+    """Reduce a catalog type such as "int(11) unsigned" or "nvarchar(max)" to its base name"""
+    return str(type_name).split("(")[0].split()[0].lower() if type_name else ""
+
+
+# Types whose values can be arbitrarily large; summary queries and the
+# initial fetch avoid reading them in full
+LARGE_OBJECT_TYPES = {
+    "text", "ntext", "mediumtext", "longtext", "tinytext",
+    "blob", "mediumblob", "longblob", "tinyblob",
+    "image", "xml", "json",
+}
+
+# SQL Server types that can't be compared, so MIN/MAX/COUNT(DISTINCT) are not allowed
+UNCOMPARABLE_TYPES = {"geography", "geometry", "hierarchyid", "sql_variant"}
+
+
+def is_large_object_type(type_name):
+    """True for LOB types: TEXT/BLOB families, image/xml and the (max) variants of varchar/nvarchar/varbinary"""
+    if not type_name:
+        return False
+    lowered = str(type_name).lower()
+    return normalize_type(lowered) in LARGE_OBJECT_TYPES or lowered.endswith("(max)")
+
+
+# Numeric and date/time types whose value range can be split for parallel extraction
+RANGE_TYPES = {
+    "int", "integer", "bigint", "smallint", "tinyint", "mediumint",
+    "decimal", "numeric", "float", "double", "real", "money",
+    "date", "datetime", "datetime2", "smalldatetime", "timestamp",
+}
+
+
+def is_range_type(type_name):
+    return normalize_type(type_name) in RANGE_TYPES
+
+
+def fetch_table_sizes(cursor, db_type, database):
+    """
+    Return {table: (estimated rows, size in bytes)} from catalog statistics.
+
+    These are the optimizer's estimates (InnoDB TABLE_ROWS, SQL Server
+    partition stats) - cheap to read, but not exact counts.
+    """
+    if db_type == "MySQL":
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_ROWS, COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0) "
+            "FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = %s",
+            (database,)
+        )
+    else:
+        try:
+            cursor.execute(
+                "SELECT t.name, "
+                "SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.row_count ELSE 0 END), "
+                "SUM(ps.used_page_count) * 8192 "
+                "FROM sys.dm_db_partition_stats ps JOIN sys.tables t ON ps.object_id = t.object_id "
+                "GROUP BY t.name"
+            )
+        except Exception:
+            # dm_db_partition_stats needs VIEW DATABASE STATE; sys.partitions still has row counts
+            cursor.execute(
+                "SELECT t.name, SUM(p.rows), NULL "
+                "FROM sys.partitions p JOIN sys.tables t ON p.object_id = t.object_id "
+                "WHERE p.index_id IN (0, 1) GROUP BY t.name"
+            )
+
+    return {row[0]: (int(row[1] or 0), row[2]) for row in cursor.fetchall()}
+
+
+def describe_table_size(rows, size=None):
+    """Short label such as "~1.2M rows, 350 MB" for a table size estimate"""
+    if rows >= 1000000000:
+        label = f"~{rows / 1000000000:.1f}B rows"
+    elif rows >= 1000000:
+        label = f"~{rows / 1000000:.1f}M rows"
+    elif rows >= 1000:
+        label = f"~{rows / 1000:.1f}K rows"
+    else:
+        label = f"~{rows} rows"
+
+    if size:
+        size = float(size)
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024:
+                break
+            size /= 1024
+        else:
+            unit = "TB"
+        label += f", {size:.0f} {unit}" if unit in ("B", "KB") else f", {size:.1f} {unit}"
+    return label
@@ -0,0 +1,95 @@
+"""
+Column widths for the results grid, measured with the grid's own fonts.
+
+Widths come from a sample spread over the whole result rather than the first
+rows in the grid. Each column's width is the 95th percentile of its values'
+display lengths, converted to pixels with the average character width of the
+font for the column's kind of text (digits, capitals or mixed text), so one
+long outlier doesn't widen a column and no value has to be measured one by
+one. Headings are measured exactly.
+"""
+import datetime
+import string
+from decimal import Decimal
+
+# Rows sampled from the result for width calculation
+SAMPLE_ROWS = 1000
+WIDTH_PERCENTILE = 0.95
+MIN_WIDTH = 50
+MAX_WIDTH = 300
+# Cell and heading padding in pixels
+PADDING = 16
+
+# Characters whose average width stands for each kind of text
+CHARACTER_CLASSES = {
+    "digits": string.digits + "-.:",
+    "upper": string.ascii_uppercase + string.digits + " _",
+    "text": string.ascii_letters + string.digits + " _-.,",
+}
+
+NUMERIC_TYPES = (int, float, Decimal, datetime.date, datetime.datetime, datetime.time)
+
+
+def character_class(values):
+    """The kind of text a column's non-NULL values are displayed as"""
+    types = set(map(type, values))
+    types.discard(type(None))
+    if not types:
+        return "upper"  # "NULL"
+    if all(issubclass(t, NUMERIC_TYPES) and t is not bool for t in types):
+        return "digits"
+    texts = [v for v in values if type(v) is str]
+    if texts and sum(map(str.isupper, texts)) * 2 > len(texts):
+        return "upper"
+    return "text"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class WidthEngine:
+    """Column widths for a cell font and a heading font (tkinter.font.Font or anything with measure())"""
+
+    def __init__(self, font, heading_font=None, min_width=MIN_WIDTH, max_width=MAX_WIDTH):
+        self.font = font
+        self.heading_font = heading_font or font
+        self.min_width = min_width
+        self.max_width = max_width
+        self._char_widths = {}
+        self._text_widths = {}
+        self._heading_widths = {}
+
+    def text_width(self, length, char_class):
+        """Pixel width of length characters of one class, memoized"""
+        key = (length, char_class)
+        width = self._text_widths.get(key)
+        if width is None:
+            per_char = self._char_widths.get(char_class)
+            if per_char is None:
+                alphabet = CHARACTER_CLASSES[char_class]
+                per_char = self._char_widths[char_class] = self.font.measure(alphabet) / len(alphabet)
+            width = self._text_widths[key] = round(length * per_char)
+        return width
+
+    def heading_width(self, heading):
+        width = self._heading_widths.get(heading)
+        if width is None:
+            width = self._heading_widths[heading] = self.heading_font.measure(heading)
+        return width
+
+    def column_width(self, heading, values):
+        # str() has the same length as the grid's text: "None" for "NULL", a space for isoformat's "T"
+        lengths = sorted(map(len, map(str, values)))
+        cells = self.text_width(percentile(lengths, WIDTH_PERCENTILE), character_class(values))
+        width = max(self.heading_width(heading), cells) + PADDING
+        return max(self.min_width, min(self.max_width, width))
+
+    def widths(self, headings, rows):
+        """Widths for each heading, from rows (a sample of the result in the same column order)"""
+        # One transposition gives every column's values
+        columns = list(zip(*rows)) if rows else []
+        return [self.column_width(heading, columns[i] if i < len(columns) else ())
+                for i, heading in enumerate(headings)]
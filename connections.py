@@ -0,0 +1,292 @@
+"""
+Database connections and batched fetching, shared by the UI and headless mode.
+
+Connection settings are a plain dictionary with the same fields as the
+Connect tab: db_type, server, port, database, username, password and
+auth_type. Drivers are imported when a connection of that type is opened,
+so a MySQL-only job never needs pyodbc and vice versa.
+
+MySQL connections use the connector's C extension when it is installed.
+DisplayCursor is a faster fetch path for results that are only looked at:
+values arrive as display text, without building Decimal and datetime
+objects first.
+"""
+import contextlib
+import decimal
+import queue
+import struct
+import threading
+
+ODBC_DRIVER = "ODBC Driver 17 for SQL Server"
+
+
+def sqlserver_connection_string(settings):
+    """Build the ODBC connection string for a SQL Server connection"""
+    base = f"DRIVER={{{ODBC_DRIVER}}};SERVER={settings.get('server', '')};DATABASE={settings.get('database', '')};"
+    if settings.get("auth_type", "Windows Authentication") == "Windows Authentication":
+        return base + "Trusted_Connection=yes;"
+    return base + f"UID={settings.get('username', '')};PWD={settings.get('password', '')}"
+
+
+def open_connection(settings):
+    """Open a DB-API connection for the given settings"""
+    if settings.get("db_type") == "MySQL":
+        try:
+            import mysql.connector
+        except ImportError:
+            raise ImportError(
+                "The MySQL connector module could not be detected.\n\n"
+                "Please install it using: pip install mysql-connector-python"
+            )
+
+        return mysql.connector.connect(
+            host=settings.get("server", ""),
+            port=int(settings.get("port") or 3306),
+            user=settings.get("username", ""),
+            password=settings.get("password", ""),
+            database=settings.get("database", ""),
+            # The C extension decodes rows several times faster than the pure-Python protocol
+            use_pure=not getattr(mysql.connector, "HAVE_CEXT", False)
+        )
+
+    import pyodbc
+    return pyodbc.connect(sqlserver_connection_string(settings))
+
+
+class ConnectionPool:
+    """Up to size connections opened with the same settings, shared between worker threads"""
+
+    def __init__(self, settings, size):
+        self.settings = settings
+        self.size = size
+        self._idle = queue.Queue()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.size:
+                conn = open_connection(self.settings)
+                self._opened.append(conn)
+                return conn
+        return self._idle.get()
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        for conn in self._opened:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._opened = []
+
+
+def default_batch_size(column_count):
+    """Rows per fetchmany call - smaller batches for very wide results"""
+    return 50 if column_count > 300 else 100
+
+
+def fetch_batches(cursor, batch_size=None):
+    """Yield lists of rows from an executed cursor until it is exhausted"""
+    if batch_size is None:
+        batch_size = default_batch_size(len(cursor.description))
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield batch
+
+
+def discard_result(cursor, conn=None):
+    """
+    Drop an executed cursor's pending result without fetching it into Python rows.
+
+    pyodbc cancels the statement on the server. mysql.connector has to read
+    the rest of the result off the wire, but consume_results does that without
+    converting any values (in C when the extension is in use). Other cursors
+    (SQLite, DuckDB) drop their result on the next execute.
+    """
+    if hasattr(cursor, "cancel"):
+        cursor.cancel()
+    elif conn is not None and hasattr(conn, "consume_results"):
+        conn.consume_results()
+
+
+# ODBC SQL types converted to text by DisplayCursor, and the raw struct each arrives as
+SQL_NUMERIC = 2
+SQL_DECIMAL = 3
+SQL_TYPE_DATE = 91
+SQL_TYPE_TIMESTAMP = 93
+_DATE_STRUCT = struct.Struct("<3h")
+_TIMESTAMP_STRUCT = struct.Struct("<6hI")
+
+
+def _odbc_date_text(raw):
+    if raw is None:
+        return None
+    return "%04d-%02d-%02d" % _DATE_STRUCT.unpack_from(raw)
+
+
+def _odbc_timestamp_text(raw):
+    if raw is None:
+        return None
+    year, month, day, hour, minute, second, fraction = _TIMESTAMP_STRUCT.unpack_from(raw)
+    text = "%04d-%02d-%02dT%02d:%02d:%02d" % (year, month, day, hour, minute, second)
+    # fraction is in nanoseconds; isoformat shows microseconds
+    return text + ".%06d" % (fraction // 1000) if fraction else text
+
+
+def _odbc_decimal_text(raw):
+    """
+    Text of a DECIMAL/NUMERIC value, with all of its scale's digits like str(Decimal).
+
+    SQL Server sends a SQL_NUMERIC_STRUCT: precision, scale, sign (1 for
+    positive) and the unscaled value as a little-endian integer. A driver that
+    sends the number as text instead starts with a digit, sign or point, all
+    above the largest precision.
+    """
+    if raw is None:
+        return None
+    if raw[0] > 38:
+        return raw.decode("ascii")
+    scale = raw[1]
+    unscaled = int.from_bytes(raw[3:], "little")
+    digits = str(unscaled).rjust(scale + 1, "0")
+    text = f"{digits[:-scale]}.{digits[-scale:]}" if scale else digits
+    return text if raw[2] or not unscaled else "-" + text
+
+
+# Converters DisplayCursor installs on a pyodbc connection
+_ODBC_TEXT_CONVERTERS = {
+    SQL_NUMERIC: _odbc_decimal_text,
+    SQL_DECIMAL: _odbc_decimal_text,
+    SQL_TYPE_DATE: _odbc_date_text,
+    SQL_TYPE_TIMESTAMP: _odbc_timestamp_text,
+}
+
+# mysql.connector FieldType codes of numeric and of date-and-time columns, and the binary character set
+_MYSQL_NUMERIC_TYPES = {0, 1, 2, 3, 4, 5, 8, 9, 13, 246}
+_MYSQL_DATETIME_TYPES = {7, 12}  # TIMESTAMP, DATETIME
+_MYSQL_BINARY_CHARSET = 63
+_MYSQL_BINARY_FLAG = 128
+# String and BLOB FieldType codes (VARCHAR, BLOB types, VAR_STRING, STRING)
+_MYSQL_STRING_TYPES = {15, 249, 250, 251, 252, 253, 254}
+
+
+def _decode_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.decode("utf-8", "replace")
+
+
+def _is_binary_column(desc):
+    """Whether a mysql.connector description entry is a BINARY, VARBINARY or BLOB column"""
+    if desc[1] not in _MYSQL_STRING_TYPES:
+        return False
+    if len(desc) > 8 and desc[8] is not None:
+        return desc[8] == _MYSQL_BINARY_CHARSET
+    return bool(desc[7] & _MYSQL_BINARY_FLAG)
+
+
+class DisplayCursor:
+    """
+    A cursor on conn whose rows hold text instead of converted values.
+
+    MySQL uses a raw cursor: the server's text protocol bytes are decoded to
+    str, and nothing else is built; binary columns stay bytes. pyodbc gets
+    output converters for decimals, dates and timestamps from execute until
+    close (they apply to the whole connection, so execute, fetch and close
+    while holding the connection's lock); closing puts back the converters
+    that were there before. Other values are fetched as usual. Dates and
+    times read the same as isoformat on both drivers.
+    """
+
+    def __init__(self, conn, db_type):
+        self.conn = conn
+        self.raw = db_type == "MySQL"
+        self._previous = None
+        self._columns = None
+        self._closed = False
+        self.cursor = conn.cursor(raw=True) if self.raw else conn.cursor()
+
+    def execute(self, *args, **kwargs):
+        self._columns = None
+        if not self.raw and self._previous is None and hasattr(self.conn, "add_output_converter"):
+            get = getattr(self.conn, "get_output_converter", lambda sqltype: None)
+            self._previous = {sqltype: get(sqltype) for sqltype in _ODBC_TEXT_CONVERTERS}
+            for sqltype, converter in _ODBC_TEXT_CONVERTERS.items():
+                self.conn.add_output_converter(sqltype, converter)
+        return self.cursor.execute(*args, **kwargs)
+
+    def numeric_columns(self):
+        """Positions of the columns of the current result that hold numbers as text"""
+        if not self.cursor.description:
+            return []
+        if not self.raw:
+            return [i for i, desc in enumerate(self.cursor.description)
+                    if self._previous is not None and desc[1] is decimal.Decimal]
+        return [i for i, desc in enumerate(self.cursor.description) if desc[1] in _MYSQL_NUMERIC_TYPES]
+
+    def _decode(self, rows):
+        if not self.raw:
+            return rows
+        if self._columns is None:
+            description = self.cursor.description
+            self._columns = ([i for i, desc in enumerate(description) if _is_binary_column(desc)],
+                             [i for i, desc in enumerate(description) if desc[1] in _MYSQL_DATETIME_TYPES])
+        binary, datetimes = self._columns
+        decoded = [[_decode_text(value) for value in row] for row in rows]
+        # Fixed up a column at a time, so every other value takes the one plain decode
+        for i in binary:
+            for row, text_row in zip(rows, decoded):
+                text_row[i] = None if row[i] is None else bytes(row[i])
+        for i in datetimes:
+            # The text protocol puts a space between date and time; a normal fetch shows isoformat's "T"
+            for text_row in decoded:
+                text = text_row[i]
+                if text is not None:
+                    text_row[i] = f"{text[:10]}T{text[11:]}"
+        return decoded
+
+    def fetchmany(self, size=None):
+        return self._decode(self.cursor.fetchmany(size) if size is not None else self.cursor.fetchmany())
+
+    def fetchall(self):
+        return self._decode(self.cursor.fetchall())
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return None if row is None else self._decode([row])[0]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._previous is not None:
+            for sqltype, converter in self._previous.items():
+                if converter is not None:
+                    self.conn.add_output_converter(sqltype, converter)
+                elif hasattr(self.conn, "remove_output_converter"):
+                    self.conn.remove_output_converter(sqltype)
+                else:
+                    # pyodbc before 4.0.30 can only drop every converter
+                    self.conn.clear_output_converters()
+            self._previous = None
+        self.cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
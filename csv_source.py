@@ -0,0 +1,168 @@
+"""
+CSV schema sniffing and chunked reading for the local engine.
+
+sniff_csv looks only at the start of a file (plus a window in the middle,
+through a memory map) to find the dialect, the header, a type for each
+column and an estimate of the row count, so registering a multi-GB file
+takes milliseconds. iter_csv_batches streams the rows in fixed-size batches
+when a query actually needs them.
+"""
+import csv
+import io
+import itertools
+import mmap
+import os
+import re
+
+# Bytes read from the start of the file for the dialect, header and types
+SAMPLE_BYTES = 1024 * 1024
+# Bytes read from the middle of the file for the row count estimate
+WINDOW_BYTES = 256 * 1024
+# Characters given to csv.Sniffer for the dialect
+SNIFF_CHARS = 8 * 1024
+
+_INTEGER = re.compile(r"^[+-]?(0|[1-9]\d*)$")
+# Codes with leading zeros ("007") stay text
+_REAL = re.compile(r"^[+-]?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][+-]?\d+)?$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?$")
+
+# Inferred type -> (catalog-style type name, SQLite column type)
+TYPES = {
+    "integer": ("integer", "INTEGER"),
+    "real": ("real", "REAL"),
+    "date": ("date", "TEXT"),
+    "datetime": ("datetime", "TEXT"),
+    "string": ("varchar", "TEXT"),
+}
+
+
+def infer_type(values):
+    """Narrowest type matching every non-empty sampled value of a column"""
+    candidates = ["integer", "real", "date", "datetime"]
+    for value in values:
+        if value == "":
+            continue
+        if "integer" in candidates and not _INTEGER.match(value):
+            candidates.remove("integer")
+        if "real" in candidates and not _REAL.match(value):
+            candidates.remove("real")
+        if "date" in candidates and not _DATE.match(value):
+            candidates.remove("date")
+        if "datetime" in candidates and not _DATETIME.match(value):
+            candidates.remove("datetime")
+        if not candidates:
+            return "string"
+    # An all-empty sample says nothing; text is the safe choice
+    if all(value == "" for value in values):
+        return "string"
+    return candidates[0]
+
+
+def unique_columns(header):
+    """Header names usable as SQL columns: blanks named by position, duplicates numbered"""
+    columns = []
+    seen = set()
+    for i, name in enumerate(header):
+        name = name.strip() or f"column_{i + 1}"
+        candidate, n = name, 2
+        while candidate.lower() in seen:
+            candidate = f"{name}_{n}"
+            n += 1
+        seen.add(candidate.lower())
+        columns.append(candidate)
+    return columns
+
+
+def _window(mm, start, size):
+    """Whole lines from a byte window of the map"""
+    data = mm[start:start + size]
+    if start > 0:
+        data = data[data.find(b"\n") + 1:]
+    end = data.rfind(b"\n")
+    return data[:end + 1] if end >= 0 else data
+
+
+def sniff_csv(path, sample_bytes=SAMPLE_BYTES, sample_rows=1000):
+    """
+    Describe a CSV file from a sample of it.
+
+    Returns a dict with path, delimiter, quotechar, encoding, columns, types
+    (inferred type per column), catalog_types, sqlite_types, rows (the row
+    count, estimated unless exact is True) and exact.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise ValueError(f"{os.path.basename(path)} is empty")
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        whole = size <= sample_bytes
+        head = mm[:] if whole else _window(mm, 0, sample_bytes)
+        middle = b"" if whole else _window(mm, max(size // 2, len(head)), WINDOW_BYTES)
+
+    encoding = "utf-8-sig" if head.startswith(b"\xef\xbb\xbf") else "utf-8"
+    text = head.decode(encoding, errors="replace")
+
+    # csv.Sniffer gets slow on long input; the first few lines decide the dialect
+    lines = text[:SNIFF_CHARS]
+    if len(text) > SNIFF_CHARS and "\n" in lines:
+        lines = lines[:lines.rfind("\n")]
+    try:
+        dialect = csv.Sniffer().sniff(lines, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if not header or not any(header):
+        raise ValueError(f"{os.path.basename(path)} has no header row")
+    columns = unique_columns(header)
+
+    sample = list(itertools.islice(reader, sample_rows))
+    types = {}
+    for i, column in enumerate(columns):
+        types[column] = infer_type([row[i] if i < len(row) else "" for row in sample])
+
+    if whole:
+        rows, exact = len(sample) + sum(1 for _ in reader), True
+    else:
+        # Average line length over the head and the middle of the file
+        header_bytes = len(text.split("\n", 1)[0].encode(encoding)) + 1
+        lines = max(1, head.count(b"\n") - 1 + middle.count(b"\n"))
+        average = (len(head) - header_bytes + len(middle)) / lines
+        rows, exact = int((size - header_bytes) / average), False
+
+    return {
+        "path": path,
+        "delimiter": dialect.delimiter,
+        "quotechar": dialect.quotechar or '"',
+        "encoding": encoding,
+        "columns": columns,
+        "types": types,
+        "catalog_types": {column: TYPES[types[column]][0] for column in columns},
+        "sqlite_types": {column: TYPES[types[column]][1] for column in columns},
+        "rows": rows,
+        "exact": exact,
+    }
+
+
+def iter_csv_batches(info, batch_rows=10000, buffer_bytes=4 * 1024 * 1024):
+    """Yield the data rows of a sniffed CSV file as lists of value lists; empty fields are None"""
+    width = len(info["columns"])
+    with open(info["path"], newline="", encoding=info["encoding"], errors="replace",
+              buffering=buffer_bytes) as f:
+        reader = csv.reader(f, delimiter=info["delimiter"], quotechar=info["quotechar"])
+        next(reader, None)
+        batch = []
+        for record in reader:
+            if not record:
+                continue
+            # Short rows are padded, long ones cut
+            if len(record) != width:
+                record = record[:width] + [""] * (width - len(record))
+            batch.append([value if value != "" else None for value in record])
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,387 @@
+"""
+Result export writers shared by the Results tab and headless mode.
+
+Writers take the column names and an iterable of rows, so they work the
+same on an in-memory result and on batches streamed from a cursor. An
+optional progress callback is called with the number of rows written.
+
+CSV paths ending in .gz or .zst are compressed. Blocks of rows are formatted
+and compressed on worker threads, each into its own gzip member or zstd
+frame, and written in order; concatenated members decompress as one file.
+"""
+import collections
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Rows per block handed to a compression worker
+CSV_BLOCK_ROWS = 20000
+
+
+def format_csv_value(val):
+    """Convert a fetched value into something csv.writer writes faithfully"""
+    if val is None:
+        return ""
+    if isinstance(val, (datetime.date, datetime.datetime)):
+        return val.isoformat()
+    return val
+
+
+def write_csv(file_or_path, columns, rows, progress=None, progress_every=5000, header=True):
+    """Write a header and rows as CSV to a path or an open text file. Returns the row count"""
+    if isinstance(file_or_path, str) and csv_compressor(file_or_path):
+        return write_compressed_csv(file_or_path, columns, rows, progress, progress_every, header)
+    if isinstance(file_or_path, str):
+        with open(file_or_path, 'w', newline='', encoding='utf-8') as csvfile:
+            return write_csv(csvfile, columns, rows, progress, progress_every, header)
+
+    writer = csv.writer(file_or_path)
+    if header:
+        writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        writer.writerow([format_csv_value(val) for val in row])
+        count += 1
+        if progress and count % progress_every == 0:
+            progress(count)
+    return count
+
+
+def csv_compressor(path):
+    """The bytes -> bytes compression function for a CSV path's extension, or None for plain CSV"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".gz":
+        # zlib releases the GIL while compressing, so blocks compress in parallel
+        return lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    if ext == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Writing .zst files requires the zstandard module.\n\n"
+                              "Please install it using: pip install zstandard")
+        # A compressor can't be shared between threads
+        local = threading.local()
+
+        def compress(data):
+            if not hasattr(local, "compressor"):
+                local.compressor = zstandard.ZstdCompressor(level=3)
+            return local.compressor.compress(data)
+        return compress
+    return None
+
+
+def _date_columns(rows):
+    """Positions of the columns whose first non-NULL value in rows is a date or datetime"""
+    found = []
+    if not rows:
+        return found
+    for i in range(len(rows[0])):
+        for row in rows:
+            if row[i] is not None:
+                if isinstance(row[i], (datetime.date, datetime.datetime)):
+                    found.append(i)
+                break
+    return found
+
+
+def _format_csv_block(rows, compress, header=None):
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    # csv.writer already writes NULL as an empty field; only dates need converting
+    date_columns = _date_columns(rows)
+    if date_columns:
+        rows = [list(row) for row in rows]
+        for row in rows:
+            for i in date_columns:
+                row[i] = format_csv_value(row[i])
+    writer.writerows(rows)
+    return compress(buffer.getvalue().encode("utf-8"))
+
+
+def write_compressed_csv(path, columns, rows, progress=None, progress_every=5000, header=True,
+                         workers=None, block_rows=CSV_BLOCK_ROWS):
+    """Write CSV compressed by path's extension, formatting and compressing blocks on worker threads"""
+    compress = csv_compressor(path)
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    reported = 0
+
+    with open(path, "wb") as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        # Blocks in flight, oldest first; bounded so a fast reader can't queue the whole result
+        pending = collections.deque()
+
+        def write_oldest():
+            nonlocal reported
+            future, rows_done = pending.popleft()
+            f.write(future.result())
+            if progress and rows_done // progress_every > reported // progress_every:
+                progress(rows_done)
+            reported = rows_done
+
+        block = []
+        block_header = list(columns) if header else None
+        for row in rows:
+            block.append(row)
+            if len(block) >= block_rows:
+                count += len(block)
+                pending.append((pool.submit(_format_csv_block, block, compress, block_header), count))
+                block, block_header = [], None
+                if len(pending) >= workers * 2:
+                    write_oldest()
+        if block or block_header is not None:
+            count += len(block)
+            pending.append((pool.submit(_format_csv_block, block, compress, block_header), count))
+        while pending:
+            write_oldest()
+    return count
+
+
+# Rows per worksheet, header included; longer results continue on a new sheet
+EXCEL_MAX_ROWS = 1048576
+# Longest text a cell can hold
+EXCEL_MAX_TEXT = 32767
+
+
+def format_excel_value(val):
+    """Convert a fetched value into a type both xlsx writers store as-is"""
+    if val is None or isinstance(val, (bool, int, float, decimal.Decimal)):
+        return val
+    if isinstance(val, (datetime.date, datetime.datetime, datetime.time)):
+        return val.isoformat()
+    text = val if isinstance(val, str) else str(val)
+    return text[:EXCEL_MAX_TEXT]
+
+
+class _XlsxWriterBook:
+    """Workbook written row by row by xlsxwriter in constant-memory mode"""
+
+    def __init__(self, path):
+        import xlsxwriter
+        self.book = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_numbers": False,
+                                               "strings_to_formulas": False, "strings_to_urls": False})
+        self.sheet = None
+        self.row = 0
+
+    def add_sheet(self, title):
+        self.sheet = self.book.add_worksheet(title)
+        self.row = 0
+
+    def append(self, values):
+        self.sheet.write_row(self.row, 0, values)
+        self.row += 1
+
+    def close(self):
+        self.book.close()
+
+
+class _OpenpyxlBook:
+    """Workbook written row by row by openpyxl in write-only mode"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.book = Workbook(write_only=True)
+        self.sheet = None
+
+    def add_sheet(self, title):
+        self.sheet = self.book.create_sheet(title)
+
+    def append(self, values):
+        self.sheet.append(values)
+
+    def close(self):
+        self.book.save(self.path)
+
+
+def write_excel(path, columns, rows, progress=None, progress_every=5000, max_rows=EXCEL_MAX_ROWS):
+    """
+    Stream rows into an .xlsx file without holding the workbook in memory. Returns the row count.
+
+    Uses xlsxwriter if it is installed, openpyxl otherwise. When a sheet is full
+    the rows continue on Sheet2, Sheet3, ... each with its own header row.
+    """
+    try:
+        book = _XlsxWriterBook(path)
+    except ImportError:
+        book = _OpenpyxlBook(path)
+
+    header = list(columns)
+    per_sheet = max_rows - 1
+    count = 0
+    try:
+        book.add_sheet("Sheet1")
+        book.append(header)
+        for row in rows:
+            if count and count % per_sheet == 0:
+                book.add_sheet(f"Sheet{count // per_sheet + 1}")
+                book.append(header)
+            book.append([format_excel_value(val) for val in row])
+            count += 1
+            if progress and count % progress_every == 0:
+                progress(count)
+    finally:
+        book.close()
+    return count
+
+
+# mysql.connector FieldType codes whose values always convert to one Arrow type
+_MYSQL_INT_TYPES = {1, 2, 3, 8, 9, 13}  # TINY, SHORT, LONG, LONGLONG, INT24, YEAR
+_MYSQL_FLOAT_TYPES = {4, 5}  # FLOAT, DOUBLE
+_MYSQL_DATETIME_TYPES = {7, 12}  # TIMESTAMP, DATETIME
+_MYSQL_DATE_TYPES = {10, 14}  # DATE, NEWDATE
+
+
+def parquet_types(description):
+    """
+    Arrow types for the columns of a cursor description, None where the description doesn't settle it.
+
+    pyodbc reports the Python class of each column (and the precision and
+    scale of decimals), mysql.connector a FieldType code. Anything else
+    (DECIMAL without a precision, text vs. binary strings, other drivers)
+    is left to write_parquet to infer over the whole result. None without pyarrow.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    types = []
+    for desc in description:
+        type_code = desc[1]
+        precision = desc[4] if len(desc) > 4 else None
+        scale = desc[5] if len(desc) > 5 else None
+        if type_code is bool:
+            arrow_type = pa.bool_()
+        elif type_code is int or type_code in _MYSQL_INT_TYPES:
+            arrow_type = pa.int64()
+        elif type_code is float or type_code in _MYSQL_FLOAT_TYPES:
+            arrow_type = pa.float64()
+        elif type_code is decimal.Decimal and isinstance(precision, int) and isinstance(scale, int) \
+                and 0 < precision <= 38:
+            arrow_type = pa.decimal128(precision, scale)
+        elif type_code is datetime.datetime or type_code in _MYSQL_DATETIME_TYPES:
+            arrow_type = pa.timestamp("us")
+        elif type_code is datetime.date or type_code in _MYSQL_DATE_TYPES:
+            arrow_type = pa.date32()
+        elif type_code is datetime.time:
+            arrow_type = pa.time64("us")
+        elif type_code is str:
+            arrow_type = pa.string()
+        elif type_code in (bytes, bytearray):
+            arrow_type = pa.binary()
+        else:
+            arrow_type = None
+        types.append(arrow_type)
+    return types
+
+
+def _unify_types(pa, column_types):
+    """One type that every chunk's inferred type of a column converts to; string if there is none"""
+    if not column_types:
+        return pa.string()
+    try:
+        schema = pa.unify_schemas([pa.schema([pa.field("c", t)]) for t in column_types],
+                                  promote_options="permissive")
+        unified = schema.field("c").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.string()
+    # Columns that are NULL throughout get a type readers can handle
+    return pa.string() if unified == pa.null() else unified
+
+
+def write_parquet(path, columns, rows, progress=None, chunk_rows=50000, types=None):
+    """
+    Write rows to a Parquet file through pyarrow, a chunk at a time. Returns the row count.
+
+    types gives the Arrow type of each column (see parquet_types), None for
+    unknown. When every type is known the chunks go straight into the file.
+    Otherwise each chunk is first written to a temporary file with the types
+    inferred from its values, and the final schema is unified over all chunks
+    (an int column that later holds 2.5 becomes double, a column that is
+    NULL at first takes the type of its later values) before they are copied
+    into the file. Values are only ever converted without loss; a column
+    whose values don't share a type is written as text. A result without
+    rows still gets a file with its schema.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet output needs pyarrow.\n\nPlease install it using: pip install pyarrow")
+
+    types = list(types) if types else [None] * len(columns)
+    fixed = all(t is not None for t in types)
+    count = 0
+    chunk = []
+    writer = None
+    temp_dir = None
+    parts = []
+
+    def to_table(chunk_rows):
+        data = list(zip(*chunk_rows)) if chunk_rows else [[] for _ in columns]
+        arrays = []
+        for values, arrow_type in zip(data, types):
+            array = pa.array(values)
+            if arrow_type is not None and array.type != arrow_type:
+                # A checked cast: pa.array(values, type=...) would silently truncate 2.5 to 2
+                array = array.cast(arrow_type, safe=True)
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, names=list(columns))
+
+    def flush():
+        nonlocal writer, temp_dir
+        table = to_table(chunk)
+        if fixed:
+            writer.write_table(table)
+            return
+        if temp_dir is None:
+            temp_dir = tempfile.mkdtemp(prefix=".parquet_", dir=os.path.dirname(os.path.abspath(path)))
+        part = os.path.join(temp_dir, f"{len(parts):06d}.parquet")
+        pq.write_table(table, part)
+        parts.append((part, table.schema))
+
+    try:
+        if fixed:
+            writer = pq.ParquetWriter(path, pa.schema([pa.field(name, t) for name, t in zip(columns, types)]))
+        for row in rows:
+            chunk.append(row)
+            count += 1
+            if len(chunk) >= chunk_rows:
+                flush()
+                chunk = []
+                if progress:
+                    progress(count)
+        if chunk:
+            flush()
+
+        if not fixed:
+            schema = pa.schema([
+                pa.field(name, t if t is not None else _unify_types(pa, [s.field(i).type for _, s in parts]))
+                for i, (name, t) in enumerate(zip(columns, types))
+            ])
+            writer = pq.ParquetWriter(path, schema)
+            for part, _ in parts:
+                table = pq.read_table(part)
+                writer.write_table(table.cast(schema, safe=True))
+                os.remove(part)
+    except Exception:
+        if writer:
+            writer.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    writer.close()
+    return count
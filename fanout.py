@@ -0,0 +1,224 @@
+"""
+Fan-out execution: one query run against many identically shaped databases.
+
+Each target (a database on the main server, or server/database elsewhere)
+gets its own connection and runs the same SQL on a worker thread, with at
+most `workers` targets running at once. Fetched batches are streamed back
+to the caller through a bounded queue, each row tagged with the target it
+came from in an extra first column, so the combined result can go straight
+into the Results grid or an export without being collected first.
+
+The columns of the first listed target that runs the query are the
+reference: a target whose columns don't match them, or that fails, is
+reported in the summary and skipped; the others carry on. Rows are streamed
+as they arrive, so a target that fails after sending some keeps those rows
+in the result; its summary entry is marked partial.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from connections import fetch_batches, open_connection
+
+DEFAULT_WORKERS = 8
+SOURCE_COLUMN = "source"
+
+
+def parse_targets(text, settings):
+    """
+    Connection settings for each target in text (comma or newline separated).
+
+    A target is a database name on settings' server, or server/database.
+    Returns a list of (label, settings) pairs.
+    """
+    targets = []
+    for item in text.replace("\n", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        server, _, database = item.rpartition("/")
+        target = dict(settings, database=database)
+        if server:
+            target["server"] = server
+        targets.append((item, target))
+    return targets
+
+
+def source_column_name(columns):
+    """Name for the added source column that doesn't clash with the query's own"""
+    name = SOURCE_COLUMN
+    taken = set(c.lower() for c in columns)
+    while name.lower() in taken:
+        name = "_" + name
+    return name
+
+
+class FanOut:
+    """
+    Run sql on every target and stream the tagged rows back.
+
+    Starting a FanOut waits until the reference columns are known (columns
+    then includes the source column first). batches() yields the combined
+    rows; summary holds one entry per target (source, rows, seconds, error,
+    partial) once it has finished.
+    """
+
+    def __init__(self, targets, sql, workers=DEFAULT_WORKERS, batch_size=5000, connect=open_connection):
+        if not targets:
+            raise ValueError("No databases to run the query on")
+        self.targets = targets
+        self.sql = sql
+        self.batch_size = batch_size
+        self.connect = connect
+        self.summary = []
+        self.columns = None
+        self.query_columns = None
+
+        self._queue = queue.Queue(maxsize=max(4, workers * 4))
+        # Columns each target returned by its position in targets, None for a target that failed first
+        self._described = {}
+        self._described_changed = threading.Condition()
+        self._stop = threading.Event()
+        self._running = len(targets)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets))))
+        for index, (label, settings) in enumerate(targets):
+            self._executor.submit(self._run_target, index, label, settings)
+
+        # Everything but rows is handled while waiting for the first columns
+        self._pending = []
+        while self.query_columns is None and self._running:
+            self._handle(self._queue.get())
+        if self.query_columns is None:
+            self.close()
+            failures = "\n".join(f"{r['source']}: {r['error']}" for r in self.summary)
+            raise RuntimeError(f"The query failed on every database:\n{failures}")
+        self.columns = [source_column_name(self.query_columns)] + list(self.query_columns)
+
+    def _put(self, item):
+        # Give up once the consumer has stopped reading
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _describe(self, index, columns):
+        with self._described_changed:
+            self._described[index] = columns
+            self._described_changed.notify_all()
+
+    def _reference_columns(self):
+        """
+        Columns of the first listed target that returned any, once every target
+        listed before it has returned its columns or failed; None if stopped.
+        """
+        with self._described_changed:
+            while not self._stop.is_set():
+                for index in range(len(self.targets)):
+                    if index not in self._described:
+                        break
+                    if self._described[index] is not None:
+                        self.query_columns = self._described[index]
+                        return self.query_columns
+                self._described_changed.wait(0.2)
+        return None
+
+    def _run_target(self, index, label, settings):
+        start = time.perf_counter()
+        result = {"source": label, "rows": 0, "seconds": 0.0, "error": None, "partial": False}
+        conn = None
+        try:
+            conn = self.connect(settings)
+            cursor = conn.cursor()
+            cursor.execute(self.sql)
+            columns = [desc[0] for desc in cursor.description]
+            self._describe(index, columns)
+            reference = self._reference_columns()
+            if reference is None:
+                return
+            if [c.lower() for c in columns] != [c.lower() for c in reference]:
+                raise ValueError(f"returned columns {', '.join(columns)} instead of {', '.join(reference)}")
+            for batch in fetch_batches(cursor, self.batch_size):
+                if not self._put(("rows", label, batch)):
+                    break
+                result["rows"] += len(batch)
+            cursor.close()
+        except Exception as e:
+            result["error"] = str(e)
+            # Rows sent before the failure are already in the result
+            result["partial"] = result["rows"] > 0
+            if index not in self._described:
+                self._describe(index, None)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            result["seconds"] = time.perf_counter() - start
+            self._put(("done", label, result))
+
+    def _handle(self, item):
+        kind, label, payload = item
+        if kind == "done":
+            self._running -= 1
+            self.summary.append(payload)
+        else:
+            self._pending.append((label, payload))
+
+    def batches(self):
+        """Yield lists of rows with the source label first, until every target has finished"""
+        try:
+            while self._pending or self._running:
+                if self._pending:
+                    label, batch = self._pending.pop(0)
+                    yield [[label] + list(row) for row in batch]
+                    continue
+                kind, label, payload = self._queue.get()
+                if kind == "done":
+                    self._handle((kind, label, payload))
+                else:
+                    yield [[label] + list(row) for row in payload]
+        finally:
+            self.close()
+
+    def rows(self):
+        for batch in self.batches():
+            yield from batch
+
+    @property
+    def failed(self):
+        return [r for r in self.summary if r["error"]]
+
+    @property
+    def partial(self):
+        """Failed targets whose rows up to the failure are in the result"""
+        return [r for r in self.summary if r["partial"]]
+
+    def close(self):
+        """Stop the workers (they finish their current batch) and wait for them"""
+        self._stop.set()
+        # Unblock workers waiting for queue space
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._executor.shutdown(wait=True)
+
+
+def describe_summary(summary):
+    """One line per target: rows and time, or the error"""
+    lines = []
+    for r in sorted(summary, key=lambda r: r["source"]):
+        if r["partial"]:
+            lines.append(f"{r['source']}: FAILED after {r['seconds']:.1f}s - {r['error']} "
+                         f"(PARTIAL: its first {r['rows']:,} rows are in the result)")
+        elif r["error"]:
+            lines.append(f"{r['source']}: FAILED after {r['seconds']:.1f}s - {r['error']}")
+        else:
+            lines.append(f"{r['source']}: {r['rows']:,} rows in {r['seconds']:.1f}s")
+    return "\n".join(lines)
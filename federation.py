@@ -0,0 +1,267 @@
+"""
+Cross-source joins: tables from several databases (and CSV files) in one query.
+
+A query spec whose tables live in different places can't run on any one
+server. Instead each server table is fetched with its own small query -
+only the columns the spec uses, and the WHERE conditions that involve that
+table alone - into the local engine, where the whole spec then runs in the
+LOCAL_DB_TYPE dialect (DuckDB hash-joins; SQLite builds automatic indexes
+on the join columns). The full WHERE is always applied again locally, so a
+pushed-down condition only ever reduces what crosses the wire.
+
+DuckDB copies take their column types from the source: pyodbc's cursor
+description, or the catalog for MySQL (whose description has no decimal
+precision), so decimals keep their precision and scale. SQLite columns are
+untyped; whole decimals are stored as exact integers, other decimals as
+doubles.
+
+Remote tables are described by {table: RemoteTable}, table being the name
+the UI shows (which differs from the server's name when two sources have a
+table of the same name).
+"""
+import datetime
+import decimal
+import re
+import time
+from collections import namedtuple
+
+from catalog import fetch_mysql_column_types, normalize_type
+from connections import fetch_batches
+from sql_builder import LOCAL_DB_TYPE, build_query_parts, quote_identifier, render_sql
+
+# conn: open DB-API connection; lock: held while conn is used (or None); source: label for messages
+RemoteTable = namedtuple("RemoteTable", "conn db_type name source lock")
+
+
+def _split(ref):
+    """"table.column" -> ("table", "column"); a bare name (alias) -> (None, name)"""
+    if "." in ref:
+        return tuple(ref.split(".", 1))
+    return None, ref
+
+
+def spec_references(spec):
+    """Every "table.column" the spec refers to, in first-use order"""
+    refs = []
+    for table in spec.get("tables", []):
+        refs += [f"{table}.{column}" for column in spec.get("columns", {}).get(table, [])]
+    for combined in spec.get("combined_columns", []):
+        if combined.get("alias"):
+            refs += combined.get("columns", [])
+    refs += [agg.get("column") for agg in spec.get("aggregates", [])]
+    for i, join in enumerate(spec.get("joins", [])):
+        # Composite joins list their columns comma separated
+        right = join.get("right_table")
+        refs += [f"{right}.{c.strip()}" for c in (join.get("right_column") or "").split(",")]
+        for left_column in (join.get("left_column") or "").split(","):
+            left_column = left_column.strip()
+            if i == 0:
+                refs.append(f"{join.get('left_table') or spec['tables'][0]}.{left_column}")
+            else:
+                refs.append(left_column)
+    refs += [cond.get("column") for cond in spec.get("where", [])]
+    refs += list(spec.get("group_by", []))
+    refs += [order.get("column") for order in spec.get("order_by", [])]
+
+    seen = []
+    for ref in refs:
+        if ref and "." in ref and ref not in seen:
+            seen.append(ref)
+    return seen
+
+
+def columns_used(spec, table):
+    """Columns of one table the spec needs, in first-use order"""
+    return [column for t, column in (_split(ref) for ref in spec_references(spec)) if t == table]
+
+
+def nullable_tables(spec):
+    """Tables on the NULL-extended side of an outer join, whose rows must not be pre-filtered"""
+    tables = spec.get("tables", [])
+    nullable = set()
+    joined = [tables[0]] if tables else []
+    for join in spec.get("joins", []):
+        join_type = (join.get("join_type") or "INNER JOIN").upper()
+        right = join.get("right_table")
+        if "LEFT" in join_type or "FULL" in join_type:
+            nullable.add(right)
+        if "RIGHT" in join_type or "FULL" in join_type:
+            nullable.update(joined)
+        joined.append(right)
+    return nullable
+
+
+def pushdown_conditions(spec, table):
+    """
+    WHERE conditions that can be evaluated on table's own server.
+
+    Only a pure AND chain can be split, and only tables whose rows are kept
+    as-is by the joins (not NULL-extended) can be filtered early.
+    """
+    conditions = [cond for cond in spec.get("where", []) if cond.get("column")]
+    if table in nullable_tables(spec):
+        return []
+    if any((cond.get("connector") or "AND").upper() != "AND" for cond in conditions[:-1]):
+        return []
+    return [cond for cond in conditions if _split(cond["column"])[0] == table]
+
+
+def remote_query(spec, table, remote):
+    """SQL fetching the part of table the spec needs, in the remote server's dialect"""
+    columns = columns_used(spec, table)
+    if not columns:
+        raise ValueError(f"The query does not use any column of {table}")
+
+    def renamed(ref):
+        return f"{remote.name}.{_split(ref)[1]}"
+
+    sub_spec = {
+        "tables": [remote.name],
+        "columns": {remote.name: columns},
+        "where": [dict(cond, column=renamed(cond["column"])) for cond in pushdown_conditions(spec, table)],
+    }
+    return render_sql(build_query_parts(sub_spec, remote.db_type), remote.db_type, terminate=False), columns
+
+
+# Python value type (as pyodbc describes columns) -> DuckDB column type
+DUCKDB_TYPES = [
+    (bool, "BOOLEAN"), (int, "BIGINT"), (float, "DOUBLE"),
+    (datetime.datetime, "TIMESTAMP"), (datetime.date, "DATE"), (datetime.time, "TIME"),
+    (bytes, "BLOB"), (bytearray, "BLOB"),
+]
+# MySQL catalog base type -> DuckDB column type; decimals keep their own precision and scale
+MYSQL_DUCKDB_TYPES = {
+    "tinyint": "BIGINT", "smallint": "BIGINT", "mediumint": "BIGINT", "int": "BIGINT", "integer": "BIGINT",
+    "bigint": "BIGINT", "year": "BIGINT", "bit": "BIGINT",
+    "float": "DOUBLE", "double": "DOUBLE", "real": "DOUBLE",
+    "date": "DATE", "datetime": "TIMESTAMP", "timestamp": "TIMESTAMP",
+    "binary": "BLOB", "varbinary": "BLOB", "tinyblob": "BLOB", "blob": "BLOB", "mediumblob": "BLOB", "longblob": "BLOB",
+}
+# Widest DECIMAL DuckDB has; wider ones are copied as exact text
+DUCKDB_MAX_PRECISION = 38
+
+
+def _decimal_type(precision, scale):
+    if not precision or precision > DUCKDB_MAX_PRECISION:
+        return "VARCHAR"
+    return f"DECIMAL({precision}, {scale or 0})"
+
+
+def _duckdb_type(desc, catalog_type=None):
+    """
+    DuckDB type of one fetched column, from the source's catalog type (MySQL)
+    or from the cursor description (pyodbc, which reports each column's
+    Python type and a decimal's precision and scale); VARCHAR otherwise.
+    """
+    if catalog_type:
+        base = normalize_type(catalog_type)
+        if base in ("decimal", "numeric"):
+            match = re.search(r"\((\d+)(?:,\s*(\d+))?\)", catalog_type)
+            return _decimal_type(int(match.group(1)), int(match.group(2) or 0)) if match else _decimal_type(10, 0)
+        if base == "bigint" and "unsigned" in catalog_type.lower():
+            return "UBIGINT"
+        return MYSQL_DUCKDB_TYPES.get(base, "VARCHAR")
+    type_code = desc[1]
+    if type_code is decimal.Decimal:
+        return _decimal_type(desc[4], desc[5])
+    return next((name for kind, name in DUCKDB_TYPES if type_code is kind), "VARCHAR")
+
+
+def _local_value(value):
+    # SQLite stores numbers, text and bytes only; whole decimals stay exact as integers
+    if isinstance(value, decimal.Decimal):
+        if value == value.to_integral_value() and -2 ** 63 <= value < 2 ** 63:
+            return int(value)
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    return value
+
+
+def _column_definitions(engine, columns, description, catalog_types):
+    """Column list for the local copy; SQLite columns are untyped, DuckDB ones typed like the source's"""
+    definitions = []
+    for column, desc in zip(columns, description):
+        definition = quote_identifier(column, LOCAL_DB_TYPE)
+        if engine.kind == "DuckDB":
+            definition += " " + _duckdb_type(desc, catalog_types.get(column))
+        definitions.append(definition)
+    return ", ".join(definitions)
+
+
+def materialize(engine, table, remote, sql, columns, batch_size=5000, progress=None):
+    """Run sql on the remote connection and load its rows into the local engine as table. Returns the row count"""
+    name = quote_identifier(table, LOCAL_DB_TYPE)
+    insert = f"INSERT INTO {name} VALUES ({', '.join('?' * len(columns))})"
+    convert = engine.kind == "SQLite"
+
+    if remote.lock:
+        remote.lock.acquire()
+    try:
+        cursor = remote.conn.cursor()
+        try:
+            # MySQL's cursor description has no decimal precision; its catalog has
+            catalog_types = {}
+            if engine.kind == "DuckDB" and remote.db_type == "MySQL":
+                catalog_types = fetch_mysql_column_types(cursor, remote.conn.database, remote.name)
+            cursor.execute(sql)
+            engine.conn.execute(f"DROP TABLE IF EXISTS {name}")
+            engine.conn.execute(
+                f"CREATE TABLE {name} ({_column_definitions(engine, columns, cursor.description, catalog_types)})")
+
+            rows = 0
+            for batch in fetch_batches(cursor, batch_size):
+                if not batch:
+                    continue
+                if convert:
+                    batch = [[_local_value(value) for value in row] for row in batch]
+                else:
+                    batch = [list(row) for row in batch]
+                engine.conn.executemany(insert, batch)
+                rows += len(batch)
+                if progress:
+                    progress(table, rows)
+        finally:
+            cursor.close()
+    finally:
+        if remote.lock:
+            remote.lock.release()
+    engine.conn.commit()
+    return rows
+
+
+def federate(engine, spec, remotes, progress=None):
+    """
+    Copy the needed part of every remote table of spec into the local engine.
+
+    remotes maps spec table names to RemoteTable. Afterwards the spec can be
+    rendered in LOCAL_DB_TYPE and run on engine. Returns per-table results
+    (table, source, sql, rows, seconds).
+    """
+    results = []
+    for table in spec["tables"]:
+        remote = remotes.get(table)
+        if remote is None:
+            continue
+        start = time.perf_counter()
+        sql, columns = remote_query(spec, table, remote)
+        rows = materialize(engine, table, remote, sql, columns, progress=progress)
+        results.append({"table": table, "source": remote.source, "sql": sql, "rows": rows,
+                        "seconds": time.perf_counter() - start})
+    return results
+
+
+def describe_pushdown(spec, remotes):
+    """SQL comment lines showing what each source will be asked for"""
+    lines = []
+    for table in spec["tables"]:
+        remote = remotes.get(table)
+        if remote is None:
+            continue
+        sql, _ = remote_query(spec, table, remote)
+        lines.append(f"-- {table} from {remote.source}: " + " ".join(sql.split()))
+    return "\n".join(lines)
@@ -0,0 +1,386 @@
+"""
+Headless mode: generate -> execute -> export without a display.
+
+Runs a query spec (the same structure the UI builds: tables, columns, joins,
+where, group/order...) or raw SQL through the shared SQL builder and
+fetch/export pipeline, streaming rows to a file or stdout. Nothing here
+imports tkinter, so it starts quickly and runs on servers with no display.
+
+Examples:
+    python headless.py --db-type MySQL --server db1 --database sales \\
+        --username report --spec nightly.toml --output nightly.csv
+    python headless.py --server sql01 --database crm --sql "SELECT * FROM Accounts" > accounts.csv
+    python headless.py --server sql01 --database crm --spec orders.json \
+        --parallel 8 --partition-column Orders.OrderID --output orders.csv
+    python headless.py --server sql01 --database crm --spec orders.json \
+        --incremental Orders.UpdatedAt --output orders.csv
+    python headless.py --server sql01 --database crm --spec orders.json \
+        --record orders.sqlrec --output orders.csv
+    python headless.py --replay orders.sqlrec --replay-latency --output orders.csv
+    python headless.py --csv customers.csv --csv regions.csv --spec by_region.json -o out.csv
+    python headless.py --server sql01 --spec report.json \
+        --fan-out tenant01,tenant02,sql02/tenant03 --output report.csv
+
+The password is read from --password or the SQL_FETCHER_PASSWORD environment
+variable, so it does not have to appear in the process list.
+"""
+import argparse
+import os
+import sys
+import time
+
+from connections import open_connection, fetch_batches
+import arrow_fetch
+from exporters import parquet_types, write_csv, write_excel, write_parquet
+from fanout import DEFAULT_WORKERS, FanOut, describe_summary, parse_targets
+from incremental import DEFAULT_STATE_FILE, extract_incremental
+from local_engine import LocalEngine, table_name_for
+from parallel_extract import extract_parallel
+from query_spec import load_spec
+from replay import RecordingCursor, ReplayConnection
+from sql_builder import LOCAL_DB_TYPE, QueryBuildError, build_query_parts, format_column, render_sql
+
+PASSWORD_ENV = "SQL_FETCHER_PASSWORD"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a SQL Data Fetcher query without the UI")
+
+    conn = parser.add_argument_group("connection")
+    conn.add_argument("--db-type", choices=["SQL Server", "MySQL"], default="SQL Server")
+    conn.add_argument("--csv", action="append", metavar="PATH",
+                      help="query this CSV file locally instead of connecting; it becomes a table "
+                           "named after the file (repeat for several files)")
+    conn.add_argument("--server", default="")
+    conn.add_argument("--port", default="3306")
+    conn.add_argument("--database", default="")
+    conn.add_argument("--username", default="")
+    conn.add_argument("--password", default=None,
+                      help=f"defaults to the {PASSWORD_ENV} environment variable")
+    conn.add_argument("--auth-type", choices=["Windows Authentication", "SQL Server Authentication"],
+                      default=None, help="SQL Server only; defaults to SQL Server Authentication when --username is given")
+
+    query = parser.add_argument_group("query").add_mutually_exclusive_group(required=True)
+    query.add_argument("--spec", help="query spec file (.json or .toml)")
+    query.add_argument("--sql", help="raw SQL to run")
+    query.add_argument("--sql-file", help="file containing raw SQL to run")
+    query.add_argument("--replay", metavar="RECORDING",
+                       help="replay a recorded run instead of connecting (see replay.py)")
+
+    out = parser.add_argument_group("output")
+    out.add_argument("--output", "-o", default="-", help="output file, or - for stdout (default)")
+    out.add_argument("--format", choices=["csv", "xlsx", "parquet"], default=None,
+                     help="output format (default: from the output file extension, else csv)")
+    out.add_argument("--preview", type=int, default=None, metavar="ROWS",
+                     help="limit a spec query to its first ROWS rows")
+    out.add_argument("--batch-size", type=int, default=5000, help="rows per fetch (default 5000)")
+    out.add_argument("--print-sql", action="store_true", help="print the generated SQL and exit")
+    out.add_argument("--record", metavar="RECORDING",
+                     help="also record the result and its fetch timings to this file, for --replay")
+    out.add_argument("--replay-latency", action="store_true",
+                     help="with --replay, wait as long as the recorded query and fetches took")
+
+    parallel = parser.add_argument_group("parallel extraction (spec queries, CSV files only)")
+    parallel.add_argument("--parallel", type=int, default=1, metavar="N",
+                          help="split the query into N key ranges, each fetched on its own connection")
+    parallel.add_argument("--partition-column", metavar="TABLE.COLUMN",
+                          help="numeric or date column to split on, usually the primary key")
+    parallel.add_argument("--histogram", action="store_true",
+                          help="place range boundaries by row count (NTILE) instead of evenly between MIN and MAX")
+    parallel.add_argument("--partitioned", action="store_true",
+                          help="keep one output file per range instead of merging them")
+
+    fan_out = parser.add_argument_group("fan-out (the same query on many databases)")
+    fan_out.add_argument("--fan-out", metavar="DATABASES",
+                         help="run the query on each of these comma-separated databases (server/database for "
+                              "other servers, @FILE to read them from a file) and combine the rows, "
+                              "with the database in a first 'source' column")
+    fan_out.add_argument("--fan-out-workers", type=int, default=DEFAULT_WORKERS, metavar="N",
+                         help=f"databases queried at the same time (default {DEFAULT_WORKERS})")
+
+    incremental = parser.add_argument_group("incremental extraction (spec queries only)")
+    incremental.add_argument("--incremental", metavar="TABLE.COLUMN",
+                             help="only fetch rows whose COLUMN (an increasing id or updated_at) is past the last run's watermark, "
+                                  "appending to --output (.csv file or .parquet directory of part files)")
+    incremental.add_argument("--state-file", default=DEFAULT_STATE_FILE,
+                             help=f"where watermarks are kept (default {DEFAULT_STATE_FILE})")
+    incremental.add_argument("--full-refresh", action="store_true",
+                             help="ignore the stored watermark and export everything again")
+    return parser
+
+
+def connection_settings(args):
+    """Connection settings dictionary from the command line, in the Connect tab's shape"""
+    auth_type = args.auth_type
+    if auth_type is None:
+        auth_type = "SQL Server Authentication" if args.username else "Windows Authentication"
+    return {
+        "db_type": args.db_type,
+        "server": args.server,
+        "port": args.port,
+        "database": args.database,
+        "username": args.username,
+        "password": args.password if args.password is not None else os.environ.get(PASSWORD_ENV, ""),
+        "auth_type": auth_type,
+    }
+
+
+def resolve_parts(args):
+    """Query parts for a spec job, with the preview limit applied"""
+    parts = build_query_parts(load_spec(args.spec), args.db_type)
+    if args.preview:
+        parts["limit"] = args.preview
+    return parts
+
+
+def resolve_sql(args):
+    """SQL to run: raw SQL as given, or a spec rendered through the shared builder"""
+    if args.sql:
+        return args.sql
+    if args.sql_file:
+        with open(args.sql_file, encoding="utf-8") as f:
+            return f.read()
+    if args.replay:
+        return ReplayConnection(args.replay).executions[0]["sql"]
+
+    return render_sql(resolve_parts(args), args.db_type)
+
+
+def output_format(args):
+    if args.format:
+        return args.format
+    for fmt in ("xlsx", "parquet"):
+        if args.output.lower().endswith("." + fmt):
+            return fmt
+    return "csv"
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def run_parallel(args):
+    """Export a spec query over several connections, one key range each"""
+    if not args.spec:
+        raise ValueError("--parallel needs a --spec query")
+    if not args.partition_column:
+        raise ValueError("--parallel needs --partition-column")
+    if args.output == "-" or output_format(args) != "csv":
+        raise ValueError("--parallel writes CSV files; give an --output file name ending in .csv")
+
+    # Called from the worker threads with the running total
+    reported = [0]
+    def progress(done):
+        if done - reported[0] >= 100000:
+            reported[0] = done
+            log(f"{done} rows...")
+
+    start = time.perf_counter()
+    results = extract_parallel(
+        connection_settings(args), resolve_parts(args),
+        format_column(args.partition_column, args.db_type), args.db_type, args.output,
+        partitions=args.parallel, merge=not args.partitioned, histogram=args.histogram,
+        batch_size=args.batch_size, progress=progress, column=args.partition_column)
+
+    for i, result in enumerate(results):
+        log(f"Range {i + 1}: {result['rows']} rows in {result['seconds']:.2f}s")
+    count = sum(result["rows"] for result in results)
+    log(f"Exported {count} rows in {time.perf_counter() - start:.2f}s over {args.parallel} connections")
+    return count
+
+
+def run_incremental(args):
+    """Export the rows added since the last run of the same job"""
+    if not args.spec:
+        raise ValueError("--incremental needs a --spec query")
+    fmt = output_format(args)
+    if args.output == "-" or fmt == "xlsx":
+        raise ValueError("--incremental appends to a .csv file or a .parquet directory given with --output")
+    output = args.output
+    if fmt == "parquet" and not output.lower().endswith(".parquet"):
+        output += ".parquet"
+
+    start = time.perf_counter()
+    conn = open_connection(connection_settings(args))
+    try:
+        result = extract_incremental(
+            conn, connection_settings(args), resolve_parts(args),
+            format_column(args.incremental, args.db_type), args.db_type, output,
+            state_path=args.state_file, full_refresh=args.full_refresh, batch_size=args.batch_size,
+            progress=lambda done: log(f"{done} rows..."), progress_every=100000)
+    finally:
+        conn.close()
+
+    since = "the beginning" if result["previous"] is None else result["previous"]
+    log(f"Exported {result['rows']} rows since {since} in {time.perf_counter() - start:.2f}s; "
+        f"watermark is now {result['watermark']}")
+    return result["rows"]
+
+
+def run_fan_out(args, sql, fmt):
+    """Export the combined rows of the query run on every --fan-out database"""
+    text = args.fan_out
+    if text.startswith("@"):
+        with open(text[1:], encoding="utf-8") as f:
+            text = f.read()
+    targets = parse_targets(text, connection_settings(args))
+
+    start = time.perf_counter()
+    fan = FanOut(targets, sql, workers=args.fan_out_workers, batch_size=args.batch_size)
+    progress = lambda done: log(f"{done} rows...")
+    if fmt == "xlsx":
+        count = write_excel(args.output, fan.columns, fan.rows(), progress)
+    elif args.output == "-":
+        sys.stdout.reconfigure(newline="")
+        count = write_csv(sys.stdout, fan.columns, fan.rows(), progress, progress_every=100000)
+        sys.stdout.flush()
+    else:
+        count = write_csv(args.output, fan.columns, fan.rows(), progress, progress_every=100000)
+
+    log(describe_summary(fan.summary))
+    failed = fan.failed
+    log(f"Exported {count} rows from {len(targets) - len(failed)} of {len(targets)} databases "
+        f"in {time.perf_counter() - start:.2f}s")
+    if failed:
+        partial = fan.partial
+        raise RuntimeError(f"The query failed on {len(failed)} database(s)"
+                           + (f"; the output holds incomplete rows from {', '.join(r['source'] for r in partial)}"
+                              if partial else ""))
+    return count
+
+
+def arrow_fits(args, sql):
+    """Whether arrow-odbc can fetch every column of sql whole; columns without a length limit go through pyodbc"""
+    conn = open_connection(connection_settings(args))
+    try:
+        unbounded = arrow_fetch.unbounded_columns(conn.cursor(), sql)
+    finally:
+        conn.close()
+    if unbounded:
+        log(f"Fetching through pyodbc: no length limit on {', '.join(unbounded)}")
+    return unbounded == []
+
+
+def run_arrow_parquet(args, sql):
+    """Export a SQL Server query to Parquet through arrow-odbc record batches"""
+    start = time.perf_counter()
+    reader = arrow_fetch.ArrowReader(connection_settings(args), sql, batch_size=args.batch_size)
+    log(f"Query executed in {time.perf_counter() - start:.2f}s, {len(reader.columns)} columns (arrow-odbc)")
+
+    reported = [0]
+    def progress(done):
+        if done - reported[0] >= 100000:
+            reported[0] = done
+            log(f"{done} rows...")
+
+    count = arrow_fetch.write_parquet_batches(args.output, reader, progress)
+    log(f"Exported {count} rows in {time.perf_counter() - start:.2f}s")
+    return count
+
+
+def open_local_engine(paths):
+    """Local engine with each CSV file registered as a table named after the file"""
+    engine = LocalEngine()
+    for path in paths:
+        table = table_name_for(path, engine.tables)
+        info = engine.register_csv(path, table)
+        log(f"{path} is table {table}: {len(info['columns'])} columns, ~{info['rows']} rows")
+
+    def progress(table, rows):
+        if rows % 1000000 == 0:
+            log(f"Loading {table}: {rows} rows...")
+
+    engine.ensure_loaded(progress=progress)
+    return engine
+
+
+def run(args):
+    """Execute the job described by parsed arguments. Returns the exported row count"""
+    if args.csv:
+        if args.incremental or args.parallel > 1 or args.fan_out:
+            raise ValueError("--incremental, --parallel and --fan-out read from a server, not from --csv files")
+        # Spec queries are rendered for the local engine
+        args.db_type = LOCAL_DB_TYPE
+
+    if args.fan_out and (args.incremental or args.parallel > 1 or args.replay):
+        raise ValueError("--fan-out can't be combined with --incremental, --parallel or --replay")
+
+    if args.incremental and not args.print_sql:
+        return run_incremental(args)
+    if args.parallel > 1 and not args.print_sql:
+        return run_parallel(args)
+
+    sql = resolve_sql(args)
+    if args.print_sql:
+        print(sql)
+        return 0
+
+    fmt = output_format(args)
+    if fmt == "xlsx" and args.output == "-":
+        raise ValueError("Excel output needs a file name (--output)")
+    if fmt == "parquet" and args.output == "-":
+        raise ValueError("Parquet output needs a file name (--output)")
+    if args.fan_out:
+        if fmt == "parquet":
+            raise ValueError("--fan-out writes CSV or Excel")
+        return run_fan_out(args, sql, fmt)
+
+    # Straight from ODBC column buffers to Parquet, without Python rows
+    if (fmt == "parquet" and args.db_type == "SQL Server" and not (args.replay or args.csv or args.record)
+            and arrow_fetch.available() and arrow_fits(args, sql)):
+        return run_arrow_parquet(args, sql)
+
+    start = time.perf_counter()
+    if args.replay:
+        conn = ReplayConnection(args.replay, latency=args.replay_latency)
+    elif args.csv:
+        conn = open_local_engine(args.csv)
+    else:
+        conn = open_connection(connection_settings(args))
+    try:
+        cursor = conn.cursor()
+        if args.record:
+            cursor = RecordingCursor(cursor, args.record, args.db_type)
+        cursor.execute(sql)
+        columns = [desc[0] for desc in cursor.description]
+        log(f"Query executed in {time.perf_counter() - start:.2f}s, {len(columns)} columns")
+
+        # Stream rows straight from the cursor to the writer
+        rows = (row for batch in fetch_batches(cursor, args.batch_size) for row in batch)
+        progress = lambda done: log(f"{done} rows...")
+
+        if fmt == "xlsx":
+            count = write_excel(args.output, columns, rows, progress)
+        elif fmt == "parquet":
+            count = write_parquet(args.output, columns, rows, progress, types=parquet_types(cursor.description))
+        elif args.output == "-":
+            # csv.writer supplies its own line endings
+            sys.stdout.reconfigure(newline="")
+            count = write_csv(sys.stdout, columns, rows, progress, progress_every=100000)
+            sys.stdout.flush()
+        else:
+            count = write_csv(args.output, columns, rows, progress, progress_every=100000)
+
+        cursor.close()
+    finally:
+        conn.close()
+
+    log(f"Exported {count} rows in {time.perf_counter() - start:.2f}s")
+    return count
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        run(args)
+    except QueryBuildError as e:
+        log(f"{e.title}: {e.message}")
+        return 2
+    except Exception as e:
+        log(f"Error: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
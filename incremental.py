@@ -0,0 +1,213 @@
+"""
+Incremental extraction: fetch only rows past the last exported watermark.
+
+Each (server, database, query, watermark column, output) combination keeps
+a high-watermark - the largest value of an ever-increasing column such as an
+auto-increment id or an updated_at timestamp - in a JSON state file. A run
+adds "column > watermark" to the generated query, appends the delta to the
+existing output and only then moves the watermark forward, so a failed run
+is simply repeated. A failed run leaves the output as it was: rows it
+appended to a CSV are cut off again, and a full refresh only replaces the
+old output once the new one is complete. With an updated_at column the
+output is a change log: an updated row is appended again rather than
+rewritten in place.
+
+Outputs are a CSV file (appended to) or a directory of Parquet part files
+(one new part per run; needs pyarrow).
+"""
+import datetime
+import decimal
+import hashlib
+import json
+import os
+
+from connections import fetch_batches
+from exporters import parquet_types, write_csv, write_parquet
+from sql_builder import QueryBuildError, add_condition, param_placeholder, render_sql
+
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".sql_data_fetcher", "watermarks.json")
+
+# Hidden column carrying the watermark value of each row
+WATERMARK_ALIAS = "incremental_watermark"
+
+
+def encode_value(value):
+    """JSON form of a watermark that remembers its type"""
+    if isinstance(value, datetime.datetime):
+        return {"type": "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"type": "date", "value": value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {"type": "decimal", "value": str(value)}
+    return {"type": "value", "value": value}
+
+
+def decode_value(data):
+    kind, value = data["type"], data["value"]
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(value)
+    if kind == "date":
+        return datetime.date.fromisoformat(value)
+    if kind == "decimal":
+        return decimal.Decimal(value)
+    return value
+
+
+class WatermarkStore:
+    """Watermarks of all incremental jobs, kept in one JSON file"""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.jobs = json.load(f)
+
+    def get(self, key):
+        job = self.jobs.get(key)
+        return decode_value(job["watermark"]) if job else None
+
+    def set(self, key, watermark, **info):
+        self.jobs[key] = dict(info, watermark=encode_value(watermark),
+                              updated=datetime.datetime.now().isoformat(timespec="seconds"))
+
+    def reset(self, key):
+        self.jobs.pop(key, None)
+
+    def save(self):
+        # Write then rename, so a crash never leaves a half-written state file
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.jobs, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def job_key(settings, parts, key, db_type, output):
+    """Identity of an incremental job: where it reads, what it reads and where it writes"""
+    identity = "\n".join([
+        settings.get("db_type", ""), settings.get("server", ""), settings.get("database", ""),
+        render_sql(parts, db_type), key, os.path.abspath(output),
+    ])
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def incremental_query(parts, key, watermark, db_type):
+    """SQL and parameters for the rows past a watermark, with the key value as a trailing hidden column"""
+    if parts.get("limit") is not None:
+        raise QueryBuildError("Incremental Export", "Preview mode limits the query to a few rows; turn it off to export incrementally")
+    if parts.get("group_by") and key not in parts["group_by"]:
+        raise QueryBuildError("Watermark Column", "For grouped queries the watermark column must be one of the GROUP BY columns")
+
+    page = dict(parts)
+    page["select"] = list(parts["select"]) + [f"{key} AS {WATERMARK_ALIAS}"]
+    params = []
+    if watermark is not None:
+        page["where"] = add_condition(parts.get("where"), f"{key} > {param_placeholder(db_type)}")
+        params.append(watermark)
+    return render_sql(page, db_type, terminate=False), params
+
+
+def _part_files(directory):
+    return [name for name in os.listdir(directory) if name.startswith("part-") and name.endswith(".parquet")]
+
+
+def _write_parquet_part(directory, columns, rows, types=None):
+    """Write rows as the next part-NNNNN.parquet file in directory. Returns the row count"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{len(_part_files(directory)) + 1:05d}.parquet")
+    return write_parquet(path, columns, rows, types=types)
+
+
+def _replace_parquet_parts(directory, columns, rows, types=None):
+    """Write rows as the only part in directory; the old parts are removed once it is complete"""
+    os.makedirs(directory, exist_ok=True)
+    # A leading dot hides the file from readers of the directory until it is renamed
+    staged = os.path.join(directory, ".refresh.parquet")
+    count = write_parquet(staged, columns, rows, types=types)
+    for name in _part_files(directory):
+        os.remove(os.path.join(directory, name))
+    os.replace(staged, os.path.join(directory, "part-00001.parquet"))
+    return count
+
+
+def _append_csv(path, columns, rows, progress, progress_every):
+    """Append rows without a header; a failure cuts the file back so a retry doesn't repeat them"""
+    size = os.path.getsize(path)
+    try:
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            return write_csv(f, columns, rows, progress, progress_every, header=False)
+    except BaseException:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+        raise
+
+
+def _replace_csv(path, columns, rows, progress, progress_every):
+    """Write a new file next to path and move it over path once it is complete"""
+    staged = path + ".tmp"
+    try:
+        with open(staged, "w", newline="", encoding="utf-8") as f:
+            count = write_csv(f, columns, rows, progress, progress_every)
+    except BaseException:
+        if os.path.exists(staged):
+            os.remove(staged)
+        raise
+    os.replace(staged, path)
+    return count
+
+
+def extract_incremental(conn, settings, parts, key, db_type, output, state_path=DEFAULT_STATE_FILE,
+                        full_refresh=False, batch_size=5000, progress=None, progress_every=5000):
+    """
+    Export the rows added since the last run and move the watermark forward.
+
+    key is the formatted watermark column expression. Output ending in
+    .parquet is a directory of part files, anything else a CSV file that is
+    appended to. Returns a dict with rows, previous and watermark.
+    """
+    store = WatermarkStore(state_path)
+    job = job_key(settings, parts, key, db_type, output)
+    previous = None if full_refresh else store.get(job)
+    parquet = output.lower().endswith(".parquet")
+
+    sql, params = incremental_query(parts, key, previous, db_type)
+    cursor = conn.cursor()
+    try:
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        columns = [desc[0] for desc in cursor.description][:-1]
+
+        newest = [previous]
+
+        def rows():
+            # Strip the hidden watermark column, remembering its largest value
+            for batch in fetch_batches(cursor, batch_size):
+                for row in batch:
+                    value = row[-1]
+                    if value is not None and (newest[0] is None or value > newest[0]):
+                        newest[0] = value
+                    yield row[:-1]
+
+        if parquet:
+            # Typed from the description, so every run's part gets the same schema
+            types = parquet_types(cursor.description)
+            write = _replace_parquet_parts if full_refresh else _write_parquet_part
+            count = write(output, columns, rows(), types and types[:-1])
+        elif previous is not None and os.path.exists(output):
+            count = _append_csv(output, columns, rows(), progress, progress_every)
+        else:
+            # A first run (or full refresh) starts the file
+            count = _replace_csv(output, columns, rows(), progress, progress_every)
+    finally:
+        cursor.close()
+
+    if newest[0] is not None and newest[0] != previous:
+        store.set(job, newest[0], column=key, output=os.path.abspath(output))
+        store.save()
+
+    return {"rows": count, "previous": previous, "watermark": newest[0]}
@@ -0,0 +1,223 @@
+"""
+Join graph used to pre-fill the join configuration.
+
+Tables are nodes and joinable column lists are edges. Edges come from
+foreign key metadata where the database has it (a composite key is one edge
+over all its columns), and from column name/type heuristics for tables
+without any declared foreign keys (CSV tables, legacy schemas). Declared
+keys are preferred over guesses when planning paths.
+"""
+import heapq
+
+from catalog import normalize_type
+
+# Path costs: a declared foreign key always beats a name-based guess
+FK_COST = 1.0
+HEURISTIC_COST = 1.5
+
+# Type families that can be compared in a join without conversion surprises
+TYPE_FAMILIES = {
+    "int": "integer", "integer": "integer", "bigint": "integer", "smallint": "integer",
+    "tinyint": "integer", "mediumint": "integer",
+    "decimal": "numeric", "numeric": "numeric",
+    "char": "text", "varchar": "text", "nchar": "text", "nvarchar": "text",
+    "uniqueidentifier": "guid",
+    "date": "date", "datetime": "datetime", "datetime2": "datetime", "timestamp": "datetime",
+}
+
+
+class JoinGraph:
+    """Graph of joinable column pairs between tables"""
+
+    def __init__(self):
+        # table -> list of (other_table, own_columns, other_columns, cost); columns are tuples in key order
+        self.edges = {}
+
+    def add_edge(self, left_table, left_columns, right_table, right_columns, cost=FK_COST):
+        """Add an undirected join edge between two columns, or two equally long tuples of columns"""
+        if left_table == right_table:
+            return
+        left_columns = _as_columns(left_columns)
+        right_columns = _as_columns(right_columns)
+        self.edges.setdefault(left_table, []).append((right_table, left_columns, right_columns, cost))
+        self.edges.setdefault(right_table, []).append((left_table, right_columns, left_columns, cost))
+
+    @classmethod
+    def from_catalog(cls, tables, primary_keys=None, foreign_keys=None, column_types=None):
+        """
+        Build the graph from catalog metadata.
+
+        tables maps table name to its columns, foreign_keys is a list of
+        (table, columns, referenced_table, referenced_columns) tuples as
+        returned by catalog.fetch_foreign_keys.
+        """
+        graph = cls()
+        primary_keys = primary_keys or {}
+        column_types = column_types or {}
+
+        with_fks = set()
+        for table, columns, ref_table, ref_columns in foreign_keys or []:
+            if table in tables and ref_table in tables:
+                graph.add_edge(table, columns, ref_table, ref_columns, FK_COST)
+                with_fks.update((table, ref_table))
+
+        # Guess edges only for tables the database gave us nothing for
+        guess_tables = set(t for t in tables if t not in with_fks)
+        if guess_tables:
+            for left, left_col, right, right_col in _guess_edges(tables, guess_tables, primary_keys, column_types):
+                graph.add_edge(left, left_col, right, right_col, HEURISTIC_COST)
+
+        return graph
+
+    def key_columns(self, table):
+        """Columns of a table that take part in any join edge, in first-seen order"""
+        seen = []
+        for _, own_columns, _, _ in self.edges.get(table, []):
+            for column in own_columns:
+                if column not in seen:
+                    seen.append(column)
+        return seen
+
+    def shortest_path(self, sources, target, allowed=None):
+        """
+        Cheapest chain of edges from any table in sources to target.
+
+        Returns a list of (left_table, left_columns, right_table, right_columns)
+        or None when the target cannot be reached through allowed tables.
+        """
+        heap = [(0.0, i, table, []) for i, table in enumerate(sources)]
+        heapq.heapify(heap)
+        best = {}
+        counter = len(heap)
+
+        while heap:
+            cost, _, table, path = heapq.heappop(heap)
+            if table == target:
+                return path
+            if table in best and best[table] <= cost:
+                continue
+            best[table] = cost
+
+            for other, own_columns, other_columns, edge_cost in self.edges.get(table, []):
+                if allowed is not None and other not in allowed:
+                    continue
+                if other in sources:
+                    continue
+                counter += 1
+                heapq.heappush(heap, (cost + edge_cost, counter, other,
+                                      path + [(table, own_columns, other, other_columns)]))
+        return None
+
+    def plan_joins(self, tables):
+        """
+        Plan joins connecting tables, starting from the first one.
+
+        Returns (joins, unreachable) where joins is a list of (left_table,
+        left_columns, right_table, right_columns) in an order where each left
+        table has already been joined, and unreachable lists tables with no
+        path through the selected tables. The column tuples are matched
+        pairwise (more than one pair for a composite key).
+        """
+        if not tables:
+            return [], []
+
+        allowed = set(tables)
+        joined = [tables[0]]
+        joins = []
+        unreachable = []
+
+        for target in tables[1:]:
+            if target in joined:
+                continue
+            path = self.shortest_path(joined, target, allowed)
+            if path is None:
+                unreachable.append(target)
+                continue
+            for edge in path:
+                if edge[2] not in joined:
+                    joins.append(edge)
+                    joined.append(edge[2])
+
+        return joins, unreachable
+
+    def bridging_tables(self, tables, target):
+        """Tables outside the selection that would link target to the selected tables"""
+        path = self.shortest_path([t for t in tables if t != target], target)
+        if not path:
+            return []
+        return [edge[2] for edge in path if edge[2] not in tables]
+
+
+def _as_columns(columns):
+    return (columns,) if isinstance(columns, str) else tuple(columns)
+
+
+def _singular(name):
+    name = name.lower()
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    if name.endswith("s") and not name.endswith("ss"):
+        return name[:-1]
+    return name
+
+
+def _types_compatible(column_types, left_table, left_col, right_table, right_col):
+    left_type = normalize_type(column_types.get(left_table, {}).get(left_col))
+    right_type = normalize_type(column_types.get(right_table, {}).get(right_col))
+    if not left_type or not right_type:
+        # Unknown types (e.g. CSV tables) don't rule a pair out
+        return True
+    return TYPE_FAMILIES.get(left_type, left_type) == TYPE_FAMILIES.get(right_type, right_type)
+
+
+def _guess_edges(tables, guess_tables, primary_keys, column_types):
+    """
+    Return (table, column, other_table, other_column) edges that look like key relationships.
+
+    Lookups go through a column-name index so this stays fast with hundreds of tables.
+    """
+    # lowered column name -> [(table, column)]
+    index = {}
+    for table, columns in tables.items():
+        for col in columns:
+            index.setdefault(col.lower(), []).append((table, col))
+
+    edges = []
+    seen = set()
+
+    def add(left, left_col, right, right_col):
+        key = frozenset(((left, left_col), (right, right_col)))
+        if left != right and key not in seen and (left in guess_tables or right in guess_tables) \
+                and _types_compatible(column_types, left, left_col, right, right_col):
+            seen.add(key)
+            edges.append((left, left_col, right, right_col))
+
+    for right, columns in tables.items():
+        singular = _singular(right)
+        anchors = primary_keys.get(right) or [c for c in columns if c.lower() == "id"]
+
+        # orders.customer_id -> customers.id, order_items.order_no -> orders.order_no.
+        # A key named without the table (code, name) only matches when prefixed
+        # with it, or every "code" column would join to this table.
+        for pk in anchors:
+            pk_lowered = pk.lower()
+            if pk_lowered == "id":
+                names = (f"{singular}_id", f"{singular}id")
+            elif singular in pk_lowered:
+                names = (pk_lowered, f"{singular}_{pk_lowered}")
+            else:
+                names = (f"{singular}_{pk_lowered}",)
+            for name in names:
+                for left, left_col in index.get(name, []):
+                    add(left, left_col, right, pk)
+
+    # Tables with no key to anchor on: pair up identical *_id column names
+    for name, owners in index.items():
+        if not name.endswith("_id") or len(owners) < 2:
+            continue
+        for i, (left, left_col) in enumerate(owners):
+            for right, right_col in owners[i + 1:]:
+                if not primary_keys.get(left) and not primary_keys.get(right):
+                    add(left, left_col, right, right_col)
+
+    return edges
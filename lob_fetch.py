@@ -0,0 +1,91 @@
+"""
+Full values of large-object columns that were fetched as a preview.
+
+Text and binary columns of LOB types (LONGTEXT, VARBINARY(MAX), BLOB, ...)
+can make up nearly all of a result's bytes while the grid only shows the
+start of each value. When the builder knows a column's type and its
+table's primary key, the query fetches just the first characters, the full
+length and the key (see sql_builder.build_lob_preview); this module reads
+the full value back by key when a cell is opened or the result is exported.
+Values that fit in the preview are already complete and are not read again.
+"""
+import contextlib
+
+from sql_builder import LOB_PREVIEW_LENGTH, format_column, format_table, param_placeholder
+
+# Rows looked up per statement when filling in a batch
+LOOKUP_ROWS = 500
+
+
+def lookup_query(lob, db_type, count=1):
+    """SELECT of the key columns and the full value for count rows, each given by its key values"""
+    table = lob["table"]
+    keys = [format_column(f"{table}.{key}", db_type) for key in lob["keys"]]
+    value = format_column(f"{table}.{lob['column']}", db_type)
+    placeholder = param_placeholder(db_type)
+    if len(keys) == 1:
+        where = f"{keys[0]} IN ({', '.join([placeholder] * count)})"
+    else:
+        match = "(" + " AND ".join(f"{key} = {placeholder}" for key in keys) + ")"
+        where = " OR ".join([match] * count)
+    return f"SELECT {', '.join(keys)}, {value} FROM {format_table(table, db_type)} WHERE {where}"
+
+
+def is_truncated(row, lob):
+    """Whether a fetched row (hidden columns included) holds only part of lob's value"""
+    length = row[lob["length_index"]]
+    # Display-only fetches return the length as text
+    return length is not None and int(length) > LOB_PREVIEW_LENGTH
+
+
+def _match_key(values):
+    # Display-only fetches hold the keys as text, so keys are compared that way
+    return tuple(str(value) for value in values)
+
+
+def fetch_full_value(cursor, row, lob, db_type):
+    """The full value of lob for one fetched row"""
+    if not is_truncated(row, lob):
+        return row[lob["position"]]
+    cursor.execute(lookup_query(lob, db_type), [row[i] for i in lob["key_indexes"]])
+    found = cursor.fetchall()
+    if not found:
+        raise LookupError(f"The row of {lob['table']} has been deleted since the query ran")
+    return found[0][-1]
+
+
+def fill_full_values(cursor, rows, lobs, db_type):
+    """Copies of a batch of fetched rows with every truncated preview replaced by its full value"""
+    rows = [list(row) for row in rows]
+    for lob in lobs:
+        pending = [row for row in rows if is_truncated(row, lob)]
+        for start in range(0, len(pending), LOOKUP_ROWS):
+            # A joined row can repeat a key; it is looked up once
+            by_key = {}
+            for row in pending[start:start + LOOKUP_ROWS]:
+                by_key.setdefault(_match_key(row[i] for i in lob["key_indexes"]), []).append(row)
+            params = []
+            for matching in by_key.values():
+                params.extend(matching[0][i] for i in lob["key_indexes"])
+
+            cursor.execute(lookup_query(lob, db_type, len(by_key)), params)
+            for found in cursor.fetchall():
+                for row in by_key.pop(_match_key(found[:-1]), []):
+                    row[lob["position"]] = found[-1]
+            if by_key:
+                raise LookupError(f"{len(by_key)} rows of {lob['table']} have been deleted since the query ran")
+    return rows
+
+
+def full_rows(store, lobs, cursor, db_type, lock=None):
+    """
+    The rows of a ResultStore in display column order, with full large-object values.
+
+    Each batch is filled in with one lookup per LOOKUP_ROWS truncated values,
+    holding lock (if given) while the cursor is in use.
+    """
+    for batch in store.iter_batches(raw=True):
+        with lock or contextlib.nullcontext():
+            batch = fill_full_values(cursor, batch, lobs, db_type)
+        for row in batch:
+            yield store.display_row(row)
@@ -0,0 +1,104 @@
+"""
+Embedded SQL engine for CSV files loaded alongside (or instead of) a server.
+
+Each CSV file becomes a table in a local, in-process database - DuckDB when
+it is installed (its CSV reader is vectorized and multi-threaded and the file
+is queried in place), SQLite otherwise. Registering a file only sniffs its
+header and a sample (csv_source.sniff_csv); SQLite tables are filled in
+batches the first time a query needs them. Queries generated in
+the LOCAL_DB_TYPE dialect, joins included, then run here and their cursors
+go through the same fetch/display/export code as server cursors, so
+reference CSVs can be joined without uploading them anywhere.
+"""
+import os
+import re
+import sqlite3
+
+from csv_source import iter_csv_batches, sniff_csv
+from sql_builder import LOCAL_DB_TYPE, quote_identifier
+
+# Rows per executemany call when loading into SQLite
+LOAD_BATCH_ROWS = 10000
+
+
+def table_name_for(path, taken=()):
+    """A table name derived from a CSV file name that is not already in taken"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = re.sub(r"\W+", "_", stem).strip("_") or "csv"
+    if name[0].isdigit():
+        name = "t_" + name
+    candidate, n = name, 2
+    while candidate in taken:
+        candidate = f"{name}_{n}"
+        n += 1
+    return candidate
+
+
+class LocalEngine:
+    """In-process database holding the registered CSV tables"""
+
+    def __init__(self):
+        try:
+            import duckdb
+            self.conn = duckdb.connect()
+            self.kind = "DuckDB"
+        except ImportError:
+            # Background exports read through their own cursors
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self.kind = "SQLite"
+        # table -> {"path", "columns", "types", "rows", "exact", "loaded"} plus the sniffed dialect
+        self.tables = {}
+
+    def register_csv(self, path, table):
+        """Make a CSV file (with a header row) queryable as table. Returns its info dictionary"""
+        info = sniff_csv(path)
+        name = quote_identifier(table, LOCAL_DB_TYPE)
+        if self.kind == "DuckDB":
+            literal = path.replace("'", "''")
+            self.conn.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_csv_auto('{literal}', header = true)")
+            described = self.conn.execute(f"DESCRIBE {name}").fetchall()
+            info["columns"] = [row[0] for row in described]
+            info["types"] = {row[0]: row[1] for row in described}
+            info["loaded"] = True
+        else:
+            # Typed columns: INTEGER/REAL affinity turns the text read from the file into numbers
+            definitions = ", ".join(f"{quote_identifier(col, LOCAL_DB_TYPE)} {info['sqlite_types'][col]}"
+                                    for col in info["columns"])
+            self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+            self.conn.execute(f"CREATE TABLE {name} ({definitions})")
+            info["types"] = info["catalog_types"]
+            info["loaded"] = False
+        self.tables[table] = info
+        return info
+
+    def ensure_loaded(self, tables=None, progress=None):
+        """Fill the SQLite tables a query needs (all registered tables by default) that are still empty"""
+        for table in (self.tables if tables is None else tables):
+            info = self.tables.get(table)
+            if info is None or info["loaded"]:
+                continue
+            name = quote_identifier(table, LOCAL_DB_TYPE)
+            insert = f"INSERT INTO {name} VALUES ({', '.join('?' * len(info['columns']))})"
+            rows = 0
+            try:
+                for batch in iter_csv_batches(info, LOAD_BATCH_ROWS):
+                    self.conn.executemany(insert, batch)
+                    rows += len(batch)
+                    if progress:
+                        progress(table, rows)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            info.update(rows=rows, exact=True, loaded=True)
+
+    def unregister(self, table):
+        kind = "VIEW" if self.kind == "DuckDB" else "TABLE"
+        self.conn.execute(f"DROP {kind} IF EXISTS {quote_identifier(table, LOCAL_DB_TYPE)}")
+        self.tables.pop(table, None)
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,125 @@
+"""
+Keyset (seek) pagination over a generated query.
+
+Only the rows of the current page are held in memory. Each page is fetched
+with a predicate on the ordering key instead of OFFSET, so page 10,000 costs
+the same as page 1, and the next page is prefetched on a background thread so
+moving forward is normally instant. A limit in the query's parts (preview
+mode) caps the rows of all pages together.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sql_builder import build_keyset_query
+
+
+class KeysetPager:
+    """Browse a query one page at a time using keyset predicates"""
+
+    def __init__(self, conn, parts, keys, db_type, page_size=500, lock=None):
+        if not keys:
+            raise ValueError("Keyset paging needs at least one ORDER BY or primary key column")
+
+        self.conn = conn
+        self.parts = parts
+        self.keys = keys
+        self.db_type = db_type
+        self.page_size = page_size
+        # Preview mode's row limit applies to the whole browse, not to each page
+        self.max_rows = parts.get("limit")
+        # The connection is shared with the UI thread, so every use is serialized
+        self.lock = lock or threading.RLock()
+
+        # Seek key each visited page starts after; page 0 starts at the beginning
+        self.page_starts = [None]
+        self.page_index = 0
+        self.columns = []
+        self.rows = []
+        self.has_more = False
+        self._last_key = None
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._prefetch = None  # (after_key, Future)
+
+    def page_limit(self, page_index):
+        """Rows the page at page_index can hold: the page size, or what is left of the row limit"""
+        if self.max_rows is None:
+            return self.page_size
+        return max(0, min(self.page_size, self.max_rows - page_index * self.page_size))
+
+    def fetch_page(self, after, page_index=0):
+        """Fetch the page at page_index, which starts after the given key. Returns (columns, rows, has_more, last_key)"""
+        size = self.page_limit(page_index)
+        sql, params = build_keyset_query(self.parts, self.keys, size, self.db_type, after)
+        key_count = len(self.keys)
+
+        with self.lock:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                columns = [desc[0] for desc in cursor.description][:-key_count]
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+
+        has_more = len(rows) > size and self.page_limit(page_index + 1) > 0
+        rows = rows[:size]
+        last_key = tuple(rows[-1][-key_count:]) if rows else None
+
+        # Drop the hidden key columns before handing rows to the grid
+        return columns, [list(row[:-key_count]) for row in rows], has_more, last_key
+
+    def first_page(self):
+        """Load the first page"""
+        self.page_starts = [None]
+        self.page_index = 0
+        return self._load(None)
+
+    def next_page(self):
+        """Move forward one page, using the prefetched page when it is ready"""
+        if not self.has_more:
+            return False
+        after = self._last_key
+        self.page_starts.append(after)
+        self.page_index += 1
+        self._load(after)
+        return True
+
+    def previous_page(self):
+        """Move back one page by seeking from the stored start key"""
+        if self.page_index == 0:
+            return False
+        self.page_starts.pop()
+        self.page_index -= 1
+        self._load(self.page_starts[self.page_index])
+        return True
+
+    def close(self):
+        """Stop prefetching and release the worker thread"""
+        if self._prefetch:
+            self._prefetch[1].cancel()
+            self._prefetch = None
+        self._executor.shutdown(wait=True)
+
+    def _load(self, after):
+        future = None
+        if self._prefetch and self._prefetch[0] == after:
+            future = self._prefetch[1]
+        self._prefetch = None
+
+        if future is not None:
+            try:
+                result = future.result()
+            except Exception:
+                # A failed prefetch is retried in the foreground so the error surfaces normally
+                result = self.fetch_page(after, self.page_index)
+        else:
+            result = self.fetch_page(after, self.page_index)
+
+        self.columns, self.rows, self.has_more, self._last_key = result
+
+        # Start fetching the following page while the user looks at this one
+        if self.has_more:
+            self._prefetch = (self._last_key,
+                              self._executor.submit(self.fetch_page, self._last_key, self.page_index + 1))
+        return True
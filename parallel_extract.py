@@ -0,0 +1,262 @@
+"""
+Parallel range-partitioned extraction.
+
+A generated query is split into disjoint ranges of one numeric or date
+column - the driving table's primary key by default - and each range is
+fetched on its own connection, so a big export is no longer limited to one
+server thread and one network stream. Range boundaries come from a
+MIN/MAX query (evenly spaced) or from an NTILE histogram (equal row counts,
+for skewed keys). Rows whose key is NULL get a range of their own, so the
+ranges together return exactly the rows of the original query.
+
+Each range is written to its own CSV part file; the parts are then either
+kept (partitioned output) or concatenated in range order into one file. The
+merged file is therefore in partition-column order, range by range, and not
+in the query's ORDER BY; rows are only sorted within each range.
+Worker threads are enough here: the drivers release the GIL while waiting
+on the server.
+"""
+import datetime
+import decimal
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import fetch_column_type, is_range_type
+from connections import ConnectionPool, fetch_batches
+from exporters import write_csv
+from sql_builder import QueryBuildError, add_condition, param_placeholder, render_sql
+
+
+def choose_partition_column(tables, primary_keys, column_types):
+    """Default partition column: the driving table's single-column numeric/date primary key"""
+    if not tables:
+        return None
+    table = tables[0]
+    keys = primary_keys.get(table, [])
+    if len(keys) == 1 and is_range_type(column_types.get(table, {}).get(keys[0])):
+        return f"{table}.{keys[0]}"
+    return None
+
+
+def check_partition_type(column, type_name):
+    """Raise QueryBuildError unless column's catalog type can be split into ranges (unknown types pass)"""
+    if type_name and not is_range_type(type_name):
+        raise QueryBuildError("Partition Column", f"{column} is {type_name}; choose a numeric or date column.")
+
+
+def _check_bound(key, value):
+    # A column the catalog didn't know still has to give values that can be spaced out
+    if isinstance(value, (str, bytes, bytearray)):
+        raise QueryBuildError("Partition Column",
+                              f"{key} holds {type(value).__name__} values; choose a numeric or date column.")
+
+
+def _source_parts(parts, select):
+    """The FROM/JOIN/WHERE of a query with a different select list and nothing else"""
+    return {
+        "select": select,
+        "from": parts["from"],
+        "joins": parts.get("joins", []),
+        "where": parts.get("where", ""),
+        "having": "",
+        "group_by": [],
+        "order_by": [],
+        "limit": None,
+    }
+
+
+def _interpolate(low, high, fraction):
+    """The value a given fraction of the way from low to high"""
+    if isinstance(low, bool):
+        return low
+    if isinstance(low, int):
+        return low + int((high - low) * fraction)
+    if isinstance(low, decimal.Decimal):
+        return low + (high - low) * decimal.Decimal(str(fraction))
+    if isinstance(low, datetime.datetime):
+        return low + (high - low) * fraction
+    if isinstance(low, datetime.date):
+        return low + datetime.timedelta(days=int((high - low).days * fraction))
+    return low + (high - low) * fraction
+
+
+def minmax_boundaries(cursor, parts, key, partitions, db_type):
+    """Evenly spaced lower bounds between MIN(key) and MAX(key)"""
+    cursor.execute(render_sql(_source_parts(parts, [f"MIN({key})", f"MAX({key})"]), db_type, terminate=False))
+    low, high = cursor.fetchone()
+    _check_bound(key, low)
+    if low is None or low == high:
+        return [] if low is None else [low]
+
+    bounds = [low]
+    for i in range(1, partitions):
+        value = _interpolate(low, high, i / partitions)
+        if value > bounds[-1]:
+            bounds.append(value)
+    return bounds
+
+
+def histogram_boundaries(cursor, parts, key, partitions, db_type):
+    """Lower bounds of NTILE buckets, so each range holds about the same number of rows"""
+    inner = _source_parts(parts, [f"{key} AS partition_key",
+                                  f"NTILE({int(partitions)}) OVER (ORDER BY {key}) AS partition_bucket"])
+    inner["where"] = add_condition(inner["where"], f"{key} IS NOT NULL")
+    sql = (f"SELECT MIN(partition_key) FROM ({render_sql(inner, db_type, terminate=False)}) buckets "
+           "GROUP BY partition_bucket ORDER BY partition_bucket")
+    cursor.execute(sql)
+
+    bounds = []
+    for (value,) in cursor.fetchall():
+        if value is not None and (not bounds or value > bounds[-1]):
+            bounds.append(value)
+    return bounds
+
+
+def partition_queries(parts, key, bounds, db_type):
+    """
+    Split a query into (sql, params) per range of key.
+
+    bounds are ascending lower bounds: the first range is open below and the
+    last open above, so rows outside the sampled MIN/MAX are still covered.
+    A final range picks up NULL keys.
+    """
+    if parts.get("limit") is not None:
+        raise QueryBuildError("Parallel Export", "Preview mode limits the query to a few rows; turn it off to export in parallel")
+    if parts.get("group_by") and key not in parts["group_by"]:
+        raise QueryBuildError("Partition Column", "For grouped queries the partition column must be one of the GROUP BY columns")
+
+    placeholder = param_placeholder(db_type)
+    ranges = []
+    for i in range(len(bounds)):
+        conditions, params = [], []
+        if i > 0:
+            conditions.append(f"{key} >= {placeholder}")
+            params.append(bounds[i])
+        if i + 1 < len(bounds):
+            conditions.append(f"{key} < {placeholder}")
+            params.append(bounds[i + 1])
+        if not conditions:
+            # A single range is open at both ends; the NULL range below has the NULL keys
+            conditions.append(f"{key} IS NOT NULL")
+        ranges.append((" AND ".join(conditions), params))
+
+    if not ranges:
+        # Nothing but NULL keys (or no rows at all): one range covers everything
+        ranges.append(("", []))
+    else:
+        ranges.append((f"{key} IS NULL", []))
+
+    queries = []
+    for predicate, params in ranges:
+        page = dict(parts)
+        if predicate:
+            page["where"] = add_condition(parts.get("where"), predicate)
+        queries.append((render_sql(page, db_type, terminate=False), params))
+    return queries
+
+
+def part_path(output, index):
+    """File name of one range's output: orders.csv -> orders.part001.csv"""
+    stem, ext = os.path.splitext(output)
+    return f"{stem}.part{index + 1:03d}{ext or '.csv'}"
+
+
+def _extract_range(pool, sql, params, path, header, batch_size, counter):
+    start = time.perf_counter()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            columns = [desc[0] for desc in cursor.description]
+            rows = (row for batch in fetch_batches(cursor, batch_size) for row in batch)
+            count = write_csv(path, columns, rows, counter, progress_every=batch_size, header=header)
+        finally:
+            cursor.close()
+    counter.finish(count)
+    return {"path": path, "rows": count, "seconds": time.perf_counter() - start}
+
+
+class _RowCounter:
+    """Thread-safe running total across ranges, reported through an optional callback"""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.total = 0
+        self._partial = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, done):
+        # write_csv reports each range's own running count
+        with self._lock:
+            key = threading.get_ident()
+            self.total += done - self._partial.get(key, 0)
+            self._partial[key] = done
+            total = self.total
+        if self.progress:
+            self.progress(total)
+
+    def finish(self, count):
+        with self._lock:
+            self.total += count - self._partial.pop(threading.get_ident(), 0)
+
+
+def extract_parallel(settings, parts, key, db_type, output, partitions=4, merge=True,
+                     histogram=False, batch_size=5000, progress=None, column=None):
+    """
+    Export a query to CSV using one connection per key range.
+
+    key is the formatted partition column expression; column, if given, is
+    the same column as "table.column", whose catalog type is checked before
+    anything is fetched. With merge the ranges are concatenated in key order
+    into output (so the file follows the partition column, not the query's
+    ORDER BY), otherwise each range stays in its own part file next to it.
+    Returns a list of per-range results (path, rows, seconds).
+    """
+    pool = ConnectionPool(settings, partitions)
+    paths = []
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            if column and "." in column:
+                table, column_name = column.split(".", 1)
+                check_partition_type(column, fetch_column_type(cursor, db_type, settings.get("database", ""),
+                                                               table, column_name))
+            find_bounds = histogram_boundaries if histogram else minmax_boundaries
+            bounds = find_bounds(cursor, parts, key, partitions, db_type)
+            cursor.close()
+
+        queries = partition_queries(parts, key, bounds, db_type)
+        paths = [part_path(output, i) for i in range(len(queries))]
+        counter = _RowCounter(progress)
+
+        with ThreadPoolExecutor(max_workers=partitions) as executor:
+            futures = [
+                # Merged parts are concatenated, so only the first keeps its header
+                executor.submit(_extract_range, pool, sql, params, path, not merge or i == 0, batch_size, counter)
+                for i, ((sql, params), path) in enumerate(zip(queries, paths))
+            ]
+            results = [future.result() for future in futures]
+    except Exception:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        pool.close()
+
+    if merge:
+        with open(output, "wb") as merged:
+            for path in paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, merged, 1024 * 1024)
+                os.remove(path)
+        for result in results:
+            result["path"] = output
+
+    return results
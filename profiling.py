@@ -0,0 +1,389 @@
+"""
+Column profiling for in-memory query results.
+
+The result is read once, a batch of rows at a time; each batch is transposed
+and every column's running statistics are updated from it: null count,
+distinct count, min/max, top values, quantiles and a histogram for numeric
+columns. Only one batch is ever held column-wise, so a spilled result is
+profiled without loading it. Small results are profiled exactly; larger
+ones switch to fixed-size sketches (HyperLogLog for distinct counts, a
+reservoir sample for quantiles and histograms, Misra-Gries for top values)
+so memory does not grow with the number of distinct values.
+"""
+import datetime
+import hashlib
+import heapq
+import math
+import random
+from collections import Counter
+from decimal import Decimal
+
+from sql_builder import build_summary_queries
+
+# Above this many rows the sketches replace exact counting
+EXACT_ROW_LIMIT = 200000
+# Rows transposed at a time when the rows don't come in batches already
+PROFILE_BATCH_ROWS = 5000
+TOP_K = 5
+HISTOGRAM_BINS = 10
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+MASK64 = (1 << 64) - 1
+
+
+class HyperLogLog:
+    """Approximate distinct counter with about 1.6% standard error at the default precision"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def update(self, values):
+        # Repeats can't change a register, so each distinct value of the batch
+        # is hashed once; set() drops them in C. The hashing itself stays a
+        # Python loop: there is no vectorized 64-bit hash without numpy.
+        registers = self.registers
+        precision = self.precision
+        shift = 64 - precision
+        empty_rank = shift + 1
+        for value in set(values):
+            # splitmix64 finalizer - spreads Python's hash() over all 64 bits
+            h = (hash((value,)) + 0x9E3779B97F4A7C15) & MASK64
+            h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+            h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+            h ^= h >> 31
+            rest = (h << precision) & MASK64
+            # Position of the leftmost 1-bit in the remaining bits
+            rank = 65 - rest.bit_length() if rest else empty_rank
+            index = h >> shift
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def count(self):
+        estimate = self.alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small-range correction (linear counting)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+
+class ReservoirSample:
+    """
+    Uniform fixed-size sample of a stream, used for streaming quantiles and histograms.
+
+    Uses Li's Algorithm L: rather than drawing a random number per value, it
+    draws how many values to skip before the next replacement, so a batch
+    costs a few random draws and index lookups instead of a loop over it.
+    """
+
+    def __init__(self, size=4096, seed=0):
+        self.size = size
+        self.seen = 0
+        self.sample = []
+        self._random = random.Random(seed)
+        # Algorithm L state: the running weight and the stream position replaced next
+        self._weight = 1.0
+        self._next = None
+
+    def _uniform(self):
+        # In (0, 1), so its logarithm is finite
+        value = self._random.random()
+        while value == 0.0:
+            value = self._random.random()
+        return value
+
+    def _advance(self, position):
+        """Pick the stream position after position whose value replaces a sampled one"""
+        self._weight *= math.exp(math.log(self._uniform()) / self.size)
+        skip = 0
+        if self._weight < 1.0:
+            skip = math.floor(math.log(self._uniform()) / math.log1p(-self._weight))
+        self._next = position + skip + 1
+
+    def update(self, values):
+        start = self.seen
+        self.seen += len(values)
+        sample = self.sample
+        if len(sample) < self.size:
+            sample.extend(values[:self.size - len(sample)])
+            if len(sample) < self.size:
+                return
+            self._advance(self.size - 1)
+        randrange = self._random.randrange
+        while self._next < self.seen:
+            sample[randrange(self.size)] = values[self._next - start]
+            self._advance(self._next)
+
+    def quantiles(self, qs=QUANTILES):
+        return _quantiles(sorted(self.sample), qs)
+
+
+class FrequentValues:
+    """Approximate top-k frequent values in bounded memory (Misra-Gries summary)"""
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = Counter()
+
+    def update(self, values):
+        # The batch is counted in C and merged in; past capacity, every count
+        # drops by the (capacity + 1)-th largest, which keeps the Misra-Gries
+        # bound on how far a count can fall short
+        counts = self.counts
+        counts.update(values)
+        if len(counts) > self.capacity:
+            cut = heapq.nlargest(self.capacity + 1, counts.values())[-1]
+            self.counts = Counter({value: count - cut for value, count in counts.items() if count > cut})
+
+    def most_common(self, k):
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def _quantiles(sorted_values, qs):
+    if not sorted_values:
+        return {}
+    last = len(sorted_values) - 1
+    return {q: sorted_values[int(round(q * last))] for q in qs}
+
+
+def _histogram(numbers, low, high, bins):
+    if not numbers or low is None or high is None:
+        return []
+    low, high = float(low), float(high)
+    if low == high:
+        return [(low, high, len(numbers))]
+    width = (high - low) / bins
+    counts = [0] * bins
+    for number in numbers:
+        slot = int((float(number) - low) / width)
+        counts[min(max(slot, 0), bins - 1)] += 1
+    return [(low + i * width, low + (i + 1) * width, counts[i]) for i in range(bins)]
+
+
+def _kind(values):
+    """Classify the non-null values of a column as numeric, date, text or mixed"""
+    kinds = set()
+    for value in values[:1000]:
+        if isinstance(value, bool):
+            kinds.add("text")
+        elif isinstance(value, (int, float, Decimal)):
+            kinds.add("numeric")
+        elif isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+            kinds.add("date")
+        else:
+            kinds.add("text")
+    if len(kinds) == 1:
+        return kinds.pop()
+    return "mixed" if kinds else "empty"
+
+
+class ColumnProfiler:
+    """
+    Running statistics for one column, updated a batch of values at a time.
+
+    Each update works on the whole batch with builtins that loop in C (min,
+    max, Counter, set); the sketches do the same where they can. Values are
+    Python objects (Decimal, datetime, str) without numpy, so only the
+    distinct sketch's hashing still loops in Python, once per distinct value.
+    """
+
+    def __init__(self, name, approximate=False, top_k=TOP_K, bins=HISTOGRAM_BINS):
+        self.name = name
+        self.approximate = approximate
+        self.top_k = top_k
+        self.bins = bins
+        self.count = 0
+        self.nulls = 0
+        # Decided from the first non-NULL values; "mixed" columns are handled as text
+        self.kind = None
+        self.min = None
+        self.max = None
+        if approximate:
+            self.hll = HyperLogLog()
+            self.heavy = FrequentValues(capacity=max(100, top_k * 20))
+            self.reservoir = ReservoirSample()
+        else:
+            self.counts = Counter()
+            # Numeric and date values, for exact quantiles and the histogram
+            self.values = []
+
+    def update(self, values):
+        self.count += len(values)
+        non_null = [value for value in values if value is not None]
+        self.nulls += len(values) - len(non_null)
+        if not non_null:
+            return
+        if self.kind is None:
+            self.kind = _kind(non_null)
+        if self.kind == "mixed":
+            non_null = [str(value) for value in non_null]
+
+        try:
+            low, high = min(non_null), max(non_null)
+            if self.min is not None:
+                low, high = min(low, self.min), max(high, self.max)
+        except TypeError:
+            # The kind only looks at the first values; fall back to text if later values disagree
+            self._to_text()
+            non_null = [str(value) for value in non_null]
+            low, high = min(non_null), max(non_null)
+            if self.min is not None:
+                low, high = min(low, self.min), max(high, self.max)
+        self.min, self.max = low, high
+
+        hashable = non_null if self.kind != "text" else [v if isinstance(v, (str, bytes)) else str(v) for v in non_null]
+        if self.approximate:
+            self.hll.update(hashable)
+            self.heavy.update(hashable)
+            self.reservoir.update(non_null)
+        else:
+            self.counts.update(hashable)
+            if self.kind in ("numeric", "date"):
+                self.values.extend(non_null)
+
+    def _to_text(self):
+        """Turn everything gathered so far into text, for a column that turned out to be mixed"""
+        self.kind = "mixed"
+        if self.min is not None:
+            self.min, self.max = str(self.min), str(self.max)
+        if self.approximate:
+            # The distinct sketch can't be converted; values seen both ways may be counted twice
+            heavy = Counter()
+            for value, count in self.heavy.counts.items():
+                heavy[str(value)] += count
+            self.heavy.counts = heavy
+            self.reservoir.sample = [str(value) for value in self.reservoir.sample]
+        else:
+            counts = Counter()
+            for value, count in self.counts.items():
+                counts[str(value)] += count
+            self.counts = counts
+            self.values = []
+
+    def result(self):
+        """The column's statistics as a dictionary"""
+        kind = self.kind or "empty"
+        profile = {
+            "column": self.name,
+            "type": kind,
+            "count": self.count,
+            "nulls": self.nulls,
+            "approximate": self.approximate,
+            "min": self.min,
+            "max": self.max,
+            "distinct": 0,
+            "top": [],
+            "quantiles": {},
+            "histogram": [],
+        }
+        if self.count == self.nulls:
+            return profile
+
+        if self.approximate:
+            profile["distinct"] = self.hll.count()
+            profile["top"] = self.heavy.most_common(self.top_k)
+            sample = self.reservoir.sample
+            if kind in ("numeric", "date"):
+                profile["quantiles"] = self.reservoir.quantiles()
+        else:
+            profile["distinct"] = len(self.counts)
+            profile["top"] = self.counts.most_common(self.top_k)
+            sample = self.values
+            if kind in ("numeric", "date"):
+                profile["quantiles"] = _quantiles(sorted(sample), QUANTILES)
+
+        if kind == "numeric":
+            profile["histogram"] = _histogram(sample, self.min, self.max, self.bins)
+        return profile
+
+
+def _row_batches(rows):
+    if hasattr(rows, "iter_batches"):
+        # A ResultStore reads its spilled batches back one at a time
+        yield from rows.iter_batches()
+        return
+    for start in range(0, len(rows), PROFILE_BATCH_ROWS):
+        yield rows[start:start + PROFILE_BATCH_ROWS]
+
+
+def profile_result(columns, rows, exact_limit=EXACT_ROW_LIMIT, progress=None, cancel=None):
+    """
+    Profile every column of a result set in one pass over the rows.
+
+    rows is a sequence of row sequences or a ResultStore. Profiles are
+    returned in column order, one per column even when names repeat.
+    progress, if given, is called with (rows done, total rows) after each batch.
+    cancel, if given, is a threading.Event checked before each batch; once it
+    is set, profiling stops reading rows and returns None.
+    """
+    total = len(rows)
+    profilers = [ColumnProfiler(name, total > exact_limit) for name in columns]
+    done = 0
+    for batch in _row_batches(rows):
+        if cancel is not None and cancel.is_set():
+            return None
+        # Only this batch is transposed, so the copy stays small
+        for profiler, values in zip(profilers, zip(*batch)):
+            profiler.update(values)
+        done += len(batch)
+        if progress:
+            progress(done, total)
+    return [profiler.result() for profiler in profilers]
+
+
+def format_value(value, limit=40):
+    """Short display form for a profiled value"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        text = f"{value:.6g}"
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def schema_version(columns, column_types):
+    """Fingerprint of a table's columns and types, used to invalidate cached server profiles"""
+    fingerprint = "\x1f".join(f"{col}\x1e{column_types.get(col, '')}" for col in columns)
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def profile_table(cursor, table, columns, column_types, db_type, columns_per_query=25):
+    """
+    Profile a table on the server with generated summary queries.
+
+    Returns (row_count, profiles) where profiles use the same keys as
+    ColumnProfiler.result, minus the top values, quantiles and histograms.
+    """
+    row_count = 0
+    profiles = []
+    for sql, plan in build_summary_queries(table, columns, column_types, db_type, columns_per_query):
+        cursor.execute(sql)
+        row = cursor.fetchone()
+        # Drain anything left so the connection can run the next statement
+        cursor.fetchall()
+
+        row_count = row[0] or 0
+        position = 1
+        for column, aggregates in plan:
+            stats = dict(zip(aggregates, row[position:position + len(aggregates)]))
+            position += len(aggregates)
+            profiles.append({
+                "column": column,
+                "type": column_types.get(column, ""),
+                "count": row_count,
+                "nulls": int(stats.get("nulls") or 0),
+                "approximate": False,
+                "distinct": stats.get("distinct"),
+                "min": stats.get("min"),
+                "max": stats.get("max"),
+                "top": [],
+                "quantiles": {},
+                "histogram": [],
+            })
+    return row_count, profiles
@@ -0,0 +1,182 @@
+"""
+Persistent history of executed queries, with timing trends per query shape.
+
+Every Execute Query run is recorded in a small SQLite database: the
+statement's normalized text and its hash (the query "shape" - literals,
+case and whitespace don't count), the connection, row count, result size
+and the time spent executing and fetching. A run is flagged as a
+regression when it is much slower than the median of the previous runs of
+the same shape on the same connection. Flagged runs stay out of the
+baseline unless REBASELINE_RUNS of them come in a row: the query has then
+become slower for good (more data, a changed plan) and the baseline starts
+over from that streak.
+"""
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import statistics
+
+DEFAULT_HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".sql_data_fetcher", "history.db")
+
+# Previous runs that make up a shape's baseline, and how many are needed before flagging
+BASELINE_RUNS = 20
+MIN_BASELINE_RUNS = 3
+# Consecutive regressions after which the slower time is the shape's new normal
+REBASELINE_RUNS = 5
+# Latest runs looked at when building a baseline
+BASELINE_SCAN_RUNS = 200
+# A run is a regression when slower than this multiple of the baseline median...
+REGRESSION_FACTOR = 2.0
+# ...and slower by at least this much, so fast queries don't flag on noise
+REGRESSION_MIN_MS = 100.0
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SPACE = re.compile(r"\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    connection TEXT NOT NULL,
+    rows INTEGER,
+    bytes INTEGER,
+    execute_ms REAL,
+    fetch_ms REAL,
+    total_ms REAL,
+    regression INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_shape ON runs (shape, connection, id);
+"""
+
+
+def normalize_sql(sql):
+    """Query text with comments, literals, case and spacing made uniform"""
+    text = _COMMENT.sub(" ", sql)
+    text = _STRING.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    return _SPACE.sub(" ", text).strip().lower()
+
+
+def shape_hash(normalized):
+    """Short key for a normalized query text"""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def connection_label(settings):
+    """db_type://server/database for a connection settings dictionary"""
+    return f"{settings.get('db_type', '')}://{settings.get('server', '')}/{settings.get('database', '')}"
+
+
+def is_regression(total_ms, baseline):
+    """Whether total_ms is much slower than the baseline runs' median"""
+    if len(baseline) < MIN_BASELINE_RUNS:
+        return False
+    median = statistics.median(baseline)
+    return total_ms > median * REGRESSION_FACTOR and total_ms - median >= REGRESSION_MIN_MS
+
+
+class QueryHistory:
+    """Query runs kept in an SQLite file"""
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def baseline(self, shape, connection):
+        """
+        total_ms of the latest runs of a shape that count as normal, newest first.
+
+        These are the latest non-regression runs, or, once REBASELINE_RUNS
+        regressions have come in a row, every run from the newest such
+        streak on.
+        """
+        rows = self.conn.execute(
+            "SELECT total_ms, regression FROM runs WHERE shape = ? AND connection = ? "
+            "ORDER BY id DESC LIMIT ?", (shape, connection, BASELINE_SCAN_RUNS)).fetchall()
+        flags = [r["regression"] for r in rows]
+        for start in range(len(rows) - REBASELINE_RUNS + 1):
+            if all(flags[start:start + REBASELINE_RUNS]):
+                end = start + REBASELINE_RUNS
+                while end < len(rows) and flags[end]:
+                    end += 1
+                return [r["total_ms"] for r in rows[:end]][:BASELINE_RUNS]
+        return [r["total_ms"] for r in rows if not r["regression"]][:BASELINE_RUNS]
+
+    def record(self, sql, connection, rows, size, execute_ms, fetch_ms):
+        """
+        Store one run. Returns (regression, baseline median or None).
+
+        Regressions are left out of later baselines, so an occasional slow
+        run doesn't raise the bar; after REBASELINE_RUNS of them in a row
+        the slower time becomes the baseline and flagging stops.
+        """
+        normalized = normalize_sql(sql)
+        shape = shape_hash(normalized)
+        total_ms = execute_ms + fetch_ms
+        baseline = self.baseline(shape, connection)
+        regression = is_regression(total_ms, baseline)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (started, shape, normalized, sql, connection, rows, bytes, "
+                "execute_ms, fetch_ms, total_ms, regression) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.datetime.now().isoformat(timespec="seconds"), shape, normalized, sql, connection,
+                 rows, size, execute_ms, fetch_ms, total_ms, int(regression)))
+        return regression, (statistics.median(baseline) if baseline else None)
+
+    def shapes(self, limit=200):
+        """Per (shape, connection): run count, median and latest total_ms, regressions, last run time"""
+        rows = self.conn.execute(
+            "SELECT shape, connection, MIN(normalized) AS normalized, COUNT(*) AS runs, "
+            "SUM(regression) AS regressions, MAX(id) AS last_id, MAX(started) AS last_started "
+            "FROM runs GROUP BY shape, connection ORDER BY last_id DESC LIMIT ?", (limit,)).fetchall()
+        result = []
+        for r in rows:
+            totals = [t["total_ms"] for t in self.runs(r["shape"], r["connection"])]
+            result.append({
+                "shape": r["shape"],
+                "connection": r["connection"],
+                "normalized": r["normalized"],
+                "runs": r["runs"],
+                "regressions": r["regressions"],
+                "last_started": r["last_started"],
+                "median_ms": statistics.median(totals) if totals else None,
+                "last_ms": totals[-1] if totals else None,
+                "trend": totals[-20:],
+            })
+        return result
+
+    def runs(self, shape, connection, limit=500):
+        """The latest runs of one shape on one connection, oldest first"""
+        rows = self.conn.execute(
+            "SELECT * FROM runs WHERE shape = ? AND connection = ? ORDER BY id DESC LIMIT ?",
+            (shape, connection, limit)).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM runs")
+
+    def close(self):
+        self.conn.close()
+
+
+def sparkline(values):
+    """Tiny text chart of values, for the history view"""
+    if not values:
+        return ""
+    bars = "▁▂▃▄▅▆▇█"
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return "".join(bars[int((v - low) / span * (len(bars) - 1))] for v in values)
@@ -0,0 +1,202 @@
+"""
+Query spec files: save, load and compare the query a user builds.
+
+A query spec is the plain dictionary collect_query_spec() produces from the
+UI (tables, columns, joins, where, group/order, aggregates, combined
+columns). It is stored as JSON or TOML, chosen by file extension, and can be
+fed straight to sql_builder.build_query_parts - no widgets needed - which is
+what makes reopening a very wide query instant and lets saved specs run as
+headless batch jobs.
+
+    python query_spec.py diff old.json new.toml
+"""
+import json
+import sys
+
+SPEC_VERSION = 1
+
+# Sections holding lists of entries, with the fields each entry may carry
+LIST_SECTIONS = {
+    "combined_columns": ("alias", "columns"),
+    "aggregates": ("function", "column", "alias"),
+    "joins": ("left_table", "right_table", "join_type", "left_column", "right_column"),
+    "where": ("column", "operator", "value", "connector"),
+    "order_by": ("column", "direction"),
+}
+
+
+def empty_spec():
+    return {
+        "version": SPEC_VERSION,
+        "tables": [],
+        "columns": {},
+        "combined_columns": [],
+        "aggregates": [],
+        "joins": [],
+        "where": [],
+        "group_by": [],
+        "order_by": [],
+    }
+
+
+def _field_value(value):
+    # The UI holds everything as text, so hand-written numbers become strings too
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return str(value)
+
+
+def normalize_spec(spec):
+    """Validate a loaded spec and fill in missing sections. Raises ValueError on malformed input"""
+    if not isinstance(spec, dict):
+        raise ValueError("A query spec must be a mapping")
+
+    version = spec.get("version", SPEC_VERSION)
+    if version > SPEC_VERSION:
+        raise ValueError(f"Query spec version {version} is newer than this program supports ({SPEC_VERSION})")
+
+    normalized = empty_spec()
+    normalized["tables"] = [str(t) for t in spec.get("tables", [])]
+    if not normalized["tables"]:
+        raise ValueError("A query spec needs at least one table")
+
+    columns = spec.get("columns", {})
+    if not isinstance(columns, dict):
+        raise ValueError("\"columns\" must map table names to column lists")
+    normalized["columns"] = {str(t): [str(c) for c in cols] for t, cols in columns.items()}
+
+    normalized["group_by"] = [str(c) for c in spec.get("group_by", [])]
+
+    for section, fields in LIST_SECTIONS.items():
+        entries = spec.get(section, [])
+        if not isinstance(entries, list):
+            raise ValueError(f"\"{section}\" must be a list")
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValueError(f"Entries in \"{section}\" must be mappings")
+            normalized[section].append({field: _field_value(entry.get(field)) for field in fields})
+
+    if "db_type" in spec:
+        normalized["db_type"] = spec["db_type"]
+    return normalized
+
+
+def dumps_toml(spec):
+    """Serialize a spec as TOML. Only the value types a spec uses are supported"""
+    def value(v):
+        if isinstance(v, list):
+            return "[" + ", ".join(value(item) for item in v) + "]"
+        if isinstance(v, bool):
+            return "true" if v else "false"
+        if isinstance(v, (int, float)):
+            return str(v)
+        # JSON string escapes are valid TOML basic-string escapes
+        return json.dumps(str(v), ensure_ascii=False)
+
+    lines = []
+    for key in ("version", "db_type", "tables", "group_by"):
+        if key in spec:
+            lines.append(f"{key} = {value(spec[key])}")
+
+    lines.append("")
+    lines.append("[columns]")
+    for table, cols in spec.get("columns", {}).items():
+        lines.append(f"{json.dumps(table, ensure_ascii=False)} = {value(cols)}")
+
+    for section in LIST_SECTIONS:
+        for entry in spec.get(section, []):
+            lines.append("")
+            lines.append(f"[[{section}]]")
+            for field, v in entry.items():
+                # TOML has no null, so unset fields are left out
+                if v is not None:
+                    lines.append(f"{field} = {value(v)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _loads_toml(text):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ImportError("Reading TOML specs needs Python 3.11+ or the tomli package (pip install tomli)")
+    return tomllib.loads(text)
+
+
+def save_spec(path, spec):
+    """Write a spec as TOML (.toml) or JSON (anything else)"""
+    spec = normalize_spec(spec)
+    if path.lower().endswith(".toml"):
+        text = dumps_toml(spec)
+    else:
+        text = json.dumps(spec, indent=2, ensure_ascii=False) + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def load_spec(path):
+    """Read a JSON or TOML spec file"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    data = _loads_toml(text) if path.lower().endswith(".toml") else json.loads(text)
+    return normalize_spec(data)
+
+
+def _describe(entry):
+    return ", ".join(f"{k}={v}" for k, v in entry.items() if v not in (None, ""))
+
+
+def diff_specs(old, new):
+    """Human-readable list of differences between two specs"""
+    old, new = normalize_spec(old), normalize_spec(new)
+    changes = []
+
+    if old["tables"] != new["tables"]:
+        changes.append(f"tables: {old['tables']} -> {new['tables']}")
+
+    for table in sorted(set(old["columns"]) | set(new["columns"])):
+        before = old["columns"].get(table, [])
+        after = new["columns"].get(table, [])
+        added = [c for c in after if c not in before]
+        removed = [c for c in before if c not in after]
+        if added:
+            changes.append(f"columns {table}: + {', '.join(added)}")
+        if removed:
+            changes.append(f"columns {table}: - {', '.join(removed)}")
+        if not added and not removed and before != after:
+            changes.append(f"columns {table}: reordered")
+
+    if old["group_by"] != new["group_by"]:
+        changes.append(f"group_by: {old['group_by']} -> {new['group_by']}")
+
+    for section in LIST_SECTIONS:
+        before, after = old[section], new[section]
+        for i in range(max(len(before), len(after))):
+            if i >= len(before):
+                changes.append(f"{section}[{i + 1}] added: {_describe(after[i])}")
+            elif i >= len(after):
+                changes.append(f"{section}[{i + 1}] removed: {_describe(before[i])}")
+            elif before[i] != after[i]:
+                changes.append(f"{section}[{i + 1}]: {_describe(before[i])} -> {_describe(after[i])}")
+
+    return changes
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] != "diff":
+        print("usage: python query_spec.py diff OLD_SPEC NEW_SPEC", file=sys.stderr)
+        return 2
+    changes = diff_specs(load_spec(argv[1]), load_spec(argv[2]))
+    for change in changes:
+        print(change)
+    return 1 if changes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Record and replay query results, for reproducing performance problems offline.
+
+RecordingCursor wraps a real cursor and writes everything a run sees - the
+SQL, cursor.description, every fetched batch and how long each call took -
+to a gzip-compressed recording. ReplayConnection / ReplayCursor then stand
+in for a live connection wherever the app uses one, returning the same
+result shape and values and, optionally, the original latency profile, so
+the rendering and export paths can be profiled without database access.
+
+Recordings are JSON lines, one record per line, so loading one never runs
+code. Values JSON has no type for (dates and times, Decimal, bytes) are
+written as tagged objects and come back as the same types; anything else
+unusual is recorded as its text.
+"""
+import base64
+import datetime
+import decimal
+import gzip
+import json
+import time
+
+RECORDING_VERSION = 2
+
+# Key that marks a tagged value in a recording
+TYPE_TAG = "$type"
+
+# Python types a driver reports as cursor.description type codes, by recorded name
+DESCRIPTION_TYPES = {t.__module__ + "." + t.__qualname__: t for t in (
+    bool, int, float, str, bytes, bytearray, decimal.Decimal,
+    datetime.datetime, datetime.date, datetime.time, datetime.timedelta)}
+
+
+def encode_value(value):
+    """JSON form of a value JSON can't hold as it is (json.dumps' default hook)"""
+    if isinstance(value, datetime.datetime):
+        return {TYPE_TAG: "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {TYPE_TAG: "date", "value": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {TYPE_TAG: "time", "value": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {TYPE_TAG: "timedelta", "value": [value.days, value.seconds, value.microseconds]}
+    if isinstance(value, decimal.Decimal):
+        return {TYPE_TAG: "decimal", "value": str(value)}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {TYPE_TAG: "bytes", "value": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, type):
+        return {TYPE_TAG: "type", "value": value.__module__ + "." + value.__qualname__}
+    return str(value)
+
+
+def decode_value(data):
+    """Turn a tagged object back into its value (json.loads' object_hook); other objects stay dicts"""
+    kind = data.get(TYPE_TAG)
+    if kind is None:
+        return data
+    value = data["value"]
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(value)
+    if kind == "date":
+        return datetime.date.fromisoformat(value)
+    if kind == "time":
+        return datetime.time.fromisoformat(value)
+    if kind == "timedelta":
+        return datetime.timedelta(*value)
+    if kind == "decimal":
+        return decimal.Decimal(value)
+    if kind == "bytes":
+        return base64.b64decode(value)
+    if kind == "type":
+        # Only the known description types; others stay their name
+        return DESCRIPTION_TYPES.get(value, value)
+    raise ValueError(f"Unknown value type in recording: {kind}")
+
+
+class RecordingCursor:
+    """Cursor wrapper that records executions and fetched batches to a file"""
+
+    def __init__(self, cursor, path, db_type=""):
+        self.cursor = cursor
+        self.path = path
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._write({"version": RECORDING_VERSION, "db_type": db_type,
+                     "recorded": datetime.datetime.now().isoformat(timespec="seconds")})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, default=encode_value, separators=(",", ":")).encode("utf-8"))
+        self._file.write(b"\n")
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        if params:
+            result = self.cursor.execute(sql, params)
+        else:
+            result = self.cursor.execute(sql)
+        seconds = time.perf_counter() - start
+        description = [tuple(desc) for desc in self.cursor.description] if self.cursor.description else None
+        self._write(("execute", sql, list(params) if params else None, description, seconds))
+        return result
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        rows = fetch(*args)
+        # Driver row objects are stored as plain tuples
+        self._write(("batch", time.perf_counter() - start, [tuple(row) for row in rows]))
+        return rows
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._fetch(self.cursor.fetchmany)
+        return self._fetch(self.cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self.cursor.fetchall)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self.cursor.fetchone()
+        self._write(("batch", time.perf_counter() - start, [] if row is None else [tuple(row)]))
+        return row
+
+    def finish(self):
+        """Close the recording; the wrapped cursor stays open"""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def load_recording(path):
+    """Return (header, executions) where each execution is a dict with sql, params, description, seconds and batches"""
+    executions = []
+    with gzip.open(path, "rb") as f:
+        try:
+            header = json.loads(f.readline(), object_hook=decode_value)
+        except (ValueError, UnicodeDecodeError):
+            header = None
+        if not isinstance(header, dict) or header.get("version", 0) > RECORDING_VERSION:
+            raise ValueError(f"{path} is not a recording this program can replay "
+                             "(recordings made before version 2 have to be recorded again)")
+        for line in f:
+            record = json.loads(line, object_hook=decode_value)
+            if record[0] == "execute":
+                _, sql, params, description, seconds = record
+                if description is not None:
+                    description = [tuple(desc) for desc in description]
+                executions.append({"sql": sql, "params": params, "description": description,
+                                   "seconds": seconds, "batches": []})
+            elif record[0] == "batch" and executions:
+                # Rows were tuples when they were recorded
+                executions[-1]["batches"].append((record[1], [tuple(row) for row in record[2]]))
+    return header, executions
+
+
+class ReplayCursor:
+    """DB-API cursor that plays back recorded executions in order"""
+
+    def __init__(self, executions, latency=False, speed=1.0):
+        self.executions = executions
+        self.latency = latency
+        self.speed = speed
+        self.description = None
+        self.rowcount = -1
+        self._position = 0
+        self._rows = []
+        self._row_seconds = []
+        self._next = 0
+
+    def _sleep(self, seconds):
+        if self.latency and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def execute(self, sql, params=None):
+        if self._position >= len(self.executions):
+            raise RuntimeError("The recording has no more executions to replay")
+        execution = self.executions[self._position]
+        self._position += 1
+        self._sleep(execution["seconds"])
+
+        self.description = execution["description"]
+        # Flatten the batches, remembering each row's share of its batch's fetch time
+        self._rows = []
+        self._row_seconds = []
+        for seconds, rows in execution["batches"]:
+            self._rows.extend(rows)
+            self._row_seconds.extend([seconds / len(rows)] * len(rows) if rows else [])
+        self.rowcount = len(self._rows)
+        self._next = 0
+        return self
+
+    def fetchmany(self, size=1):
+        end = min(self._next + size, len(self._rows))
+        if self.latency:
+            self._sleep(sum(self._row_seconds[self._next:end]))
+        batch = self._rows[self._next:end]
+        self._next = end
+        return batch
+
+    def fetchone(self):
+        batch = self.fetchmany(1)
+        return batch[0] if batch else None
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows) - self._next)
+
+    def close(self):
+        pass
+
+
+class ReplayConnection:
+    """Stands in for a live connection; every cursor replays the recording from the start"""
+
+    def __init__(self, path, latency=False, speed=1.0):
+        self.header, self.executions = load_recording(path)
+        self.latency = latency
+        self.speed = speed
+
+    def cursor(self):
+        return ReplayCursor(self.executions, self.latency, self.speed)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,304 @@
+"""
+Result rows for the Results tab, kept in memory up to a budget and on disk beyond it.
+
+A ResultStore behaves like a read-only list of rows. Fetched batches are held
+in memory until their estimated size passes the memory budget; from then on
+every batch is written to a temporary file, column by column, and read back
+through a memory map when the grid, the profiler or an exporter asks for it.
+Only a few decoded batches are cached, so a result of any size costs about
+the budget in RAM.
+
+Column moves don't touch the rows: the store keeps a permutation of the
+fetched column order and applies it as rows are read. The last `hidden`
+fetched columns are kept with the rows but never displayed (e.g. the keys
+used to read large-object values in full).
+"""
+import heapq
+import itertools
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from bisect import bisect_right
+
+# Default memory budget for one result, in MB
+DEFAULT_MEMORY_BUDGET_MB = 512
+# Rows per batch written to the spill file
+SPILL_BATCH_ROWS = 5000
+# Decoded spill batches kept in memory
+CACHED_BATCHES = 4
+
+
+def estimate_row_bytes(row):
+    """Rough in-memory size of one fetched row: the list plus its values"""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+class ResultStore:
+    """List-like result rows that spill to a temporary file past memory_budget bytes"""
+
+    def __init__(self, columns, rows=None, memory_budget=DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024, hidden=0):
+        self.fetched_columns = list(columns)
+        self.hidden = hidden
+        # Position in the fetched rows of each displayed column
+        self.order = list(range(len(self.fetched_columns) - hidden))
+        self.memory_budget = memory_budget
+        self.memory_bytes = 0
+
+        self._rows = []
+        self._count = 0
+        # Spill file and, per written batch, its first row, offset and length
+        self._file = None
+        self._path = None
+        self._starts = []
+        self._blocks = []
+        self._map = None
+        self._cache = {}
+        self._lock = threading.RLock()
+
+        if rows:
+            self.extend(rows)
+
+    @property
+    def columns(self):
+        return [self.fetched_columns[i] for i in self.order]
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def extend(self, rows):
+        """Append a batch of fetched rows (in fetched column order)"""
+        rows = [list(row) for row in rows]
+        if not rows:
+            return
+        if self.spilled:
+            self._write(rows)
+            return
+
+        self._rows.extend(rows)
+        self._count += len(rows)
+        # Sizing every value would cost as much as fetching it; the first row stands for the batch
+        self.memory_bytes += estimate_row_bytes(rows[0]) * len(rows)
+        if self.memory_bytes > self.memory_budget:
+            self._spill()
+
+    def extend_columns(self, columns):
+        """Append a batch given column by column (in fetched column order), e.g. from an Arrow record batch"""
+        if not columns or not len(columns[0]):
+            return
+        if self.spilled:
+            # Already the spill file's layout, so no rows are built
+            self._write_columns([list(column) for column in columns], len(columns[0]))
+            return
+        self.extend(zip(*columns))
+
+    def _spill(self):
+        """Move the rows held so far to a new spill file"""
+        fd, self._path = tempfile.mkstemp(prefix="sql_data_fetcher_", suffix=".spill")
+        self._file = os.fdopen(fd, "w+b")
+        rows, self._rows, self._count = self._rows, [], 0
+        for start in range(0, len(rows), SPILL_BATCH_ROWS):
+            self._write(rows[start:start + SPILL_BATCH_ROWS])
+        self.memory_bytes = 0
+
+    def _write(self, rows):
+        # Column-wise, so repeated values of a column pickle compactly
+        self._write_columns([list(column) for column in zip(*rows)], len(rows))
+
+    def _write_columns(self, columns, count):
+        with self._lock:
+            data = pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL)
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(data)
+            self._starts.append(self._count)
+            self._blocks.append((offset, len(data), count))
+            self._count += count
+            # The map only covers the file as it was; it is remade on the next read
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def _batch(self, index):
+        """Rows of one spilled batch, in fetched column order"""
+        with self._lock:
+            rows = self._cache.get(index)
+            if rows is not None:
+                return rows
+            if self._map is None:
+                self._file.flush()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            offset, length, _ = self._blocks[index]
+            rows = [list(row) for row in zip(*pickle.loads(self._map[offset:offset + length]))]
+            if len(self._cache) >= CACHED_BATCHES:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[index] = rows
+            return rows
+
+    def display_row(self, row):
+        """A row in fetched column order as displayed: reordered, without hidden columns"""
+        if not self.hidden and self.order == list(range(len(self.order))):
+            return row
+        return [row[i] for i in self.order]
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        return self.display_row(self.raw_row(index))
+
+    def raw_row(self, index):
+        """One row in fetched column order, hidden columns included; don't modify it"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("result row index out of range")
+        if not self.spilled:
+            return self._rows[index]
+        batch = bisect_right(self._starts, index) - 1
+        return self._batch(batch)[index - self._starts[batch]]
+
+    def iter_batches(self, raw=False):
+        """Yield the rows in batches, in display column order or, with raw, as fetched (don't modify those)"""
+        if not self.spilled:
+            batches = (self._rows[start:start + SPILL_BATCH_ROWS] for start in range(0, self._count, SPILL_BATCH_ROWS))
+        else:
+            batches = (self._batch(index) for index in range(len(self._blocks)))
+        for batch in batches:
+            yield batch if raw else [self.display_row(row) for row in batch]
+
+    def __iter__(self):
+        for batch in self.iter_batches():
+            yield from batch
+
+    def sample(self, size, per_batch=50):
+        """
+        Up to size rows spread over the whole result, in display column order.
+
+        A spilled result is sampled from evenly spaced batches, per_batch rows
+        each, so only those batches are read back from disk.
+        """
+        if self._count <= size:
+            return list(self)
+        if not self.spilled:
+            step = self._count / size
+            return [self.display_row(self._rows[int(i * step)]) for i in range(size)]
+
+        picked = max(1, min(len(self._blocks), size // per_batch))
+        step = len(self._blocks) / picked
+        # Fewer batches than size // per_batch means more rows from each
+        per_batch = -(-size // picked)
+        rows = []
+        for index in sorted(set(int(i * step) for i in range(picked))):
+            batch = self._batch(index)
+            take = min(len(batch), per_batch)
+            stride = len(batch) / take
+            rows.extend(self.display_row(batch[int(i * stride)]) for i in range(take))
+        return rows
+
+    def move_column(self, source_index, target_index):
+        """Move a displayed column; only the permutation changes"""
+        self.order.insert(target_index, self.order.pop(source_index))
+
+    def reset_order(self):
+        """Go back to the column order the query returned"""
+        self.order = list(range(len(self.fetched_columns) - self.hidden))
+
+    def sorted_by(self, column_index, descending=False, convert=None):
+        """
+        A new store with the rows ordered by one displayed column, NULLs last.
+
+        convert, if given, turns each non-NULL value into what it sorts by
+        (e.g. numbers fetched as text). Rows that fit the budget are sorted in
+        memory; otherwise each budget-sized run is sorted and written out, and
+        the runs are merged.
+        """
+        position = self.order[column_index]
+
+        def key(row):
+            value = row[position]
+            if convert is not None and value is not None:
+                value = convert(value)
+            return (value is None) != descending, value
+
+        result = ResultStore(self.fetched_columns, memory_budget=self.memory_budget, hidden=self.hidden)
+        result.order = list(self.order)
+        if not self.spilled:
+            result.extend(sorted(self._rows, key=key, reverse=descending))
+            return result
+
+        runs = []
+        run, run_bytes = [], 0
+        try:
+            for index in range(len(self._blocks)):
+                batch = self._batch(index)
+                run.extend(batch)
+                run_bytes += estimate_row_bytes(batch[0]) * len(batch)
+                if run_bytes > self.memory_budget:
+                    runs.append(self._sorted_run(run, key, descending))
+                    run, run_bytes = [], 0
+            if run:
+                runs.append(self._sorted_run(run, key, descending))
+
+            merged = heapq.merge(*(iter(r) for r in runs), key=key, reverse=descending)
+            while True:
+                batch = list(itertools.islice(merged, SPILL_BATCH_ROWS))
+                if not batch:
+                    break
+                result.extend(batch)
+        finally:
+            for r in runs:
+                r.close()
+        return result
+
+    def _sorted_run(self, rows, key, descending):
+        # A zero budget makes the run go straight to disk
+        run = ResultStore(self.fetched_columns, memory_budget=0)
+        rows.sort(key=key, reverse=descending)
+        for start in range(0, len(rows), SPILL_BATCH_ROWS):
+            run.extend(rows[start:start + SPILL_BATCH_ROWS])
+        return run
+
+    @property
+    def size_bytes(self):
+        """Size of the spill file, or the estimated size in memory"""
+        if self.spilled:
+            return os.path.getsize(self._path)
+        return self.memory_bytes
+
+    def describe(self):
+        """Where the rows are, for the status bar"""
+        if self.spilled:
+            size = os.path.getsize(self._path) / (1024 * 1024)
+            return f"spilled to disk ({size:,.0f} MB)"
+        return f"in memory (~{self.memory_bytes / (1024 * 1024):,.0f} MB)"
+
+    def close(self):
+        """Delete the spill file"""
+        with self._lock:
+            self._cache.clear()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                try:
+                    os.remove(self._path)
+                except OSError:
+                    pass
+            self._rows = []
+            self._count = 0
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,449 @@
+"""
+SQL generation shared by the query builder UI and the paged browse mode.
+
+The query is described by a plain dictionary (the "spec") holding the same
+choices the Operations tab collects, and is turned into a set of query parts
+that can be rendered as-is or extended (extra predicates, hidden key columns,
+row limits) before rendering.
+"""
+from catalog import is_large_object_type, normalize_type, UNCOMPARABLE_TYPES
+
+# Dialect of queries run by the embedded engine over loaded CSV files (SQLite or DuckDB)
+LOCAL_DB_TYPE = "Local"
+
+# Characters of a large-object column fetched up front when the builder knows its type
+LOB_PREVIEW_LENGTH = 200
+# LOB types too small to be worth previewing
+SMALL_LOB_TYPES = {"tinytext", "tinyblob"}
+
+
+class QueryBuildError(Exception):
+    """Raised when a query spec cannot be turned into SQL"""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+def param_placeholder(db_type):
+    """Return the DB-API parameter placeholder used by the driver for db_type"""
+    # mysql.connector uses the "format" paramstyle, pyodbc uses "qmark"
+    return "%s" if db_type == "MySQL" else "?"
+
+
+def uses_limit(db_type):
+    """Whether db_type limits rows with LIMIT n (MySQL, the local engine) rather than TOP (n)"""
+    return db_type in ("MySQL", LOCAL_DB_TYPE)
+
+
+def quote_identifier(name, db_type):
+    """Quote a table, column or alias name for the given database type"""
+    if db_type == "MySQL":
+        return f"`{name}`"
+    if db_type == LOCAL_DB_TYPE:
+        return '"' + name.replace('"', '""') + '"'
+    return name
+
+
+def format_column(col, db_type):
+    """Format a "table.column" reference for the given database type"""
+    if "." in col:
+        table_name, col_name = col.split(".", 1)
+        return f"{quote_identifier(table_name, db_type)}.{quote_identifier(col_name, db_type)}"
+    return quote_identifier(col, db_type)
+
+
+def format_table(table, db_type):
+    """Format a table name for the given database type"""
+    return quote_identifier(table, db_type)
+
+
+def format_literal(val):
+    """Format a WHERE value the same way the builder always has: numbers bare, anything else quoted"""
+    try:
+        float(val)
+        return val
+    except ValueError:
+        return f"'{val}'"
+
+
+def build_query_parts(spec, db_type):
+    """
+    Turn a query spec into query parts.
+
+    The returned dictionary has "select" (list of expressions), "from",
+    "joins" (list of JOIN clauses), "where", "having" (condition strings),
+    "group_by" (list of expressions), "order_by" (list of (expression, direction))
+    and "limit" (None or a row count).
+    """
+    tables = spec.get("tables") or []
+    if not tables:
+        raise QueryBuildError("Selection Error", "Please select at least one table")
+
+    selected_columns = spec.get("columns", {})
+    aggregates = spec.get("aggregates", [])
+
+    # Track which columns are used in aggregates to avoid duplication
+    aggregated_columns = set(agg["column"] for agg in aggregates if agg.get("column"))
+
+    select = []
+
+    # Add regular selected columns (except those used in aggregates)
+    for table in tables:
+        for column in selected_columns.get(table, []):
+            if f"{table}.{column}" not in aggregated_columns:
+                select.append(format_column(f"{table}.{column}", db_type))
+
+    # Add combined columns as COALESCE expressions
+    for combined in spec.get("combined_columns", []):
+        columns = combined.get("columns", [])
+        alias = combined.get("alias", "")
+        if not columns or not alias:
+            continue
+
+        formatted_cols = [format_column(col, db_type) for col in columns]
+        select.append(f"COALESCE({', '.join(formatted_cols)}) AS {quote_identifier(alias, db_type)}")
+
+    # Add aggregate functions
+    for agg in aggregates:
+        col = agg.get("column")
+        if not col:
+            continue
+
+        agg_col = f"{agg['function']}({format_column(col, db_type)})"
+
+        alias = agg.get("alias")
+        if alias:
+            # Replace any dots in alias with underscores to avoid SQL syntax errors
+            agg_col += f" AS {alias.replace('.', '_')}"
+
+        select.append(agg_col)
+
+    if not select:
+        raise QueryBuildError("No Columns", "Please select at least one column, combined column, or aggregate function")
+
+    # JOINs for the remaining tables
+    joins = []
+    if len(tables) > 1:
+        for i, join in enumerate(spec.get("joins", [])):
+            join_type = join.get("join_type") or "INNER JOIN"
+            left_col = join.get("left_column")
+            right_col = join.get("right_column")
+            right_table = join.get("right_table")
+
+            # For the first join the left table is explicit, later joins use
+            # the result of the previous joins
+            left_table = (join.get("left_table") or tables[0]) if i == 0 else None
+
+            if not right_table or not left_col or not right_col:
+                raise QueryBuildError("Join Error", f"Please complete all fields for Join {i+1}")
+
+            # A composite key is given as comma separated columns, matched pairwise
+            left_cols = [c.strip() for c in left_col.split(",")]
+            right_cols = [c.strip() for c in right_col.split(",")]
+            if len(left_cols) != len(right_cols) or not all(left_cols + right_cols):
+                raise QueryBuildError("Join Error", f"Join {i+1} needs as many left columns as right columns")
+
+            right = format_table(right_table, db_type)
+            matches = []
+            for left_c, right_c in zip(left_cols, right_cols):
+                right_ref = format_column(f"{right_table}.{right_c}", db_type)
+                if left_table:
+                    matches.append(f"{format_column(f'{left_table}.{left_c}', db_type)} = {right_ref}")
+                else:
+                    matches.append(f"{right_ref} = {format_column(left_c, db_type)}")
+            joins.append(f"{join_type} {right} ON {' AND '.join(matches)}")
+
+    # WHERE conditions, joined by the connector of the preceding condition
+    conditions = []
+    connector = None
+    for cond in spec.get("where", []):
+        col = cond.get("column")
+        op = cond.get("operator") or "="
+        val = cond.get("value", "")
+
+        if not col or (op not in ["IS NULL", "IS NOT NULL"] and not val):
+            continue
+
+        formatted_col = format_column(col, db_type) if "." in col else col
+
+        if op in ["IS NULL", "IS NOT NULL"]:
+            condition = f"{formatted_col} {op}"
+        elif op == "LIKE":
+            condition = f"{formatted_col} LIKE '{val}'"
+        elif op == "IN":
+            condition = f"{formatted_col} IN ({val})"
+        else:
+            condition = f"{formatted_col} {op} {format_literal(val)}"
+
+        if conditions:
+            conditions.append(connector or "AND")
+        conditions.append(condition)
+        connector = cond.get("connector") or "AND"
+
+    group_by = []
+    for col in spec.get("group_by", []):
+        if col:
+            group_by.append(format_column(col, db_type) if "." in col else col)
+
+    order_by = []
+    for order in spec.get("order_by", []):
+        col = order.get("column")
+        if col:
+            formatted_col = format_column(col, db_type) if "." in col else col
+            order_by.append((formatted_col, order.get("direction") or "ASC"))
+
+    return {
+        "select": select,
+        "from": format_table(tables[0], db_type),
+        "joins": joins,
+        "where": " ".join(conditions),
+        "having": "",
+        "group_by": group_by,
+        "order_by": order_by,
+        "limit": None,
+    }
+
+
+def render_sql(parts, db_type, terminate=True):
+    """Render query parts as SQL text in the layout the Generate Query tab shows"""
+    limit = parts.get("limit")
+
+    if limit is not None and not uses_limit(db_type):
+        sql = f"SELECT TOP ({int(limit)}) \n"
+    else:
+        sql = "SELECT \n"
+
+    sql += "    " + ",\n    ".join(parts["select"])
+    sql += f"\nFROM {parts['from']}"
+
+    for join in parts.get("joins", []):
+        sql += f"\n{join}"
+
+    if parts.get("where"):
+        sql += f"\nWHERE {parts['where']}"
+
+    if parts.get("group_by"):
+        sql += "\nGROUP BY " + ", ".join(parts["group_by"])
+
+    if parts.get("having"):
+        sql += f"\nHAVING {parts['having']}"
+
+    if parts.get("order_by"):
+        sql += "\nORDER BY " + ", ".join(f"{expr} {direction}" for expr, direction in parts["order_by"])
+
+    if limit is not None and uses_limit(db_type):
+        sql += f"\nLIMIT {int(limit)}"
+
+    if terminate:
+        sql += ";"
+    return sql
+
+
+def add_condition(existing, condition):
+    """AND a condition onto an existing WHERE/HAVING string, keeping the original precedence"""
+    if not existing:
+        return condition
+    return f"({existing}) AND ({condition})"
+
+
+def keyset_predicate(keys, db_type, after):
+    """
+    Build the seek predicate that selects rows after a given key.
+
+    keys is a list of (expression, direction) and after the key values of the
+    last row seen. The predicate expands the row comparison
+    (k1, k2, ...) > (v1, v2, ...) so it works for mixed ASC/DESC orderings on
+    both MySQL and SQL Server. NULLs sort lowest (first ascending, last
+    descending), as on MySQL and SQL Server; a NULL key value is compared with
+    IS NULL / IS NOT NULL, since = and > never match NULL. Returns the
+    predicate and the index of the key value for each parameter, in bind order.
+    """
+    placeholder = param_placeholder(db_type)
+
+    def equal(j):
+        if after[j] is None:
+            return f"{keys[j][0]} IS NULL", []
+        return f"{keys[j][0]} = {placeholder}", [j]
+
+    def beyond(i):
+        # None when no row can come after the value in this key's direction
+        expr, direction = keys[i]
+        descending = direction.upper() == "DESC"
+        if after[i] is None:
+            return (None, []) if descending else (f"{expr} IS NOT NULL", [])
+        if descending:
+            return f"({expr} < {placeholder} OR {expr} IS NULL)", [i]
+        return f"{expr} > {placeholder}", [i]
+
+    branches = []
+    bind_order = []
+    for i in range(len(keys)):
+        last, last_binds = beyond(i)
+        if last is None:
+            continue
+        terms = []
+        for j in range(i):
+            term, binds = equal(j)
+            terms.append(term)
+            bind_order.extend(binds)
+        terms.append(last)
+        bind_order.extend(last_binds)
+        branches.append("(" + " AND ".join(terms) + ")")
+    return " OR ".join(branches) or "1 = 0", bind_order
+
+
+def build_keyset_query(parts, keys, page_size, db_type, after=None):
+    """
+    Build the SQL and parameters for one page of a keyset-paginated query.
+
+    The key expressions are appended to the select list as hidden columns so
+    the last row of each page carries the position to seek from. One extra row
+    is requested so the caller can tell whether another page follows.
+    """
+    page = dict(parts)
+    page["select"] = list(parts["select"]) + [f"{expr} AS {_key_alias(i)}" for i, (expr, _) in enumerate(keys)]
+    page["order_by"] = list(keys)
+    if db_type == LOCAL_DB_TYPE:
+        # DuckDB sorts NULLs last by default; the seek predicate expects them lowest
+        page["order_by"] = [(expr, f"{direction} NULLS {'LAST' if direction.upper() == 'DESC' else 'FIRST'}")
+                            for expr, direction in keys]
+    page["limit"] = page_size + 1
+
+    params = []
+    if after is not None:
+        predicate, bind_order = keyset_predicate(keys, db_type, after)
+        params = [after[i] for i in bind_order]
+        # Grouped queries can only seek on grouped values, which belong in HAVING
+        if parts.get("group_by"):
+            page["having"] = add_condition(parts.get("having"), predicate)
+        else:
+            page["where"] = add_condition(parts.get("where"), predicate)
+
+    return render_sql(page, db_type, terminate=False), params
+
+
+def _key_alias(index):
+    return f"keyset_key_{index}"
+
+
+def lob_preview_expression(ref, type_name, db_type):
+    """The first LOB_PREVIEW_LENGTH characters (bytes for binary types) of a large-object column"""
+    # SQL Server's SUBSTRING takes text, ntext and image but not xml
+    if db_type != "MySQL" and normalize_type(type_name) == "xml":
+        ref = f"CAST({ref} AS NVARCHAR(MAX))"
+    return f"SUBSTRING({ref}, 1, {LOB_PREVIEW_LENGTH})"
+
+
+def lob_length_expression(ref, db_type):
+    """Full length of a large-object column; SQL Server counts bytes, so Unicode text reads as twice as long"""
+    return f"CHAR_LENGTH({ref})" if db_type == "MySQL" else f"DATALENGTH({ref})"
+
+
+def build_lob_preview(parts, spec, column_types, primary_keys, db_type):
+    """
+    Query parts that fetch a preview of each large-object column instead of its value.
+
+    Selected columns of a LOB type (see catalog.is_large_object_type) are
+    replaced by their first LOB_PREVIEW_LENGTH characters under the same
+    name. Hidden columns with each such value's full length and its table's
+    primary key are appended to the select list, so the full value can be
+    read by key later. Columns of tables without a primary key, and grouped
+    queries, are left alone.
+
+    Returns (preview parts, lobs, hidden column count), or None if there is
+    nothing to replace. Each entry of lobs has the table, column and key
+    names, and the positions in a fetched row of the preview ("position"),
+    the length ("length_index") and the key values ("key_indexes").
+    """
+    if parts.get("group_by") or spec.get("aggregates"):
+        return None
+
+    select = list(parts["select"])
+    hidden = []
+    lobs = []
+    key_indexes = {}
+    for table in spec.get("tables", []):
+        keys = primary_keys.get(table)
+        if not keys:
+            continue
+        for column in spec.get("columns", {}).get(table, []):
+            type_name = column_types.get(table, {}).get(column)
+            # TINYTEXT and TINYBLOB hold at most 255 bytes, which is no more than a preview
+            if not is_large_object_type(type_name) or normalize_type(type_name) in SMALL_LOB_TYPES:
+                continue
+            ref = format_column(f"{table}.{column}", db_type)
+            if ref not in select:
+                continue
+            position = select.index(ref)
+            select[position] = f"{lob_preview_expression(ref, type_name, db_type)} AS {quote_identifier(column, db_type)}"
+
+            # One set of key columns per table, however many of its columns are previewed
+            if table not in key_indexes:
+                key_indexes[table] = []
+                for key in keys:
+                    key_indexes[table].append(len(parts["select"]) + len(hidden))
+                    alias = quote_identifier(f"lob_key_{len(hidden)}", db_type)
+                    hidden.append(f"{format_column(f'{table}.{key}', db_type)} AS {alias}")
+
+            length_index = len(parts["select"]) + len(hidden)
+            hidden.append(f"{lob_length_expression(ref, db_type)} AS {quote_identifier(f'lob_length_{len(hidden)}', db_type)}")
+            lobs.append({
+                "table": table,
+                "column": column,
+                "keys": list(keys),
+                "position": position,
+                "length_index": length_index,
+                "key_indexes": key_indexes[table],
+            })
+
+    if not lobs:
+        return None
+    preview = dict(parts)
+    preview["select"] = select + hidden
+    return preview, lobs, len(hidden)
+
+
+def build_summary_queries(table, columns, column_types, db_type, columns_per_query=25):
+    """
+    Build set-based summary queries that profile a table on the server.
+
+    Every column gets a null count and, where the type allows it, COUNT(DISTINCT)
+    and MIN/MAX. Columns are split across several statements so no single
+    SELECT list gets too wide. Returns a list of (sql, plan) where plan lists
+    (column, [aggregate names]) in select-list order after the leading row count.
+    """
+    queries = []
+    for start in range(0, len(columns), columns_per_query):
+        select = ["COUNT(*)"]
+        plan = []
+        for column in columns[start:start + columns_per_query]:
+            ref = format_column(f"{table}.{column}", db_type)
+            type_name = column_types.get(column)
+            base_type = normalize_type(type_name)
+
+            aggregates = ["nulls"]
+            select.append(f"SUM(CASE WHEN {ref} IS NULL THEN 1 ELSE 0 END)")
+
+            # Large objects and spatial types are only null-counted
+            if not is_large_object_type(type_name) and base_type not in UNCOMPARABLE_TYPES:
+                # SQL Server can't take MIN/MAX of a bit column
+                compared = f"CAST({ref} AS INT)" if (base_type == "bit" and db_type != "MySQL") else ref
+                select += [f"COUNT(DISTINCT {ref})", f"MIN({compared})", f"MAX({compared})"]
+                aggregates += ["distinct", "min", "max"]
+
+            plan.append((column, aggregates))
+
+        parts = {
+            "select": select,
+            "from": format_table(table, db_type),
+            "joins": [],
+            "where": "",
+            "having": "",
+            "group_by": [],
+            "order_by": [],
+            "limit": None,
+        }
+        queries.append((render_sql(parts, db_type, terminate=False), plan))
+    return queries
@@ -0,0 +1,35 @@
+"""Catalog helpers that need no database"""
+import pytest
+
+from catalog import describe_table_size, is_range_type, normalize_type
+
+
+@pytest.mark.parametrize("rows, size, expected", [
+    (0, None, "~0 rows"),
+    (999, None, "~999 rows"),
+    (1500, 0, "~1.5K rows"),
+    (1300000, 350 * 1024 * 1024, "~1.3M rows, 350.0 MB"),
+    (3000000000, 5 * 1024 ** 4, "~3.0B rows, 5.0 TB"),
+    (10, 512, "~10 rows, 512 B"),
+    (10, 2048, "~10 rows, 2 KB"),
+    (10, "1610612736", "~10 rows, 1.5 GB"),
+])
+def test_describe_table_size(rows, size, expected):
+    assert describe_table_size(rows, size) == expected
+
+
+@pytest.mark.parametrize("type_name, expected", [
+    ("int(11) unsigned", "int"),
+    ("NVARCHAR(MAX)", "nvarchar"),
+    ("datetime2", "datetime2"),
+    (None, ""),
+])
+def test_normalize_type(type_name, expected):
+    assert normalize_type(type_name) == expected
+
+
+def test_range_types():
+    assert is_range_type("bigint(20)")
+    assert is_range_type("date")
+    assert not is_range_type("varchar(10)")
+    assert not is_range_type(None)
@@ -0,0 +1,66 @@
+"""CSV export, plain and compressed"""
+import csv
+import datetime
+import decimal
+import gzip
+import io
+
+import pytest
+
+from exporters import write_compressed_csv, write_csv
+
+COLUMNS = ["id", "name", "amount", "created"]
+
+
+def make_rows(count):
+    return [[i, None if i % 7 == 0 else f"name, \"{i}\"\n", decimal.Decimal(i) / 4,
+             datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)] for i in range(count)]
+
+
+def expected_csv(rows, header=True):
+    return ([COLUMNS] if header else []) + [
+        [str(i), "" if name is None else name, str(amount), created.isoformat()]
+        for i, name, amount, created in rows]
+
+
+def test_write_csv_to_an_open_file():
+    rows = make_rows(25)
+    buffer = io.StringIO(newline="")
+    progress = []
+    assert write_csv(buffer, COLUMNS, iter(rows), progress.append, progress_every=10) == 25
+    assert progress == [10, 20]
+    assert list(csv.reader(io.StringIO(buffer.getvalue(), newline=""))) == expected_csv(rows)
+
+
+def test_write_csv_without_header(tmp_path):
+    rows = make_rows(3)
+    path = str(tmp_path / "out.csv")
+    write_csv(path, COLUMNS, rows, header=False)
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == expected_csv(rows, header=False)
+
+
+@pytest.mark.parametrize("count", [0, 1, 99, 100, 1001])
+def test_gzip_blocks_read_back_as_one_file(tmp_path, count):
+    rows = make_rows(count)
+    path = str(tmp_path / "out.csv.gz")
+    progress = []
+    # Small blocks so the rows span many gzip members written by several workers
+    written = write_compressed_csv(path, COLUMNS, iter(rows), progress.append, progress_every=250,
+                                   workers=3, block_rows=100)
+    assert written == count
+    # Reported in order, once for every progress_every rows passed
+    assert progress == sorted(set(progress))
+    assert len(progress) == count // 250
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == expected_csv(rows)
+
+
+def test_zstd_csv(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    rows = make_rows(50)
+    path = str(tmp_path / "out.csv.zst")
+    assert write_csv(path, COLUMNS, rows) == 50
+    with open(path, "rb") as f:
+        data = zstandard.ZstdDecompressor().stream_reader(f).read()
+    assert list(csv.reader(io.StringIO(data.decode("utf-8"), newline=""))) == expected_csv(rows)
@@ -0,0 +1,66 @@
+"""Join planning from foreign keys and name heuristics"""
+from join_graph import FK_COST, HEURISTIC_COST, JoinGraph
+
+TABLES = {
+    "customers": ["id", "name"],
+    "orders": ["id", "customer_id", "total"],
+    "order_items": ["order_id", "line_no", "product_id"],
+    "shipments": ["order_id", "line_no", "shipped"],
+    "products": ["id", "name"],
+}
+FOREIGN_KEYS = [
+    ("orders", ["customer_id"], "customers", ["id"]),
+    ("order_items", ["order_id"], "orders", ["id"]),
+    ("shipments", ["order_id", "line_no"], "order_items", ["order_id", "line_no"]),
+]
+
+
+def make_graph(**kwargs):
+    return JoinGraph.from_catalog(TABLES, primary_keys={"products": ["id"]}, foreign_keys=FOREIGN_KEYS, **kwargs)
+
+
+def test_plan_follows_foreign_keys():
+    joins, unreachable = make_graph().plan_joins(["customers", "orders", "order_items"])
+    assert joins == [
+        ("customers", ("id",), "orders", ("customer_id",)),
+        ("orders", ("id",), "order_items", ("order_id",)),
+    ]
+    assert unreachable == []
+
+
+def test_composite_key_is_one_edge():
+    joins, _ = make_graph().plan_joins(["shipments", "order_items"])
+    assert joins == [("shipments", ("order_id", "line_no"), "order_items", ("order_id", "line_no"))]
+
+
+def test_each_join_starts_from_a_joined_table():
+    joins, unreachable = make_graph().plan_joins(["order_items", "customers", "orders"])
+    assert unreachable == []
+    joined = {"order_items"}
+    for left, _, right, _ in joins:
+        assert left in joined
+        joined.add(right)
+    assert joined == {"order_items", "customers", "orders"}
+
+
+def test_tables_outside_the_selection_are_not_used():
+    graph = make_graph()
+    joins, unreachable = graph.plan_joins(["customers", "order_items"])
+    assert joins == []
+    assert unreachable == ["order_items"]
+    assert graph.bridging_tables(["customers", "order_items"], "order_items") == ["orders"]
+
+
+def test_guessed_edges_only_for_tables_without_foreign_keys():
+    graph = make_graph()
+    # products has no declared keys, so order_items.product_id -> products.id is guessed
+    edges = graph.edges["products"]
+    assert edges == [("order_items", ("id",), ("product_id",), HEURISTIC_COST)]
+    # Between tables with foreign keys, only the declared edges exist
+    assert all(cost == FK_COST for _, _, _, cost in graph.edges["customers"])
+
+
+def test_guessed_edges_need_compatible_types():
+    column_types = {"order_items": {"product_id": "varchar(20)"}, "products": {"id": "int(11)"}}
+    graph = make_graph(column_types=column_types)
+    assert "products" not in graph.edges
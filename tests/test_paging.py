@@ -0,0 +1,131 @@
+"""Keyset predicates and paging, checked against SQLite with the local engine's dialect"""
+import random
+import sqlite3
+
+import pytest
+
+from paging import KeysetPager
+from sql_builder import LOCAL_DB_TYPE, build_keyset_query, keyset_predicate
+
+
+def make_table(rows=137, seed=7):
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute('CREATE TABLE "t" ("id" INTEGER, "a" INTEGER, "b" TEXT)')
+    rnd = random.Random(seed)
+    data = []
+    for i in range(rows):
+        # Few distinct values and plenty of NULLs, so ties and NULL keys are on page boundaries
+        a = rnd.choice([None, 1, 2, 3])
+        b = rnd.choice([None, "x", "y"])
+        data.append((i, a, b))
+    conn.executemany('INSERT INTO "t" VALUES (?, ?, ?)', data)
+    return conn, data
+
+
+def make_parts(limit=None):
+    return {
+        "select": ['"t"."id"', '"t"."a"', '"t"."b"'],
+        "from": '"t"',
+        "joins": [],
+        "where": "",
+        "group_by": [],
+        "having": "",
+        "order_by": [],
+        "limit": limit,
+    }
+
+
+def expected_order(data, keys):
+    """Rows ordered by keys with NULLs lowest, the order keyset_predicate assumes"""
+    columns = {'"t"."id"': 0, '"t"."a"': 1, '"t"."b"': 2}
+    rows = list(data)
+    # Stable sorts from the last key to the first give the combined ordering
+    for expr, direction in reversed(keys):
+        i = columns[expr]
+        rows.sort(key=lambda row: (row[i] is not None, row[i] if row[i] is not None else 0),
+                  reverse=direction == "DESC")
+    return [list(row) for row in rows]
+
+
+def browse(pager):
+    rows = []
+    pager.first_page()
+    rows.extend(pager.rows)
+    while pager.next_page():
+        rows.extend(pager.rows)
+    return rows
+
+
+KEY_SETS = [
+    [('"t"."id"', "ASC")],
+    [('"t"."id"', "DESC")],
+    [('"t"."a"', "ASC"), ('"t"."id"', "ASC")],
+    [('"t"."a"', "DESC"), ('"t"."id"', "ASC")],
+    [('"t"."a"', "DESC"), ('"t"."b"', "ASC"), ('"t"."id"', "DESC")],
+    [('"t"."b"', "ASC"), ('"t"."a"', "DESC"), ('"t"."id"', "ASC")],
+]
+
+
+@pytest.mark.parametrize("keys", KEY_SETS)
+def test_pages_cover_every_row_once_in_order(keys):
+    conn, data = make_table()
+    pager = KeysetPager(conn, make_parts(), keys, LOCAL_DB_TYPE, page_size=10)
+    try:
+        assert browse(pager) == expected_order(data, keys)
+    finally:
+        pager.close()
+
+
+def test_previous_page_returns_the_same_rows():
+    conn, _ = make_table()
+    keys = KEY_SETS[3]
+    pager = KeysetPager(conn, make_parts(), keys, LOCAL_DB_TYPE, page_size=10)
+    try:
+        pager.first_page()
+        pager.next_page()
+        second = pager.rows
+        pager.next_page()
+        assert pager.previous_page()
+        assert pager.rows == second
+    finally:
+        pager.close()
+
+
+def test_row_limit_caps_the_whole_browse():
+    conn, data = make_table()
+    keys = KEY_SETS[0]
+    pager = KeysetPager(conn, make_parts(limit=23), keys, LOCAL_DB_TYPE, page_size=10)
+    try:
+        pager.first_page()
+        sizes = [len(pager.rows)]
+        while pager.next_page():
+            sizes.append(len(pager.rows))
+        assert sizes == [10, 10, 3]
+        assert not pager.has_more
+    finally:
+        pager.close()
+
+
+def test_predicate_binds_values_in_placeholder_order():
+    keys = [("a", "ASC"), ("b", "DESC")]
+    predicate, bind_order = keyset_predicate(keys, "MySQL", (5, "x"))
+    assert predicate == "(a > %s) OR (a = %s AND (b < %s OR b IS NULL))"
+    assert bind_order == [0, 0, 1]
+
+
+def test_predicate_with_null_key_values():
+    keys = [("a", "ASC"), ("b", "DESC")]
+    # A NULL ascending key is the lowest value; a NULL descending key is the last
+    predicate, bind_order = keyset_predicate(keys, "SQL Server", (None, None))
+    assert predicate == "(a IS NOT NULL)"
+    assert bind_order == []
+
+    assert keyset_predicate([("a", "DESC")], "SQL Server", (None,)) == ("1 = 0", [])
+
+
+def test_keyset_query_seeks_in_having_for_grouped_queries():
+    parts = dict(make_parts(), select=['"t"."a"', "COUNT(*)"], group_by=['"t"."a"'])
+    sql, params = build_keyset_query(parts, [('"t"."a"', "ASC")], 10, LOCAL_DB_TYPE, after=(2,))
+    assert "HAVING" in sql and "WHERE" not in sql
+    assert sql.rstrip().endswith("LIMIT 11")
+    assert params == [2]
@@ -0,0 +1,114 @@
+"""Range splitting for parallel export, checked against SQLite with the local engine's dialect"""
+import datetime
+import decimal
+import sqlite3
+
+import pytest
+
+from parallel_extract import _interpolate, minmax_boundaries, part_path, partition_queries
+from sql_builder import LOCAL_DB_TYPE, QueryBuildError
+
+KEY = '"t"."k"'
+
+
+def make_parts(where=""):
+    return {
+        "select": ['"t"."id"', KEY],
+        "from": '"t"',
+        "joins": [],
+        "where": where,
+        "group_by": [],
+        "having": "",
+        "order_by": [],
+        "limit": None,
+    }
+
+
+def make_table(keys):
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE "t" ("id" INTEGER, "k" INTEGER)')
+    conn.executemany('INSERT INTO "t" VALUES (?, ?)', list(enumerate(keys)))
+    return conn
+
+
+def fetch_ranges(conn, queries):
+    results = []
+    for sql, params in queries:
+        results.append(sorted(conn.execute(sql, params).fetchall(), key=lambda row: row[0]))
+    return results
+
+
+@pytest.mark.parametrize("partitions", [1, 3, 4, 7])
+def test_ranges_return_every_row_once(partitions):
+    keys = [None, 5, 5, 6, 17, 40, 41, 99, None, 100, 3] * 3
+    conn = make_table(keys)
+    parts = make_parts()
+    bounds = minmax_boundaries(conn.cursor(), parts, KEY, partitions, LOCAL_DB_TYPE)
+    assert bounds == sorted(set(bounds))
+
+    # Rows added after the MIN/MAX query still land in the open first or last range
+    conn.executemany('INSERT INTO "t" VALUES (?, ?)', [(1000, -1), (1001, 500)])
+    ranges = fetch_ranges(conn, partition_queries(parts, KEY, bounds, LOCAL_DB_TYPE))
+    assert len(ranges) == len(bounds) + 1
+
+    rows = [row for r in ranges for row in r]
+    assert sorted(rows) == sorted(conn.execute('SELECT "id", "k" FROM "t"').fetchall())
+    # The last range is the NULL keys
+    assert ranges[-1] and all(k is None for _, k in ranges[-1])
+
+
+def test_equal_keys_with_nulls_are_not_repeated():
+    conn = make_table([7, 7, None, 7])
+    parts = make_parts()
+    bounds = minmax_boundaries(conn.cursor(), parts, KEY, 4, LOCAL_DB_TYPE)
+    assert bounds == [7]
+    ranges = fetch_ranges(conn, partition_queries(parts, KEY, bounds, LOCAL_DB_TYPE))
+    assert ranges == [[(0, 7), (1, 7), (3, 7)], [(2, None)]]
+
+
+def test_ranges_keep_the_query_filter():
+    conn = make_table(range(20))
+    parts = make_parts(where=f"{KEY} % 2 = 0")
+    bounds = minmax_boundaries(conn.cursor(), parts, KEY, 3, LOCAL_DB_TYPE)
+    ranges = fetch_ranges(conn, partition_queries(parts, KEY, bounds, LOCAL_DB_TYPE))
+    assert [k for r in ranges for _, k in r] == list(range(0, 20, 2))
+
+
+def test_only_null_keys_give_one_range():
+    conn = make_table([None, None])
+    parts = make_parts()
+    bounds = minmax_boundaries(conn.cursor(), parts, KEY, 4, LOCAL_DB_TYPE)
+    assert bounds == []
+    queries = partition_queries(parts, KEY, bounds, LOCAL_DB_TYPE)
+    assert len(queries) == 1
+    assert len(fetch_ranges(conn, queries)[0]) == 2
+
+
+def test_text_keys_are_rejected():
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE "t" ("id" INTEGER, "k" TEXT)')
+    conn.execute("""INSERT INTO "t" VALUES (1, 'a'), (2, 'b')""")
+    with pytest.raises(QueryBuildError):
+        minmax_boundaries(conn.cursor(), make_parts(), KEY, 4, LOCAL_DB_TYPE)
+
+
+def test_limited_and_grouped_queries_are_rejected():
+    with pytest.raises(QueryBuildError):
+        partition_queries(dict(make_parts(), limit=100), KEY, [1, 2], LOCAL_DB_TYPE)
+    with pytest.raises(QueryBuildError):
+        partition_queries(dict(make_parts(), group_by=['"t"."id"']), KEY, [1, 2], LOCAL_DB_TYPE)
+
+
+@pytest.mark.parametrize("low, high, expected", [
+    (0, 100, 25),
+    (decimal.Decimal("1.0"), decimal.Decimal("2.0"), decimal.Decimal("1.25")),
+    (datetime.date(2024, 1, 1), datetime.date(2024, 1, 9), datetime.date(2024, 1, 3)),
+    (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2), datetime.datetime(2024, 1, 1, 6)),
+    (0.0, 1.0, 0.25),
+])
+def test_interpolate(low, high, expected):
+    assert _interpolate(low, high, 0.25) == expected
+
+
+def test_part_path():
+    assert part_path("out/orders.csv", 2).replace("\\", "/") == "out/orders.part003.csv"
@@ -0,0 +1,62 @@
+"""Query spec files: save/load round trips and diffs"""
+import pytest
+
+from query_spec import diff_specs, load_spec, normalize_spec, save_spec
+
+
+def make_spec():
+    return {
+        "version": 1,
+        "db_type": "MySQL",
+        "tables": ["orders", "customers"],
+        "columns": {"orders": ["id", "total"], "customers": ["name"]},
+        "combined_columns": [{"alias": "label", "columns": ["customers.name", "orders.id"]}],
+        "aggregates": [{"function": "SUM", "column": "orders.total", "alias": None}],
+        "joins": [{"left_table": "orders", "right_table": "customers", "join_type": "INNER JOIN",
+                   "left_column": "customer_id", "right_column": "id"}],
+        "where": [{"column": "orders.total", "operator": ">", "value": 100, "connector": None},
+                  {"column": "customers.name", "operator": "LIKE", "value": "O'Brien \"Jr\" \\ %",
+                   "connector": "AND"}],
+        "group_by": ["customers.name"],
+        "order_by": [{"column": "customers.name", "direction": "DESC"}],
+    }
+
+
+@pytest.mark.parametrize("name", ["spec.json", "spec.toml"])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    save_spec(path, make_spec())
+    loaded = load_spec(path)
+    assert loaded == normalize_spec(make_spec())
+    assert diff_specs(make_spec(), loaded) == []
+
+
+def test_values_are_kept_as_text():
+    spec = normalize_spec(make_spec())
+    assert spec["where"][0]["value"] == "100"
+    assert spec["aggregates"][0]["alias"] is None
+
+
+def test_missing_sections_are_filled_in():
+    spec = normalize_spec({"tables": ["orders"]})
+    assert spec["joins"] == [] and spec["columns"] == {}
+
+
+@pytest.mark.parametrize("spec", [[], {"tables": []}, {"tables": ["t"], "joins": {}},
+                                  {"tables": ["t"], "where": ["x"]}, {"version": 99, "tables": ["t"]}])
+def test_malformed_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        normalize_spec(spec)
+
+
+def test_diff_lists_changes():
+    old = make_spec()
+    new = make_spec()
+    new["columns"]["orders"] = ["total", "id", "status"]
+    new["where"].pop()
+    new["order_by"][0]["direction"] = "ASC"
+    assert diff_specs(old, new) == [
+        "columns orders: + status",
+        "where[2] removed: column=customers.name, operator=LIKE, value=O'Brien \"Jr\" \\ %, connector=AND",
+        "order_by[1]: column=customers.name, direction=DESC -> column=customers.name, direction=ASC",
+    ]
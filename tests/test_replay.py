@@ -0,0 +1,83 @@
+"""Recording and replaying cursors"""
+import datetime
+import decimal
+import gzip
+import pickle
+
+import pytest
+
+from replay import RecordingCursor, ReplayConnection, load_recording
+
+ROWS = [
+    (1, "a", decimal.Decimal("1.50"), datetime.datetime(2024, 5, 1, 12, 30, 15, 250), b"\x00\xff"),
+    (2, None, decimal.Decimal("-0.001"), datetime.datetime(2024, 5, 2), bytearray(b"xy")),
+    (3, "{\"$type\": \"date\"}", None, None, None),
+]
+DESCRIPTION = [("id", int, None, None, None, None, False), ("name", str, None, None, None, None, True),
+               ("amount", decimal.Decimal, None, None, 10, 3, True),
+               ("created", datetime.datetime, None, None, None, None, True), ("data", bytes, None, None, None, None, True)]
+
+
+class ListCursor:
+    """The DB-API calls RecordingCursor wraps, over fixed rows"""
+
+    def __init__(self):
+        self.description = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.description = DESCRIPTION
+        self.rows = list(ROWS)
+
+    def fetchmany(self, size=1):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def close(self):
+        pass
+
+
+def record(path):
+    cursor = RecordingCursor(ListCursor(), path, db_type="MySQL")
+    cursor.execute("SELECT * FROM t WHERE d > %s", (datetime.date(2024, 1, 1),))
+    batches = [cursor.fetchmany(2), cursor.fetchmany(2), cursor.fetchmany(2)]
+    cursor.close()
+    return batches
+
+
+def test_replay_returns_the_recorded_values(tmp_path):
+    path = str(tmp_path / "run.rec.gz")
+    record(path)
+
+    header, executions = load_recording(path)
+    assert header["db_type"] == "MySQL"
+    assert executions[0]["params"] == [datetime.date(2024, 1, 1)]
+    assert [len(rows) for _, rows in executions[0]["batches"]] == [2, 1, 0]
+
+    cursor = ReplayConnection(path).cursor()
+    cursor.execute("SELECT * FROM t WHERE d > %s", (datetime.date(2024, 1, 1),))
+    assert cursor.description == [tuple(desc) for desc in DESCRIPTION]
+    rows = cursor.fetchall()
+    # bytearray values come back as bytes, which compare equal
+    assert rows == ROWS
+    assert [type(value) for value in rows[0]] == [int, str, decimal.Decimal, datetime.datetime, bytes]
+
+
+def test_replay_runs_out_of_executions(tmp_path):
+    path = str(tmp_path / "run.rec.gz")
+    record(path)
+    cursor = ReplayConnection(path).cursor()
+    cursor.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        cursor.execute("SELECT 2")
+
+
+def test_pickle_recordings_are_refused(tmp_path):
+    path = str(tmp_path / "old.rec.gz")
+    with gzip.open(path, "wb") as f:
+        pickle.dump({"version": 1}, f)
+    with pytest.raises(ValueError):
+        load_recording(path)
@@ -0,0 +1,72 @@
+"""ResultStore spilling and sorting"""
+import os
+import random
+
+import pytest
+
+from result_store import SPILL_BATCH_ROWS, ResultStore
+
+
+def make_rows(count, seed=3):
+    rnd = random.Random(seed)
+    return [[i, rnd.choice([None] + list(range(50))), str(rnd.randint(0, 999))] for i in range(count)]
+
+
+@pytest.fixture
+def spilled_store():
+    rows = make_rows(SPILL_BATCH_ROWS * 3 + 123)
+    # A tiny budget spills at once and makes every batch its own sorted run
+    store = ResultStore(["id", "value", "text"], memory_budget=1000)
+    for start in range(0, len(rows), 1000):
+        store.extend(rows[start:start + 1000])
+    yield store, rows
+    store.close()
+
+
+def test_spilled_store_reads_back_rows(spilled_store):
+    store, rows = spilled_store
+    assert store.spilled
+    assert len(store) == len(rows)
+    assert list(store) == rows
+    assert store[len(rows) - 1] == rows[-1]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_sorted_by_merges_spilled_runs(spilled_store, descending):
+    store, rows = spilled_store
+    result = store.sorted_by(1, descending=descending)
+    try:
+        values = [row[1] for row in result]
+        present = sorted((v for v in values if v is not None), reverse=descending)
+        # NULLs last in both directions
+        assert values == present + [None] * (len(values) - len(present))
+        assert sorted(result, key=lambda row: row[0]) == rows
+    finally:
+        result.close()
+
+
+def test_sorted_by_converts_values(spilled_store):
+    store, rows = spilled_store
+    result = store.sorted_by(2, convert=int)
+    try:
+        assert [int(row[2]) for row in result] == sorted(int(row[2]) for row in rows)
+    finally:
+        result.close()
+
+
+def test_sorted_by_uses_the_displayed_column_order():
+    store = ResultStore(["a", "b", "key"], [[3, "c", 1], [1, "a", 2], [2, "b", 3]], hidden=1)
+    store.move_column(1, 0)
+    result = store.sorted_by(0, descending=True)
+    assert result.columns == ["b", "a"]
+    assert [row for row in result] == [["c", 3], ["b", 2], ["a", 1]]
+    assert result.raw_row(0) == [3, "c", 1]
+
+
+def test_close_removes_the_spill_file(spilled_store):
+    store, _ = spilled_store
+    path = store._path
+    assert os.path.exists(path)
+    store.close()
+    assert not os.path.exists(path)
+    assert len(store) == 0